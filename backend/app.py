@@ -1,16 +1,38 @@
 # app.py
-from fastapi import FastAPI
+from fastapi import FastAPI, HTTPException, Request, Header, Depends
+from fastapi.responses import PlainTextResponse, StreamingResponse
+from starlette.concurrency import run_in_threadpool
 from pydantic import BaseModel
 from typing import List, Optional
 from fastapi.middleware.cors import CORSMiddleware
 from dotenv import load_dotenv
+import asyncio
 import os
+import json
+import time
 
 # Load environment variables
 load_dotenv()
 
-from memory_extractor import extract_messages
-from personality_engine import transform_reply
+from memory_extractor import extract_messages, iter_extractions, summarize_messages, current_lexicon, start_lexicon_watcher
+from personality_engine import (
+    transform_reply_async,
+    transform_replies_async,
+    stream_transform_reply,
+    show_personality_comparison_async,
+    close_llm_clients,
+    preconnect_llm,
+    llm_coalescing_stats,
+    TRANSFORM_CACHE,
+    LLM_CIRCUIT,
+    LLM_DISPATCHER,
+    LLM_DEADLINE_MS,
+)
+from session_memory import SessionMemoryStore
+from metrics import REGISTRY, STAGE_LATENCY, observe_input
+from profiling import RequestProfile, active_profile, profiling_requested
+from serialization import body_of, negotiated_response, openapi_body
+from compression import CompressionMiddleware
 
 
 app = FastAPI(
@@ -43,42 +65,241 @@ app.add_middleware(
     allow_methods=["*"],
     allow_headers=["*"],
 )
+# gzip/zstd per Accept-Encoding for complete responses; streams pass through
+app.add_middleware(CompressionMiddleware)
+
+# Per-session extracted memory, so repeated calls only extract new messages
+session_store = SessionMemoryStore(
+    max_sessions=int(os.getenv("SESSION_MAX_SESSIONS", "1000")),
+    ttl_seconds=float(os.getenv("SESSION_TTL_SECONDS", "3600")),
+)
+
+
 class ExtractRequest(BaseModel):
     messages: List[str]
+    session_id: Optional[str] = None
+    delta: bool = False  # True when messages only holds what's new since the last call
+    compact: bool = False  # Reference messages by index instead of repeating them as context
+    aggregate: bool = False  # Ranked top-k summary (parser_schema.json) instead of every hit
 
 
 class TransformRequest(BaseModel):
     messages: List[str]
     style: Optional[str] = "calm_mentor"
     sample_reply: Optional[str] = "Here is a suggested plan."
+    session_id: Optional[str] = None
+    delta: bool = False
+    compact: bool = False
+    aggregate: bool = False
+
+
+class BatchItem(BaseModel):
+    sample_reply: str
+    style: Optional[str] = "calm_mentor"
+
+
+class BatchTransformRequest(BaseModel):
+    messages: List[str]
+    items: List[BatchItem]
+    session_id: Optional[str] = None
+    delta: bool = False
+    compact: bool = False
+    aggregate: bool = False
+
+
+BATCH_MAX_ITEMS = int(os.getenv("BATCH_MAX_ITEMS", "500"))
+
+
+class CompareRequest(TransformRequest):
+    single_call: Optional[bool] = None  # Ask the LLM for all styles in one structured call
+
+
+def extract_for_request(req) -> dict:
+    """Extract from the request messages, incrementally when a session id is given."""
+    observe_input(req.messages)
+    with STAGE_LATENCY.time("extraction"):
+        if req.session_id:
+            return session_store.extract(
+                req.session_id, req.messages, delta=req.delta, compact=req.compact, aggregate=req.aggregate
+            )
+        if req.aggregate:
+            return summarize_messages(req.messages)
+        return extract_messages(req.messages, compact=req.compact)
+
+
+# Smallest X-Deadline-Ms honoured; anything lower could not fit an LLM call
+MIN_DEADLINE_MS = int(os.getenv("MIN_DEADLINE_MS", "250"))
+
+
+def remaining_budget(started: float, deadline_ms: Optional[int]) -> float:
+    """Seconds left of the request's latency budget (X-Deadline-Ms, default LLM_DEADLINE_MS)."""
+    budget_ms = max(deadline_ms, MIN_DEADLINE_MS) if deadline_ms and deadline_ms > 0 else LLM_DEADLINE_MS
+    return budget_ms / 1000 - (time.monotonic() - started)
+
+
+async def run_extraction(req) -> dict:
+    # Extraction is CPU-bound, keep it off the event loop; a profiled request
+    # extracts inline so the profiler sees it
+    if active_profile() is not None:
+        return extract_for_request(req)
+    return await run_in_threadpool(extract_for_request, req)
+
+
+async def profiled(handler, *args) -> dict:
+    """Run a handler under the request profiler and attach its report."""
+    with RequestProfile() as profile:
+        response = await handler(*args)
+    response["profile"] = profile.report()
+    return response
+
 
+def ndjson_lines(findings):
+    for item in findings:
+        yield json.dumps(item, ensure_ascii=False) + "\n"
 
-@app.post("/extract")
-def extract_endpoint(req: ExtractRequest):
-    return extract_messages(req.messages)
 
+# Request bodies may be JSON or MessagePack (by Content-Type) and responses
+# are encoded per Accept; see serialization.py
+@app.post("/extract", openapi_extra=openapi_body(ExtractRequest))
+def extract_endpoint(
+    request: Request,
+    req: ExtractRequest = Depends(body_of(ExtractRequest)),
+    x_profile: Optional[str] = Header(None),
+):
+    # Clients asking for NDJSON get per-message findings streamed as they are
+    # produced instead of one merged result (session memory is not used).
+    if "application/x-ndjson" in request.headers.get("accept", ""):
+        observe_input(req.messages)
+        return StreamingResponse(ndjson_lines(iter_extractions(req.messages)), media_type="application/x-ndjson")
+    if profiling_requested(x_profile):
+        with RequestProfile() as profile:
+            extracted = extract_for_request(req)
+        return negotiated_response({**extracted, "profile": profile.report()}, request)
+    return negotiated_response(extract_for_request(req), request)
 
-@app.post("/transform")
-def transform_endpoint(req: TransformRequest):
-    extracted = extract_messages(req.messages)
-    # Pass extracted context to personality engine for better adaptation
-    transformed = transform_reply(req.sample_reply, req.style, extracted)
+
+@app.post("/transform", openapi_extra=openapi_body(TransformRequest))
+async def transform_endpoint(
+    request: Request,
+    req: TransformRequest = Depends(body_of(TransformRequest)),
+    x_deadline_ms: Optional[int] = Header(None),
+    x_profile: Optional[str] = Header(None),
+):
+    if profiling_requested(x_profile):
+        return negotiated_response(await profiled(transform_response, req, x_deadline_ms), request)
+    return negotiated_response(await transform_response(req, x_deadline_ms), request)
+
+
+async def transform_response(req: TransformRequest, x_deadline_ms: Optional[int]) -> dict:
+    started = time.monotonic()
+    extracted = await run_extraction(req)
+    # Pass extracted context to personality engine for better adaptation;
+    # the LLM only gets what is left of the latency budget after extraction
+    budget = remaining_budget(started, x_deadline_ms)
+    transformed = await transform_reply_async(req.sample_reply, req.style, extracted, budget=budget)
     return {"extracted": extracted, "personality_response": transformed}
 
-@app.post("/compare")
-def compare_personalities_endpoint(req: TransformRequest):
+@app.post("/transform/batch", openapi_extra=openapi_body(BatchTransformRequest))
+async def transform_batch_endpoint(
+    request: Request,
+    req: BatchTransformRequest = Depends(body_of(BatchTransformRequest)),
+    x_deadline_ms: Optional[int] = Header(None),
+):
+    """Transform many (sample_reply, style) pairs against one message history."""
+    if len(req.items) > BATCH_MAX_ITEMS:
+        raise HTTPException(status_code=413, detail=f"At most {BATCH_MAX_ITEMS} items per batch")
+    started = time.monotonic()
+    # Extract once for the whole batch
+    extracted = await run_extraction(req)
+    pairs = [(item.sample_reply, item.style) for item in req.items]
+    results = await transform_replies_async(pairs, extracted, budget=remaining_budget(started, x_deadline_ms))
+    return negotiated_response({
+        "extracted": extracted,
+        "results": results,
+        "stats": {
+            "items": len(pairs),
+            "unique": len(set(pairs)),
+            "fallbacks": sum(result["fallback"] for result in results),
+        },
+    }, request)
+
+
+def sse_event(event: str, data) -> str:
+    return f"event: {event}\ndata: {json.dumps(data, ensure_ascii=False)}\n\n"
+
+
+@app.post("/transform/stream", openapi_extra=openapi_body(TransformRequest))
+async def transform_stream_endpoint(
+    req: TransformRequest = Depends(body_of(TransformRequest)),
+    x_deadline_ms: Optional[int] = Header(None),
+):
+    """Stream the transformed reply token by token over Server-Sent Events."""
+    started = time.monotonic()
+    extracted = await run_extraction(req)
+    budget = remaining_budget(started, x_deadline_ms)
+
+    async def events():
+        yield sse_event("extracted", extracted)
+        async for event, data in stream_transform_reply(req.sample_reply, req.style, extracted, budget=budget):
+            yield sse_event(event, data)
+
+    return StreamingResponse(
+        events(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+@app.post("/compare", openapi_extra=openapi_body(CompareRequest))
+async def compare_personalities_endpoint(
+    request: Request,
+    req: CompareRequest = Depends(body_of(CompareRequest)),
+    x_deadline_ms: Optional[int] = Header(None),
+    x_profile: Optional[str] = Header(None),
+):
     """Show before/after personality differences for the same reply."""
-    from personality_engine import show_personality_comparison
-    extracted = extract_messages(req.messages)
-    comparison = show_personality_comparison(req.sample_reply, extracted)
+    if profiling_requested(x_profile):
+        return negotiated_response(await profiled(compare_response, req, x_deadline_ms), request)
+    return negotiated_response(await compare_response(req, x_deadline_ms), request)
+
+
+async def compare_response(req: CompareRequest, x_deadline_ms: Optional[int]) -> dict:
+    started = time.monotonic()
+    extracted = await run_extraction(req)
+    # Without an X-Deadline-Ms header the comparison keeps its own deadline
+    deadline = remaining_budget(started, x_deadline_ms) if x_deadline_ms else None
+    if deadline is not None and deadline <= 0:
+        deadline = 0.001
+    comparison = await show_personality_comparison_async(
+        req.sample_reply, extracted, deadline=deadline, single_call=req.single_call
+    )
     return {"extracted_context": extracted, "personality_comparison": comparison}
 
 
+@app.on_event("startup")
+async def startup():
+    # Pick up edits to LEXICON_PATH without a restart
+    app.state.lexicon_watcher = start_lexicon_watcher(float(os.getenv("LEXICON_RELOAD_SECONDS", "30")))
+    # Connect to the LLM in the background; startup (and /health) does not wait for it
+    app.state.llm_warmup = None
+    if os.getenv("LLM_WARMUP", "1") != "0":
+        app.state.llm_warmup = asyncio.create_task(preconnect_llm())
+
+
+@app.on_event("shutdown")
+async def shutdown():
+    if app.state.lexicon_watcher is not None:
+        app.state.lexicon_watcher.stop()
+    if app.state.llm_warmup is not None and not app.state.llm_warmup.done():
+        app.state.llm_warmup.cancel()
+    await close_llm_clients()
+    TRANSFORM_CACHE.flush()
+
+
 @app.get("/")
 def root():
     return {
         "message": "Memory + Personality API", 
-        "endpoints": ["/extract", "/transform", "/compare", "/health"],
+        "endpoints": ["/extract", "/transform", "/transform/stream", "/transform/batch", "/compare", "/health", "/metrics"],
         "version": "1.0.0",
         "status": "operational"
     }
@@ -90,15 +311,16 @@ def health_check():
     return {
         "status": "healthy",
         "llm_available": api_key_available,
+        "transform_cache": TRANSFORM_CACHE.stats(),
+        "llm_coalescing": llm_coalescing_stats(),
+        "llm_circuit": LLM_CIRCUIT.stats(),
+        "llm_dispatch": LLM_DISPATCHER.stats(),
+        "lexicon": current_lexicon().stats(),
         "timestamp": "2025-12-02"
     }
 
-@app.get("/health")
-def health_check():
-    """Health check endpoint for deployment monitoring"""
-    api_key_available = bool(os.getenv('OPENROUTER_API_KEY'))
-    return {
-        "status": "healthy",
-        "llm_available": api_key_available,
-        "timestamp": "2025-12-02"
-    }
\ No newline at end of file
+
+@app.get("/metrics")
+def metrics():
+    """Prometheus scrape endpoint: per-stage latency, LLM outcomes and input sizes"""
+    return PlainTextResponse(REGISTRY.render(), media_type="text/plain; version=0.0.4")
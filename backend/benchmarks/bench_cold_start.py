@@ -0,0 +1,87 @@
+# bench_cold_start.py
+"""
+Measure cold start: import time of the app and time to first response.
+
+Each run uses a fresh interpreter. "import" is the time to import app.py.
+"ready" is the time from spawning uvicorn until /health first answers, and
+"first /extract" and "first /transform" are the latencies of the first
+requests after that. The LLM warm-up hook and the API key are turned off, so
+no request leaves the machine.
+
+Usage:
+    python benchmarks/bench_cold_start.py [--repeat 5] [--port 8765]
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import time
+import urllib.request
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+ENV = {**os.environ, "OPENROUTER_API_KEY": "", "LLM_WARMUP": "0", "LEXICON_RELOAD_SECONDS": "0"}
+IMPORT_APP = "import time; start = time.perf_counter(); import app; print(time.perf_counter() - start)"
+
+
+def measure_import():
+    output = subprocess.run([sys.executable, "-c", IMPORT_APP], cwd=BACKEND_DIR, env=ENV,
+                            capture_output=True, text=True, check=True).stdout
+    return float(output.strip().splitlines()[-1])
+
+
+def post(url, payload):
+    request = urllib.request.Request(url, data=json.dumps(payload).encode("utf-8"),
+                                     headers={"Content-Type": "application/json"})
+    start = time.perf_counter()
+    with urllib.request.urlopen(request) as response:
+        response.read()
+    return time.perf_counter() - start
+
+
+def measure_first_response(port):
+    base = f"http://127.0.0.1:{port}"
+    start = time.perf_counter()
+    server = subprocess.Popen([sys.executable, "-m", "uvicorn", "app:app", "--port", str(port), "--log-level", "warning"],
+                              cwd=BACKEND_DIR, env=ENV)
+    try:
+        while True:
+            try:
+                with urllib.request.urlopen(f"{base}/health") as response:
+                    response.read()
+                break
+            except OSError:
+                if server.poll() is not None:
+                    raise RuntimeError("uvicorn exited before answering")
+                time.sleep(0.005)
+        ready = time.perf_counter() - start
+        messages = ["I love Python and VSCode.", "I'm worried about the deadline.", "My name is Sam."]
+        extract = post(f"{base}/extract", {"messages": messages})
+        transform = post(f"{base}/transform", {"messages": messages, "style": "therapist"})
+        return ready, extract, transform
+    finally:
+        server.terminate()
+        server.wait()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--port", type=int, default=8765)
+    args = parser.parse_args()
+
+    imports = [measure_import() for _ in range(args.repeat)]
+    runs = [measure_first_response(args.port) for _ in range(args.repeat)]
+    results = {
+        "import": imports,
+        "ready": [run[0] for run in runs],
+        "first /extract": [run[1] for run in runs],
+        "first /transform": [run[2] for run in runs],
+    }
+    for name, values in results.items():
+        print(f"{name:>18}: median {statistics.median(values) * 1000:>8.1f} ms  min {min(values) * 1000:>8.1f} ms")
+
+
+if __name__ == "__main__":
+    main()
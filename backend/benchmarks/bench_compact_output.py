@@ -0,0 +1,61 @@
+# bench_compact_output.py
+"""
+Compare response size and JSON serialization time of the default extraction
+format ("context" in every finding) against compact=True.
+
+Usage:
+    python benchmarks/bench_compact_output.py [--messages 20000]
+"""
+import argparse
+import json
+import os
+import random
+import sys
+import time
+
+# Add parent directory to path so we can import the backend modules
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from memory_extractor import extract_messages
+
+CORPUS = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "test", "demo_corpus_expected.json")
+
+
+def long_messages(count, rng):
+    """Longer chat turns that each mention several keywords."""
+    keywords = ["python", "docker", "git", "github", "fastapi", "love", "worried", "frustrated", "great", "sorry"]
+    filler = "the deployment pipeline keeps failing after the latest dependency upgrade so".split()
+    messages = []
+    for _ in range(count):
+        words = [rng.choice(filler) for _ in range(rng.randint(30, 80))]
+        for _ in range(rng.randint(2, 8)):
+            words.insert(rng.randrange(len(words) + 1), rng.choice(keywords))
+        messages.append(" ".join(words))
+    return messages
+
+
+def measure(label, messages, repeat=5):
+    for compact in (False, True):
+        result = extract_messages(messages, compact=compact)
+        start = time.perf_counter()
+        for _ in range(repeat):
+            body = json.dumps(result)
+        elapsed = (time.perf_counter() - start) / repeat
+        mode = "compact" if compact else "context"
+        print(f"{label:>14} {mode:>8}: {len(body.encode('utf-8')) / 1024:>10.1f} KiB  dumps {elapsed * 1000:>8.2f} ms")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--messages", type=int, default=20000)
+    args = parser.parse_args()
+
+    with open(CORPUS, "r") as f:
+        demo = json.load(f)["messages"]
+    measure("demo x1", demo)
+    measure(f"demo x{args.messages // len(demo)}", demo * (args.messages // len(demo)))
+    measure(f"long x{args.messages}", long_messages(args.messages, random.Random(7)))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,74 @@
+# bench_fact_scanner.py
+"""
+Compare scan_facts (patterns compiled once at import) against the original
+per-message re.findall calls on raw pattern strings.
+
+Usage:
+    python benchmarks/bench_fact_scanner.py [--repeat 2000]
+"""
+import argparse
+import json
+import os
+import re
+import sys
+import time
+
+# Add parent directory to path so we can import the backend modules
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from memory_extractor import EMAIL_RE, PHONE_RE, scan_facts
+
+CORPUS = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "test", "demo_corpus_expected.json")
+
+
+def findall_facts(message):
+    """Fact extraction as extract_messages did it before FACT_PATTERNS."""
+    message_lower = message.lower()
+    facts = [("email", email) for email in EMAIL_RE.findall(message)]
+    facts += [("phone", phone) for phone in PHONE_RE.findall(message)]
+    name_patterns = [
+        r"my name is (\w+)",
+        r"i'm (\w+)",
+        r"i am (\w+)"
+    ]
+    for pattern in name_patterns:
+        facts += [("name", match.capitalize()) for match in re.findall(pattern, message_lower)]
+    location_patterns = [
+        r"in ([A-Z][a-z]+(?:\s+[A-Z][a-z]+)*)",
+        r"from ([A-Z][a-z]+(?:\s+[A-Z][a-z]+)*)",
+        r"living in ([A-Z][a-z]+(?:\s+[A-Z][a-z]+)*)"
+    ]
+    for pattern in location_patterns:
+        facts += [("location", match) for match in re.findall(pattern, message)]
+    mentor_patterns = [
+        r"my mentor is ([A-Z][a-z]+(?:\s+[A-Z]\.?\s*[A-Z][a-z]+)*)"
+    ]
+    for pattern in mentor_patterns:
+        facts += [("mentor", match) for match in re.findall(pattern, message)]
+    return facts
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--repeat", type=int, default=2000)
+    args = parser.parse_args()
+
+    with open(CORPUS, "r") as f:
+        messages = json.load(f)["messages"] * args.repeat
+
+    for message in messages[:30]:
+        assert scan_facts(message) == findall_facts(message)
+
+    results = {}
+    for label, fn in (("findall", findall_facts), ("compiled", scan_facts)):
+        start = time.perf_counter()
+        for message in messages:
+            fn(message)
+        elapsed = time.perf_counter() - start
+        results[label] = elapsed
+        print(f"{label:>8}: {elapsed:.3f}s  {len(messages) / elapsed:,.0f} messages/s")
+    print(f"speedup: {results['findall'] / results['compiled']:.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,77 @@
+# bench_keyword_matcher.py
+"""
+Compare the single-pass KeywordMatcher against the per-keyword substring scan
+as the lexicon grows.
+
+Usage:
+    python benchmarks/bench_keyword_matcher.py [--messages 2000]
+"""
+import argparse
+import os
+import random
+import string
+import sys
+import time
+
+# Add parent directory to path so we can import the backend modules
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from keyword_matcher import KeywordMatcher
+from memory_extractor import PREF_MAP, EMOTION_MAP
+
+
+def naive_find(keywords, text_lower):
+    """Per-keyword substring scan, as extract_messages did before the matcher."""
+    return [i for i, keyword in enumerate(keywords) if keyword.lower() in text_lower]
+
+
+def synthetic_lexicon(size, rng):
+    base = [k for group in (PREF_MAP, EMOTION_MAP) for keywords in group.values() for k in keywords]
+    lexicon = list(base)
+    while len(lexicon) < size:
+        lexicon.append("".join(rng.choice(string.ascii_lowercase) for _ in range(rng.randint(4, 12))))
+    return lexicon[:size]
+
+
+def synthetic_messages(count, lexicon, rng):
+    filler = "i think we should look at the results again before the next meeting".split()
+    messages = []
+    for _ in range(count):
+        words = [rng.choice(filler) for _ in range(rng.randint(8, 25))]
+        for _ in range(rng.randint(0, 3)):
+            words.insert(rng.randrange(len(words) + 1), rng.choice(lexicon))
+        messages.append(" ".join(words).lower())
+    return messages
+
+
+def time_it(fn, messages):
+    start = time.perf_counter()
+    for message in messages:
+        fn(message)
+    return time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--messages", type=int, default=2000)
+    parser.add_argument("--sizes", default="30,300,3000,10000")
+    args = parser.parse_args()
+
+    rng = random.Random(42)
+    print(f"{'lexicon':>8} {'naive (s)':>10} {'matcher (s)':>12} {'speedup':>8}")
+    for size in [int(s) for s in args.sizes.split(",")]:
+        lexicon = synthetic_lexicon(size, rng)
+        messages = synthetic_messages(args.messages, lexicon, rng)
+        matcher = KeywordMatcher(lexicon)
+
+        # Both paths must agree before their timings mean anything
+        for message in messages[:200]:
+            assert matcher.find(message) == naive_find(lexicon, message)
+
+        naive = time_it(lambda m: naive_find(lexicon, m), messages)
+        compiled = time_it(matcher.find, messages)
+        print(f"{size:>8} {naive:>10.4f} {compiled:>12.4f} {naive / compiled:>7.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,83 @@
+# bench_serialization.py
+"""
+Time POST /extract end to end for large message lists and show how much of
+it is request parsing and response encoding rather than extraction.
+
+Runs the app in-process (no server or network needed). "overhead" is the
+request time minus a direct extract_messages call on the same messages.
+
+Usage:
+    python benchmarks/bench_serialization.py [--sizes 10000,100000] [--repeat 3]
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import sys
+import time
+
+import httpx
+
+# Add parent directory to path so we can import the backend modules
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app import app
+from memory_extractor import extract_messages
+from serialization import msgpack
+
+KEYWORDS = ["python", "docker", "git", "love", "worried", "great", "sorry", "fastapi"]
+FILLER = "i think we should look at the results again before the next meeting so that".split()
+
+
+def corpus(count, rng):
+    messages = []
+    for _ in range(count):
+        words = [rng.choice(FILLER) for _ in range(rng.randint(8, 30))]
+        for _ in range(rng.randint(0, 3)):
+            words.insert(rng.randrange(len(words) + 1), rng.choice(KEYWORDS))
+        messages.append(" ".join(words))
+    return messages
+
+
+async def time_request(client, body, headers, repeat):
+    best, size = None, 0
+    for _ in range(repeat):
+        start = time.perf_counter()
+        response = await client.post("/extract", content=body, headers=headers)
+        elapsed = time.perf_counter() - start
+        response.raise_for_status()
+        size = len(response.content)
+        best = elapsed if best is None else min(best, elapsed)
+    return best, size
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--sizes", default="10000,100000")
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    formats = [("json", "application/json")]
+    if msgpack is not None:
+        formats.append(("msgpack", "application/msgpack"))
+
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=None) as client:
+        for size in (int(s) for s in args.sizes.split(",")):
+            messages = corpus(size, random.Random(7))
+            start = time.perf_counter()
+            extract_messages(messages)
+            extraction = time.perf_counter() - start
+            for name, media_type in formats:
+                payload = {"messages": messages}
+                body = msgpack.packb(payload) if name == "msgpack" else json.dumps(payload).encode("utf-8")
+                headers = {"Content-Type": media_type, "Accept": media_type}
+                elapsed, response_size = await time_request(client, body, headers, args.repeat)
+                print(f"{size:>8} msgs {name:>8}: request {elapsed * 1000:>9.1f} ms  "
+                      f"overhead {(elapsed - extraction) * 1000:>9.1f} ms  "
+                      f"response {response_size / 1024:>9.1f} KiB")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
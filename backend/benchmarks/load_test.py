@@ -0,0 +1,210 @@
+# load_test.py
+"""
+Drive the API at a target concurrency and report latency percentiles and throughput per endpoint.
+
+By default the FastAPI app runs in-process (no server needed); --url targets a
+running server instead. --mock starts benchmarks/mock_openrouter.py and points
+the in-process app at it, so the LLM, cache and fallback paths are exercised
+without calling OpenRouter.
+
+Usage:
+    python benchmarks/load_test.py --mock --concurrency 50 --requests 1000
+    python benchmarks/load_test.py --mock --latency lognormal:400:0.6 --rate-limit-rate 0.1 --endpoints transform
+    python benchmarks/load_test.py --url http://127.0.0.1:8000 --endpoints transform,compare,transform/stream
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import subprocess
+import sys
+import time
+
+import httpx
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+# Add parent directory to path so we can import the backend modules
+sys.path.append(BACKEND_DIR)
+
+MESSAGES = [
+    "I love Python and I'm learning FastAPI",
+    "I'm worried about my machine learning project deadline",
+    "My name is Alex and I live in Berlin",
+    "I feel frustrated when Docker builds fail",
+]
+STYLES = ["calm_mentor", "witty_friend", "therapist"]
+
+
+def percentile(sorted_values, pct):
+    """Nearest-rank percentile of an already sorted list."""
+    if not sorted_values:
+        return None
+    rank = max(0, min(len(sorted_values) - 1, int(round(pct / 100 * len(sorted_values) + 0.5)) - 1))
+    return sorted_values[rank]
+
+
+def payload(i, unique, rng):
+    # With unique < 1 some requests repeat an earlier reply and can hit the transform cache
+    n = i if rng.random() < unique else rng.randrange(16)
+    return {
+        "messages": MESSAGES,
+        "style": STYLES[n % len(STYLES)],
+        "sample_reply": f"Here is a suggested plan, step {n}.",
+    }
+
+
+async def one_request(client, endpoint, body):
+    """Return (latency, first_byte_latency, ok, used_llm) for one request."""
+    start = time.perf_counter()
+    if endpoint == "transform/stream":
+        first = None
+        used_llm = False
+        async with client.stream("POST", "/transform/stream", json=body) as response:
+            async for line in response.aiter_lines():
+                if first is None and line.startswith("event: token"):
+                    first = time.perf_counter() - start
+                if line.startswith("data:") and '"used_llm": true' in line:
+                    used_llm = True
+        return time.perf_counter() - start, first, response.status_code == 200, used_llm
+
+    response = await client.post(f"/{endpoint}", json=body)
+    latency = time.perf_counter() - start
+    ok = response.status_code == 200
+    used_llm = False
+    if ok:
+        data = response.json()
+        if endpoint == "transform":
+            used_llm = data["personality_response"].get("used_llm", False)
+        else:
+            used_llm = all(v.get("used_llm", False) for v in data["personality_comparison"]["personality_variations"])
+    return latency, None, ok, used_llm
+
+
+async def run_endpoint(client, endpoint, concurrency, total, unique, seed):
+    rng = random.Random(seed)
+    bodies = [payload(i, unique, rng) for i in range(total)]
+    latencies, first_bytes = [], []
+    counts = {"errors": 0, "llm": 0}
+    next_index = iter(range(total))
+
+    async def worker():
+        for i in next_index:
+            try:
+                latency, first, ok, used_llm = await one_request(client, endpoint, bodies[i])
+            except Exception:
+                counts["errors"] += 1
+                continue
+            latencies.append(latency)
+            if first is not None:
+                first_bytes.append(first)
+            counts["errors"] += not ok
+            counts["llm"] += used_llm
+
+    start = time.perf_counter()
+    await asyncio.gather(*[worker() for _ in range(concurrency)])
+    elapsed = time.perf_counter() - start
+
+    latencies.sort()
+    first_bytes.sort()
+    ms = lambda value: round(value * 1000, 2) if value is not None else None
+    report = {
+        "requests": total,
+        "concurrency": concurrency,
+        "seconds": round(elapsed, 3),
+        "throughput_rps": round(total / elapsed, 2),
+        "errors": counts["errors"],
+        "llm_responses": counts["llm"],
+        "fallback_responses": len(latencies) - counts["llm"] - counts["errors"],
+        "p50_ms": ms(percentile(latencies, 50)),
+        "p95_ms": ms(percentile(latencies, 95)),
+        "p99_ms": ms(percentile(latencies, 99)),
+        "max_ms": ms(latencies[-1] if latencies else None),
+    }
+    if first_bytes:
+        report["first_token_p50_ms"] = ms(percentile(first_bytes, 50))
+        report["first_token_p95_ms"] = ms(percentile(first_bytes, 95))
+    return report
+
+
+def start_mock(args):
+    """Start the mock OpenRouter server and wait until it answers."""
+    command = [
+        sys.executable, os.path.join(BACKEND_DIR, "benchmarks", "mock_openrouter.py"),
+        "--port", str(args.mock_port), "--latency", args.latency,
+        "--error-rate", str(args.error_rate), "--rate-limit-rate", str(args.rate_limit_rate),
+    ]
+    process = subprocess.Popen(command)
+    deadline = time.monotonic() + 15
+    while time.monotonic() < deadline:
+        try:
+            httpx.get(f"http://127.0.0.1:{args.mock_port}/stats", timeout=0.5)
+            return process
+        except httpx.HTTPError:
+            time.sleep(0.1)
+    process.kill()
+    raise RuntimeError("Mock OpenRouter server did not start")
+
+
+async def run(args):
+    if args.url:
+        client = httpx.AsyncClient(base_url=args.url, timeout=args.timeout,
+                                   limits=httpx.Limits(max_connections=args.concurrency))
+    else:
+        from app import app  # Imported late so --mock can configure the engine first
+        client = httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://loadtest",
+                                   timeout=args.timeout)
+
+    results = {}
+    async with client:
+        for endpoint in args.endpoints.split(","):
+            endpoint = endpoint.strip("/")
+            results[endpoint] = await run_endpoint(client, endpoint, args.concurrency, args.requests, args.unique, args.seed)
+            r = results[endpoint]
+            print(f"/{endpoint:<17} {r['throughput_rps']:>8.1f} req/s  p50 {r['p50_ms']:>8.1f} ms  "
+                  f"p95 {r['p95_ms']:>8.1f} ms  p99 {r['p99_ms']:>8.1f} ms  "
+                  f"errors {r['errors']}  fallbacks {r['fallback_responses']}", flush=True)
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--url", help="base URL of a running server (default: run the app in-process)")
+    parser.add_argument("--endpoints", default="transform,compare")
+    parser.add_argument("--concurrency", type=int, default=50)
+    parser.add_argument("--requests", type=int, default=500, help="requests per endpoint")
+    parser.add_argument("--unique", type=float, default=1.0, help="fraction of requests with a unique reply (lower means more cache hits)")
+    parser.add_argument("--timeout", type=float, default=120)
+    parser.add_argument("--seed", type=int, default=7)
+    parser.add_argument("--output", help="write the JSON report here")
+    mock = parser.add_argument_group("mock OpenRouter (in-process runs only)")
+    mock.add_argument("--mock", action="store_true", help="start the mock and point the app at it")
+    mock.add_argument("--mock-port", type=int, default=8099)
+    mock.add_argument("--latency", default="fixed:200")
+    mock.add_argument("--error-rate", type=float, default=0.0)
+    mock.add_argument("--rate-limit-rate", type=float, default=0.0)
+    args = parser.parse_args()
+
+    if args.mock and args.url:
+        parser.error("--mock configures the in-process app; start the server against the mock yourself with --url")
+
+    process = None
+    if args.mock:
+        process = start_mock(args)
+        os.environ["OPENROUTER_BASE_URL"] = f"http://127.0.0.1:{args.mock_port}/api/v1"
+        os.environ.setdefault("OPENROUTER_API_KEY", "mock-key")
+    try:
+        results = asyncio.run(run(args))
+    finally:
+        if process is not None:
+            process.terminate()
+            process.wait()
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump({"config": vars(args), "results": results}, f, indent=2)
+        print(f"Report written to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
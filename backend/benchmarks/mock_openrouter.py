@@ -0,0 +1,159 @@
+# mock_openrouter.py
+"""
+Local stand-in for the OpenRouter chat-completions endpoint, for load tests.
+
+Serves POST /api/v1/chat/completions (and /v1/chat/completions) with
+configurable latency, error and 429 rates, and streaming. Point the backend
+at it with OPENROUTER_BASE_URL=http://127.0.0.1:8099/api/v1 and any
+OPENROUTER_API_KEY.
+
+Usage:
+    python benchmarks/mock_openrouter.py --latency lognormal:300:0.5 --error-rate 0.02 --rate-limit-rate 0.05
+"""
+import argparse
+import asyncio
+import json
+import random
+import re
+import time
+import uuid
+
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse, StreamingResponse
+
+DEFAULT_REPLY = (
+    "Let's take this one step at a time: start with the failing tests, then the data loader. "
+    "Reasoning: kept the technical steps and softened the delivery."
+)
+
+
+class LatencyModel:
+    """Samples response latency in seconds from a spec like "fixed:200",
+    "uniform:100:400", "normal:300:50" or "lognormal:300:0.5" (median ms, sigma)."""
+
+    def __init__(self, spec: str, rng: random.Random):
+        kind, *params = spec.split(":")
+        self.kind = kind
+        self.params = [float(p) for p in params]
+        self.rng = rng
+        if kind not in ("fixed", "uniform", "normal", "lognormal"):
+            raise ValueError(f"Unknown latency distribution '{kind}'")
+
+    def sample(self) -> float:
+        p = self.params
+        if self.kind == "fixed":
+            ms = p[0]
+        elif self.kind == "uniform":
+            ms = self.rng.uniform(p[0], p[1])
+        elif self.kind == "normal":
+            ms = self.rng.gauss(p[0], p[1])
+        else:
+            ms = p[0] * self.rng.lognormvariate(0, p[1])
+        return max(0.0, ms) / 1000
+
+
+def mock_content(body: dict) -> str:
+    """Reply text; JSON with one entry per style for structured comparison calls."""
+    if (body.get("response_format") or {}).get("type") == "json_object":
+        user_prompt = body["messages"][-1]["content"]
+        match = re.search(r"each of these styles: ([\w, ]+)\.", user_prompt)
+        styles = match.group(1).split(", ") if match else ["calm_mentor"]
+        return json.dumps({
+            style: {"transformed_reply": f"[{style}] {DEFAULT_REPLY.split(' Reasoning:')[0]}", "reasoning": "mock"}
+            for style in styles
+        })
+    return DEFAULT_REPLY
+
+
+def create_app(latency: str = "fixed:200", error_rate: float = 0.0, rate_limit_rate: float = 0.0,
+               token_delay_ms: float = 20, seed: int = None) -> FastAPI:
+    rng = random.Random(seed)
+    latency_model = LatencyModel(latency, rng)
+    app = FastAPI(title="Mock OpenRouter")
+    app.state.counts = {"requests": 0, "errors": 0, "rate_limited": 0, "streams": 0}
+
+    async def chat_completions(request: Request):
+        body = await request.json()
+        counts = app.state.counts
+        counts["requests"] += 1
+        await asyncio.sleep(latency_model.sample())
+
+        roll = rng.random()
+        if roll < rate_limit_rate:
+            counts["rate_limited"] += 1
+            return JSONResponse(
+                {"error": {"message": "Rate limit exceeded", "code": 429}},
+                status_code=429, headers={"Retry-After": "1"},
+            )
+        if roll < rate_limit_rate + error_rate:
+            counts["errors"] += 1
+            return JSONResponse({"error": {"message": "Upstream provider error", "code": 502}}, status_code=502)
+
+        content = mock_content(body)
+        completion_id = f"gen-{uuid.uuid4().hex[:12]}"
+        created = int(time.time())
+        model = body.get("model", "mock")
+
+        if body.get("stream"):
+            counts["streams"] += 1
+
+            async def events():
+                # Word-sized chunks, like a real token stream
+                for piece in re.findall(r"\S+\s*", content):
+                    chunk = {
+                        "id": completion_id, "object": "chat.completion.chunk", "created": created, "model": model,
+                        "choices": [{"index": 0, "delta": {"content": piece}, "finish_reason": None}],
+                    }
+                    yield f"data: {json.dumps(chunk)}\n\n"
+                    await asyncio.sleep(token_delay_ms / 1000)
+                done = {
+                    "id": completion_id, "object": "chat.completion.chunk", "created": created, "model": model,
+                    "choices": [{"index": 0, "delta": {}, "finish_reason": "stop"}],
+                }
+                yield f"data: {json.dumps(done)}\n\n"
+                yield "data: [DONE]\n\n"
+
+            return StreamingResponse(events(), media_type="text/event-stream")
+
+        prompt_chars = sum(len(m.get("content", "")) for m in body.get("messages", []))
+        return {
+            "id": completion_id,
+            "object": "chat.completion",
+            "created": created,
+            "model": model,
+            "choices": [{"index": 0, "message": {"role": "assistant", "content": content}, "finish_reason": "stop"}],
+            "usage": {
+                "prompt_tokens": prompt_chars // 4,
+                "completion_tokens": len(content) // 4,
+                "total_tokens": (prompt_chars + len(content)) // 4,
+            },
+        }
+
+    app.add_api_route("/api/v1/chat/completions", chat_completions, methods=["POST"])
+    app.add_api_route("/v1/chat/completions", chat_completions, methods=["POST"])
+
+    @app.get("/stats")
+    def stats():
+        return app.state.counts
+
+    return app
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8099)
+    parser.add_argument("--latency", default="fixed:200", help="fixed:MS | uniform:LO:HI | normal:MEAN:SD | lognormal:MEDIAN:SIGMA")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="fraction of requests answered with 502")
+    parser.add_argument("--rate-limit-rate", type=float, default=0.0, help="fraction of requests answered with 429")
+    parser.add_argument("--token-delay-ms", type=float, default=20, help="delay between streamed chunks")
+    parser.add_argument("--seed", type=int)
+    args = parser.parse_args()
+
+    import uvicorn
+    app = create_app(args.latency, args.error_rate, args.rate_limit_rate, args.token_delay_ms, args.seed)
+    uvicorn.run(app, host=args.host, port=args.port, log_level="warning")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,172 @@
+# run_benchmarks.py
+"""
+Offline microbenchmark suite for the extractor and the rule-based personality engine.
+
+Times extract_messages on synthetic corpora of different sizes and keyword
+densities, transform_reply_rule_based, show_personality_comparison in
+rule-based mode, and JSON serialization of their results. Writes a JSON
+report and, given a saved baseline report, flags benchmarks that got slower.
+
+Usage:
+    python benchmarks/run_benchmarks.py --output report.json
+    python benchmarks/run_benchmarks.py --sizes 10,1000,100000,1000000
+    python benchmarks/run_benchmarks.py --baseline baseline.json --tolerance 0.15
+"""
+import argparse
+import json
+import os
+import platform
+import random
+import sys
+import time
+
+# Add parent directory to path so we can import the backend modules
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# Rule-based mode only: the suite must never reach the network
+os.environ.pop("OPENROUTER_API_KEY", None)
+
+from memory_extractor import extract_messages, PREF_MAP, EMOTION_MAP
+from personality_engine import transform_reply_rule_based, show_personality_comparison, STYLE_INSTRUCTIONS
+
+# Keywords inserted per message for each density
+DENSITIES = {"low": (0, 1), "medium": (2, 4), "high": (6, 10)}
+FILLER = "i think we should look at the results again before the next meeting so that".split()
+FACT_SENTENCES = [
+    "My name is Alex", "I live in Berlin", "You can reach me at alex@example.com",
+    "call me on 5551234567", "my mentor is Dana",
+]
+SAMPLE_REPLY = "Start by reviewing the failing tests, then fix the data loader before retraining."
+
+
+def synthetic_corpus(count, density, rng):
+    """Chat-like messages with a given number of lexicon keywords each."""
+    keywords = [k for group in (PREF_MAP, EMOTION_MAP) for values in group.values() for k in values]
+    low, high = DENSITIES[density]
+    messages = []
+    for _ in range(count):
+        words = [rng.choice(FILLER) for _ in range(rng.randint(8, 30))]
+        for _ in range(rng.randint(low, high)):
+            words.insert(rng.randrange(len(words) + 1), rng.choice(keywords))
+        if density != "low" and rng.random() < 0.1:
+            words.append(rng.choice(FACT_SENTENCES))
+        messages.append(" ".join(words))
+    return messages
+
+
+def measure(fn, repeat):
+    """Best wall time of repeat runs, in seconds."""
+    best = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best
+
+
+def repeats_for(items, repeat):
+    # Large inputs are slow enough to time once
+    return repeat if items <= 10000 else 1
+
+
+def run_suite(sizes, densities, repeat, calls):
+    results = {}
+
+    def record(name, seconds, items):
+        results[name] = {"seconds": round(seconds, 6), "items": items, "us_per_item": round(seconds / items * 1e6, 3)}
+        print(f"{name:<48} {seconds * 1000:>11.2f} ms  {seconds / items * 1e6:>9.2f} us/item", flush=True)
+
+    rng = random.Random(1234)
+    for density in densities:
+        corpus = synthetic_corpus(max(sizes), density, rng)
+        for size in sizes:
+            messages = corpus[:size]
+            extracted = extract_messages(messages)
+            record(f"extract_messages[{density},{size}]",
+                   measure(lambda: extract_messages(messages), repeats_for(size, repeat)), size)
+            record(f"json_dumps_extracted[{density},{size}]",
+                   measure(lambda: json.dumps(extracted), repeats_for(size, repeat)), size)
+        del corpus
+
+    context = extract_messages(synthetic_corpus(50, "medium", rng))
+    styles = list(STYLE_INSTRUCTIONS)
+    for style in styles:
+        record(f"transform_reply_rule_based[{style}]",
+               measure(lambda: [transform_reply_rule_based(SAMPLE_REPLY, style, context) for _ in range(calls)], repeat),
+               calls)
+
+    comparison = show_personality_comparison(SAMPLE_REPLY, context)
+    record("show_personality_comparison[rule_based]",
+           measure(lambda: [show_personality_comparison(SAMPLE_REPLY, context) for _ in range(calls)], repeat), calls)
+    record("json_dumps_comparison",
+           measure(lambda: [json.dumps(comparison) for _ in range(calls)], repeat), calls)
+    return results
+
+
+def compare_to_baseline(results, baseline, tolerance):
+    """Print per-benchmark ratios against the baseline and return the regressions."""
+    regressions = []
+    print(f"\n{'benchmark':<48} {'baseline':>11} {'current':>11} {'ratio':>7}")
+    for name, current in results.items():
+        previous = baseline.get("results", {}).get(name)
+        if previous is None:
+            print(f"{name:<48} {'-':>11} {current['seconds'] * 1000:>9.2f}ms {'new':>7}")
+            continue
+        ratio = current["seconds"] / previous["seconds"] if previous["seconds"] else float("inf")
+        flag = " REGRESSION" if ratio > 1 + tolerance else ""
+        print(f"{name:<48} {previous['seconds'] * 1000:>9.2f}ms {current['seconds'] * 1000:>9.2f}ms {ratio:>6.2f}x{flag}")
+        if flag:
+            regressions.append({"name": name, "baseline": previous["seconds"], "current": current["seconds"], "ratio": round(ratio, 3)})
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--sizes", default="10,1000,100000", help="comma-separated message counts (up to 1000000)")
+    parser.add_argument("--densities", default=",".join(DENSITIES), help="comma-separated keyword densities")
+    parser.add_argument("--repeat", type=int, default=5, help="runs per benchmark, best time is kept")
+    parser.add_argument("--calls", type=int, default=1000, help="calls per rule-based engine benchmark")
+    parser.add_argument("--output", help="write the JSON report here")
+    parser.add_argument("--baseline", help="JSON report to compare against")
+    parser.add_argument("--tolerance", type=float, default=0.2, help="allowed slowdown before flagging, as a fraction")
+    args = parser.parse_args()
+
+    sizes = [int(size) for size in args.sizes.split(",")]
+    densities = args.densities.split(",")
+    for density in densities:
+        if density not in DENSITIES:
+            parser.error(f"unknown density '{density}' (choose from {', '.join(DENSITIES)})")
+
+    report = {
+        "meta": {
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "cpu_count": os.cpu_count(),
+            "timestamp": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()),
+            "sizes": sizes,
+            "densities": densities,
+            "repeat": args.repeat,
+            "calls": args.calls,
+        },
+        "results": run_suite(sizes, densities, args.repeat, args.calls),
+    }
+
+    exit_code = 0
+    if args.baseline:
+        with open(args.baseline, "r") as f:
+            baseline = json.load(f)
+        report["regressions"] = compare_to_baseline(report["results"], baseline, args.tolerance)
+        if report["regressions"]:
+            print(f"\n{len(report['regressions'])} benchmark(s) slower than the baseline by more than {args.tolerance:.0%}")
+            exit_code = 1
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
+        print(f"\nReport written to {args.output}")
+    sys.exit(exit_code)
+
+
+if __name__ == "__main__":
+    main()
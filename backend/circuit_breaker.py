@@ -0,0 +1,79 @@
+# circuit_breaker.py
+import threading
+import time
+from typing import Dict
+
+
+class CircuitOpenError(Exception):
+    """Raised instead of calling a dependency whose circuit is open."""
+
+
+class CircuitBreaker:
+    """Stop calling a failing dependency, then probe periodically until it recovers.
+
+    closed:    calls go through; failure_threshold consecutive failures open it
+    open:      calls are skipped until recovery_timeout seconds have passed
+    half_open: a single probe call is let through; success closes the circuit,
+               failure opens it again
+    """
+
+    def __init__(self, failure_threshold: int = 5, recovery_timeout: float = 30):
+        self.failure_threshold = failure_threshold
+        self.recovery_timeout = recovery_timeout
+        self.state = "closed"
+        self.consecutive_failures = 0
+        self.opened_at = None
+        self.short_circuited = 0
+        self._probe_in_flight = False
+        self._lock = threading.Lock()
+
+    def allow(self) -> bool:
+        """Whether a call may go through now (reserves the probe when half-open)."""
+        with self._lock:
+            if self.state == "open" and time.monotonic() - self.opened_at >= self.recovery_timeout:
+                self.state = "half_open"
+                self._probe_in_flight = False
+            if self.state == "closed":
+                return True
+            if self.state == "half_open" and not self._probe_in_flight:
+                self._probe_in_flight = True
+                return True
+            self.short_circuited += 1
+            return False
+
+    def release_probe(self) -> None:
+        """Give back the half-open probe reserved by allow() for a call that recorded no outcome.
+
+        For calls that were shed or cancelled before they could tell anything
+        about the dependency; a no-op once the probe's success or failure has
+        been recorded.
+        """
+        with self._lock:
+            if self.state == "half_open":
+                self._probe_in_flight = False
+
+    def record_success(self) -> None:
+        with self._lock:
+            self.state = "closed"
+            self.consecutive_failures = 0
+            self.opened_at = None
+            self._probe_in_flight = False
+
+    def record_failure(self) -> None:
+        with self._lock:
+            self.consecutive_failures += 1
+            if self.state == "half_open" or self.consecutive_failures >= self.failure_threshold:
+                self.state = "open"
+                self.opened_at = time.monotonic()
+                self._probe_in_flight = False
+
+    def stats(self) -> Dict:
+        return {
+            "state": self.state,
+            "consecutive_failures": self.consecutive_failures,
+            "short_circuited": self.short_circuited,
+            "retry_in_seconds": (
+                round(max(0.0, self.recovery_timeout - (time.monotonic() - self.opened_at)), 1)
+                if self.state == "open" else None
+            ),
+        }
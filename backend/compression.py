@@ -0,0 +1,164 @@
+# compression.py
+import os
+import zlib
+from typing import Optional
+
+from anyio import to_thread
+from starlette.datastructures import Headers, MutableHeaders
+
+# zstd is optional: without zstandard only gzip is offered and accepted
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+DECODE_ERRORS = (zlib.error, zstandard.ZstdError) if zstandard is not None else (zlib.error,)
+
+# Requests may not inflate past this, however small the compressed upload
+MAX_DECOMPRESSED_BYTES = int(os.getenv("MAX_DECOMPRESSED_BYTES", str(64 * 1024 * 1024)))
+COMPRESSION_MIN_BYTES = int(os.getenv("COMPRESSION_MIN_BYTES", "1024"))
+GZIP_LEVEL = int(os.getenv("GZIP_LEVEL", "5"))
+ZSTD_LEVEL = int(os.getenv("ZSTD_LEVEL", "3"))
+# Bodies above this are compressed in a worker thread instead of on the event loop
+THREADED_COMPRESSION_BYTES = 256 * 1024
+# Compressed request bodies above this are inflated in a worker thread; JSON
+# compresses about 10x, so this is roughly the same amount of work
+THREADED_DECOMPRESSION_BYTES = 32 * 1024
+
+
+class BodyDecodeError(ValueError):
+    """A request body that cannot be decoded; status_code is the HTTP status to answer with."""
+
+    def __init__(self, message: str, status_code: int = 400):
+        super().__init__(message)
+        self.status_code = status_code
+
+
+def supported_encodings():
+    return ("zstd", "gzip") if zstandard is not None else ("gzip",)
+
+
+def decompress_body(body: bytes, content_encoding: Optional[str], limit: int = None) -> bytes:
+    """Decode a request body per its Content-Encoding, refusing to inflate past limit bytes."""
+    encoding = (content_encoding or "identity").strip().lower()
+    limit = MAX_DECOMPRESSED_BYTES if limit is None else limit
+    if encoding == "identity":
+        return body
+    if encoding not in supported_encodings():
+        raise BodyDecodeError(f"Unsupported Content-Encoding '{encoding}'", 415)
+
+    try:
+        if encoding == "gzip":
+            decompressor = zlib.decompressobj(wbits=16 + zlib.MAX_WBITS)
+            data = decompressor.decompress(body, limit + 1)
+            complete = decompressor.eof
+        else:
+            reader = zstandard.ZstdDecompressor().stream_reader(body)
+            chunks, size = [], 0
+            while size <= limit:
+                chunk = reader.read(min(1024 * 1024, limit + 1 - size))
+                if not chunk:
+                    break
+                chunks.append(chunk)
+                size += len(chunk)
+            data = b"".join(chunks)
+            # The reader stops quietly at a truncated frame; with the output
+            # known to be bounded, a second pass can tell
+            complete = True
+            if size <= limit:
+                check = zstandard.ZstdDecompressor().decompressobj()
+                check.decompress(body)
+                complete = check.eof
+    except DECODE_ERRORS as e:
+        raise BodyDecodeError(f"Invalid {encoding} request body: {e}")
+    if len(data) > limit:
+        raise BodyDecodeError(f"Decompressed request body exceeds {limit} bytes", 413)
+    if not complete:
+        raise BodyDecodeError(f"Truncated {encoding} request body")
+    return data
+
+
+async def decompress_body_async(body: bytes, content_encoding: Optional[str], limit: int = None) -> bytes:
+    """decompress_body for the event loop: large compressed bodies are inflated in a worker thread."""
+    if len(body) > THREADED_DECOMPRESSION_BYTES and (content_encoding or "identity").strip().lower() != "identity":
+        return await to_thread.run_sync(decompress_body, body, content_encoding, limit)
+    return decompress_body(body, content_encoding, limit)
+
+
+def choose_encoding(accept_encoding: str) -> Optional[str]:
+    """Preferred supported encoding in an Accept-Encoding header (zstd over gzip), if any."""
+    accepted = {}
+    for part in accept_encoding.split(","):
+        name, _, params = part.strip().partition(";")
+        quality = 1.0
+        if params.strip().startswith("q="):
+            try:
+                quality = float(params.strip()[2:])
+            except ValueError:
+                quality = 0.0
+        accepted[name.strip().lower()] = quality
+    for encoding in supported_encodings():
+        if accepted.get(encoding, accepted.get("*", 0)) > 0:
+            return encoding
+    return None
+
+
+def compress(body: bytes, encoding: str) -> bytes:
+    if encoding == "zstd":
+        return zstandard.ZstdCompressor(level=ZSTD_LEVEL).compress(body)
+    compressor = zlib.compressobj(GZIP_LEVEL, zlib.DEFLATED, 16 + zlib.MAX_WBITS)
+    return compressor.compress(body) + compressor.flush()
+
+
+class CompressionMiddleware:
+    """Compress complete responses of at least minimum_size bytes with zstd or gzip.
+
+    The encoding follows the client's Accept-Encoding. Streamed responses
+    (SSE, NDJSON) are passed through untouched so every event still goes out
+    as soon as it is produced.
+    """
+
+    def __init__(self, app, minimum_size: int = COMPRESSION_MIN_BYTES):
+        self.app = app
+        self.minimum_size = minimum_size
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        encoding = choose_encoding(Headers(scope=scope).get("accept-encoding", ""))
+        if encoding is None:
+            await self.app(scope, receive, send)
+            return
+
+        start = None
+
+        async def send_compressed(message):
+            nonlocal start
+            if message["type"] == "http.response.start":
+                start = message  # Held back until we know whether to compress
+                return
+            if message["type"] != "http.response.body" or start is None:
+                await send(message)
+                return
+
+            response_start, start = start, None
+            headers = MutableHeaders(raw=response_start["headers"])
+            body = message.get("body", b"")
+            if message.get("more_body") or "content-encoding" in headers:
+                await send(response_start)
+                await send(message)
+                return
+
+            headers.add_vary_header("Accept-Encoding")
+            if len(body) >= self.minimum_size:
+                if len(body) > THREADED_COMPRESSION_BYTES:
+                    body = await to_thread.run_sync(compress, body, encoding)
+                else:
+                    body = compress(body, encoding)
+                headers["Content-Encoding"] = encoding
+                headers["Content-Length"] = str(len(body))
+            await send(response_start)
+            await send({"type": "http.response.body", "body": body})
+
+        await self.app(scope, receive, send_compressed)
@@ -0,0 +1,134 @@
+#!/usr/bin/env python3
+"""
+Stream memory extraction over message files of any size.
+
+Reads messages incrementally from a JSON Lines file (one JSON string, or an
+object with a "message" field, per line) or a JSON array of strings, and
+writes one NDJSON line of findings per message. Memory use stays flat no
+matter how large the input is.
+
+Usage:
+    python extract_stream.py messages.jsonl > findings.ndjson
+    cat export.json | python extract_stream.py - --format json
+"""
+import argparse
+import json
+import sys
+from typing import IO, Iterator
+
+from memory_extractor import iter_extractions
+
+READ_SIZE = 1 << 16
+
+
+def _message_text(item) -> str:
+    if isinstance(item, dict):
+        item = item.get("message")
+    if not isinstance(item, str):
+        raise ValueError(f"Expected a message string, got {type(item).__name__}")
+    return item
+
+
+def iter_jsonl(stream: IO[str]) -> Iterator[str]:
+    """Yield messages from JSON Lines, skipping blank lines."""
+    for line in stream:
+        if line.strip():
+            yield _message_text(json.loads(line))
+
+
+def iter_json_array(stream: IO[str]) -> Iterator[str]:
+    """Yield messages from a JSON array without loading the whole array."""
+    decoder = json.JSONDecoder()
+    buffer = ""
+    while not buffer:
+        chunk = stream.read(READ_SIZE)
+        if not chunk:
+            raise ValueError("Expected a JSON array")
+        buffer = chunk.lstrip()
+    if not buffer.startswith("["):
+        raise ValueError("Expected a JSON array")
+    pos = 1
+    eof = False
+    while True:
+        # Skip separators, refilling the buffer as needed
+        while True:
+            while pos < len(buffer) and buffer[pos] in " \t\r\n,":
+                pos += 1
+            if pos < len(buffer) or eof:
+                break
+            buffer, pos = stream.read(READ_SIZE), 0
+            eof = not buffer
+        if pos >= len(buffer):
+            raise ValueError("Unterminated JSON array")
+        if buffer[pos] == "]":
+            return
+
+        try:
+            item, end = decoder.raw_decode(buffer, pos)
+            # A value touching the end of the buffer may be cut short
+            complete = end < len(buffer) or eof
+        except json.JSONDecodeError:
+            if eof:
+                raise
+            complete = False
+        if complete:
+            yield _message_text(item)
+            pos = end
+            continue
+
+        chunk = stream.read(READ_SIZE)
+        eof = not chunk
+        buffer = buffer[pos:] + chunk
+        pos = 0
+
+
+def iter_messages(stream: IO[str], fmt: str = "auto") -> Iterator[str]:
+    """Yield messages from a JSON array or JSON Lines stream."""
+    if fmt == "auto":
+        first = stream.read(1)
+        while first and first.isspace():
+            first = stream.read(1)
+        fmt = "json" if first == "[" else "jsonl"
+        stream = _Prepend(first, stream)
+    return iter_json_array(stream) if fmt == "json" else iter_jsonl(stream)
+
+
+class _Prepend:
+    """File-like wrapper that replays already-consumed text before the stream."""
+
+    def __init__(self, head: str, stream: IO[str]):
+        self._head = head
+        self._stream = stream
+
+    def read(self, size: int = -1) -> str:
+        head, self._head = self._head, ""
+        return head + self._stream.read(size)
+
+    def __iter__(self):
+        head, self._head = self._head, ""
+        for line in self._stream:
+            yield head + line
+            head = ""
+        if head:
+            yield head
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Stream memory extraction over a message file as NDJSON.")
+    parser.add_argument("input", help="JSON Lines or JSON array file, or - for stdin")
+    parser.add_argument("--format", choices=["auto", "jsonl", "json"], default="auto")
+    args = parser.parse_args()
+
+    stream = sys.stdin if args.input == "-" else open(args.input, "r", encoding="utf-8")
+    try:
+        write = sys.stdout.write
+        for findings in iter_extractions(iter_messages(stream, args.format)):
+            write(json.dumps(findings, ensure_ascii=False))
+            write("\n")
+    finally:
+        if stream is not sys.stdin:
+            stream.close()
+
+
+if __name__ == "__main__":
+    main()
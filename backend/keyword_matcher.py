@@ -0,0 +1,70 @@
+# keyword_matcher.py
+from collections import deque
+from typing import List
+
+
+class KeywordMatcher:
+    """Aho-Corasick automaton that finds every keyword occurring in a text in one pass.
+
+    Keywords are matched case-insensitively against the lowercased text, and
+    overlapping keywords (e.g. "git" inside "github") are all reported.
+    """
+
+    def __init__(self, keywords: List[str]):
+        self.keywords = list(keywords)
+
+        # Trie: goto[state] maps a character to the next state,
+        # out[state] holds the keyword ids that end in that state.
+        goto = [{}]
+        out = [[]]
+        for keyword_id, keyword in enumerate(self.keywords):
+            state = 0
+            for ch in keyword.lower():
+                next_state = goto[state].get(ch)
+                if next_state is None:
+                    next_state = len(goto)
+                    goto[state][ch] = next_state
+                    goto.append({})
+                    out.append([])
+                state = next_state
+            out[state].append(keyword_id)
+
+        # Failure links (breadth-first), merging outputs along the fail chain
+        # so every state reports all keywords that are a suffix of its path.
+        fail = [0] * len(goto)
+        queue = deque(goto[0].values())
+        while queue:
+            state = queue.popleft()
+            for ch, next_state in goto[state].items():
+                queue.append(next_state)
+                fallback = fail[state]
+                while fallback and ch not in goto[fallback]:
+                    fallback = fail[fallback]
+                fail[next_state] = goto[fallback].get(ch, 0)
+                out[next_state].extend(out[fail[next_state]])
+
+        self._goto = goto
+        self._fail = fail
+        self._out = [tuple(ids) for ids in out]
+
+    def find(self, text_lower: str) -> List[int]:
+        """Return the sorted ids of all keywords found in an already-lowercased text."""
+        goto, fail, out = self._goto, self._fail, self._out
+        root = goto[0]
+        hits = set(out[0])
+        state = 0
+        for ch in text_lower:
+            if state:
+                while state and ch not in goto[state]:
+                    state = fail[state]
+                state = goto[state].get(ch, 0)
+            elif ch in root:
+                state = root[ch]
+            else:
+                continue
+            if out[state]:
+                hits.update(out[state])
+        return sorted(hits)
+
+    def __len__(self):
+        return len(self.keywords)
@@ -0,0 +1,173 @@
+# lexicon.py
+import hashlib
+import json
+import os
+import pickle
+import tempfile
+import threading
+import time
+from typing import Callable, Dict, List, Optional, Tuple
+
+from keyword_matcher import KeywordMatcher
+
+SECTIONS = ("preferences", "emotional_patterns")
+# Bump when KeywordMatcher's internals change so stale cache files are ignored
+INDEX_FORMAT_VERSION = 1
+
+
+class LexiconIndex:
+    """Compiled lexicon: a KeywordMatcher plus its (section, label, keyword) entries.
+
+    Immutable once built; reloading builds a new index and swaps the
+    reference, so extractions already running keep the index they started with.
+    """
+
+    def __init__(self, matcher: KeywordMatcher, entries: List[Tuple[str, str, str]], digest: str,
+                 source: Optional[str] = None, from_cache: bool = False):
+        self.matcher = matcher
+        self.entries = entries
+        self.digest = digest
+        self.source = source
+        self.from_cache = from_cache
+        self.loaded_at = time.time()
+
+    def __len__(self):
+        return len(self.entries)
+
+    def stats(self) -> Dict:
+        return {
+            "terms": len(self.entries),
+            "source": self.source or "built-in",
+            "version": self.digest[:12],
+            "from_cache": self.from_cache,
+            "loaded_at": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime(self.loaded_at)),
+        }
+
+
+def lexicon_files(path: str) -> List[str]:
+    """The lexicon file itself, or every .json/.txt file under a directory in a stable order."""
+    if os.path.isfile(path):
+        return [path]
+    files = []
+    for root, dirs, names in os.walk(path):
+        dirs[:] = sorted(d for d in dirs if not d.startswith("."))
+        files.extend(os.path.join(root, name) for name in sorted(names) if name.endswith((".json", ".txt")))
+    return files
+
+
+def read_lexicon(path: str) -> Dict[str, Dict[str, List[str]]]:
+    """Read lexicon terms from a file or directory.
+
+    JSON files map sections to labels to terms:
+        {"preferences": {"language": ["python", ...]}, "emotional_patterns": {"joy": [...]}}
+    Text files hold one term per line ('#' starts a comment) and are named
+    <section>/<label>.txt, e.g. preferences/tools.txt.
+    """
+    lexicon = {section: {} for section in SECTIONS}
+    for file_path in lexicon_files(path):
+        with open(file_path, "r", encoding="utf-8") as f:
+            if file_path.endswith(".json"):
+                data = json.load(f)
+            else:
+                section = os.path.basename(os.path.dirname(file_path))
+                label = os.path.splitext(os.path.basename(file_path))[0]
+                terms = [line.split("#", 1)[0].strip() for line in f]
+                data = {section: {label: [term for term in terms if term]}}
+        for section, labels in data.items():
+            if section not in SECTIONS:
+                raise ValueError(f"Unknown lexicon section '{section}' in {file_path} (expected one of {', '.join(SECTIONS)})")
+            for label, terms in labels.items():
+                lexicon[section].setdefault(label, []).extend(terms)
+    return lexicon
+
+
+def lexicon_entries(*lexicons: Dict) -> List[Tuple[str, str, str]]:
+    """Flatten lexicons into (section, label, keyword) entries.
+
+    Each lexicon is flattened in section, label and term order after the ones
+    before it, so adding a lexicon never renumbers earlier entries. Terms
+    repeated within a label (case-insensitively) are dropped.
+    """
+    entries = []
+    seen = set()
+    for lexicon in lexicons:
+        for section in SECTIONS:
+            for label, keywords in lexicon.get(section, {}).items():
+                for keyword in keywords:
+                    key = (section, label, keyword.lower())
+                    if key not in seen:
+                        seen.add(key)
+                        entries.append((section, label, keyword))
+    return entries
+
+
+def compile_lexicon(*lexicons: Dict, cache_dir: Optional[str] = None, source: Optional[str] = None) -> LexiconIndex:
+    """Compile lexicons into a LexiconIndex, reusing a cached index for the same terms.
+
+    The cache file is named after a digest of the entries, so an edited
+    lexicon never loads a stale index. A missing or unwritable cache
+    directory only costs the compile time.
+    """
+    entries = lexicon_entries(*lexicons)
+    digest = hashlib.sha256(json.dumps([INDEX_FORMAT_VERSION, entries]).encode("utf-8")).hexdigest()
+    cache_path = os.path.join(cache_dir, f"lexicon-{digest[:32]}.pickle") if cache_dir else None
+
+    if cache_path and os.path.exists(cache_path):
+        try:
+            with open(cache_path, "rb") as f:
+                cached_digest, matcher = pickle.load(f)
+            if cached_digest == digest:
+                return LexiconIndex(matcher, entries, digest, source, from_cache=True)
+        except Exception as e:
+            print(f"Ignoring unreadable lexicon cache {cache_path}: {e}")
+
+    matcher = KeywordMatcher([keyword for _, _, keyword in entries])
+    if cache_path:
+        try:
+            os.makedirs(cache_dir, exist_ok=True)
+            # Write to a temporary file first so readers never see a partial cache
+            fd, tmp_path = tempfile.mkstemp(dir=cache_dir, suffix=".tmp")
+            with os.fdopen(fd, "wb") as f:
+                pickle.dump((digest, matcher), f, protocol=pickle.HIGHEST_PROTOCOL)
+            os.replace(tmp_path, cache_path)
+        except OSError as e:
+            print(f"Could not write lexicon cache to {cache_dir}: {e}")
+    return LexiconIndex(matcher, entries, digest, source)
+
+
+def lexicon_signature(path: str) -> Tuple:
+    """Cheap change detector: (file, mtime, size) of every lexicon file."""
+    signature = []
+    for file_path in lexicon_files(path):
+        stat = os.stat(file_path)
+        signature.append((file_path, stat.st_mtime_ns, stat.st_size))
+    return tuple(signature)
+
+
+class LexiconWatcher(threading.Thread):
+    """Daemon thread calling reload() whenever the files under path change.
+
+    The reload runs in this thread, so requests are never blocked on it; if
+    it fails, the current index stays in place.
+    """
+
+    def __init__(self, path: str, reload: Callable[[], object], interval: float = 30):
+        super().__init__(name="lexicon-watcher", daemon=True)
+        self.path = path
+        self.reload = reload
+        self.interval = interval
+        self._stop_event = threading.Event()
+        self._signature = lexicon_signature(path)
+
+    def run(self):
+        while not self._stop_event.wait(self.interval):
+            try:
+                signature = lexicon_signature(self.path)
+                if signature != self._signature:
+                    self.reload()
+                    self._signature = signature
+            except Exception as e:
+                print(f"Lexicon reload failed, keeping the current index: {e}")
+
+    def stop(self):
+        self._stop_event.set()
@@ -0,0 +1,197 @@
+# llm_dispatcher.py
+import asyncio
+import heapq
+import itertools
+import random
+import time
+from contextlib import asynccontextmanager
+from typing import Any, Awaitable, Callable, Dict, Optional, Tuple
+
+# Lower runs first
+PRIORITY_INTERACTIVE = 0
+PRIORITY_COMPARE = 1
+PRIORITY_BATCH = 2
+
+RETRY_STATUS_CODES = (429, 500, 502, 503, 504)
+
+
+class QueueFullError(Exception):
+    """Raised instead of queueing an LLM call when the dispatcher is saturated."""
+
+
+def _retry_after(error: Exception) -> Optional[float]:
+    """Seconds from a Retry-After header on the error's HTTP response, if any."""
+    response = getattr(error, "response", None)
+    value = response.headers.get("retry-after") if response is not None else None
+    try:
+        return max(0.0, float(value)) if value is not None else None
+    except ValueError:
+        return None
+
+
+class LLMDispatcher:
+    """Process-wide gate for LLM calls: token-bucket rate limit, concurrency cap and priorities.
+
+    Calls wait in a priority queue (lower priority value first, FIFO within a
+    priority) until a concurrency slot and a rate token are free. When
+    max_queue calls are already waiting, a new call is shed with
+    QueueFullError, unless it outranks the lowest-priority waiter, which is
+    shed instead. Retryable failures (429 and 5xx responses, or any of
+    retry_on) are retried up to max_retries times after the server's
+    Retry-After, or exponential backoff, plus jitter; a Retry-After also
+    pauses dispatch of every other call for that long.
+    """
+
+    def __init__(self, rate_per_second: float = 20, burst: int = 40, max_concurrency: int = 32,
+                 max_queue: int = 256, max_retries: int = 2, backoff_seconds: float = 0.5,
+                 retry_on: Tuple = ()):
+        self.rate_per_second = rate_per_second
+        self.burst = burst
+        self.max_concurrency = max_concurrency
+        self.max_queue = max_queue
+        self.max_retries = max_retries
+        self.backoff_seconds = backoff_seconds
+        self.retry_on = tuple(retry_on)
+        self.active = 0
+        self.shed = 0
+        self.retries = 0
+        self._tokens = float(burst)
+        self._refilled_at = time.monotonic()
+        self._paused_until = 0.0
+        self._waiting = []  # heap of (priority, seq, future)
+        self._seq = itertools.count()
+        self._timer = None  # (loop, handle) of the pending wake-up
+
+    def _token_wait(self) -> float:
+        """Seconds until a call may start, refilling the bucket first."""
+        now = time.monotonic()
+        if now < self._paused_until:
+            return self._paused_until - now
+        if self.rate_per_second <= 0:
+            return 0.0
+        self._tokens = min(self.burst, self._tokens + (now - self._refilled_at) * self.rate_per_second)
+        self._refilled_at = now
+        return 0.0 if self._tokens >= 1 else (1 - self._tokens) / self.rate_per_second
+
+    def _start(self) -> None:
+        if self.rate_per_second > 0:
+            self._tokens -= 1
+        self.active += 1
+
+    def _dispatch(self) -> None:
+        """Start waiting calls while slots and tokens allow; otherwise wake up later."""
+        loop = asyncio.get_running_loop()
+        if self._timer is not None and self._timer[0] is loop:
+            self._timer[1].cancel()
+        self._timer = None
+        while self._waiting and self.active < self.max_concurrency:
+            wait = self._token_wait()
+            if wait > 0:
+                self._timer = (loop, loop.call_later(wait, self._dispatch))
+                return
+            _, _, future = heapq.heappop(self._waiting)
+            if future.done():
+                continue  # Cancelled; its caller has not run its cleanup yet
+            self._start()
+            future.set_result(None)
+
+    def _remove(self, entry) -> None:
+        self._waiting.remove(entry)
+        heapq.heapify(self._waiting)
+
+    async def _acquire(self, priority: int) -> None:
+        if not self._waiting and self.active < self.max_concurrency and self._token_wait() == 0:
+            self._start()
+            return
+        if len(self._waiting) >= self.max_queue:
+            # Cancelled waiters whose callers have not cleaned up yet hold no place
+            self._waiting = [entry for entry in self._waiting if not entry[2].done()]
+            heapq.heapify(self._waiting)
+        if len(self._waiting) >= self.max_queue:
+            lowest = max(self._waiting)
+            if priority >= lowest[0]:
+                self.shed += 1
+                raise QueueFullError("LLM dispatch queue is full")
+            self._remove(lowest)
+            self.shed += 1
+            lowest[2].set_exception(QueueFullError("LLM dispatch queue is full"))
+
+        entry = (priority, next(self._seq), asyncio.get_running_loop().create_future())
+        heapq.heappush(self._waiting, entry)
+        self._dispatch()
+        try:
+            await entry[2]
+        except asyncio.CancelledError:
+            if entry in self._waiting:
+                self._remove(entry)
+            elif entry[2].done() and not entry[2].cancelled() and entry[2].exception() is None:
+                self.release()  # Granted a slot just as the caller gave up
+            raise
+
+    def release(self) -> None:
+        """Free a slot held by run_holding."""
+        self.active -= 1
+        if self._waiting:
+            self._dispatch()
+
+    @asynccontextmanager
+    async def slot(self, priority: int = PRIORITY_INTERACTIVE):
+        """Hold one concurrency slot (and one rate token) for the block."""
+        await self._acquire(priority)
+        try:
+            yield
+        finally:
+            self.release()
+
+    def _retry_delay(self, error: Exception, attempt: int) -> Optional[float]:
+        if attempt >= self.max_retries:
+            return None
+        if getattr(error, "status_code", None) not in RETRY_STATUS_CODES and not isinstance(error, self.retry_on):
+            return None
+        retry_after = _retry_after(error)
+        if retry_after is not None:
+            # Everyone waits out the server's Retry-After, not just this call
+            self._paused_until = max(self._paused_until, time.monotonic() + retry_after)
+            return retry_after
+        return self.backoff_seconds * 2 ** attempt
+
+    async def run(self, fn: Callable[[], Awaitable[Any]], priority: int = PRIORITY_INTERACTIVE) -> Any:
+        """Run fn under the rate limit and concurrency cap, retrying retryable failures."""
+        result = await self.run_holding(fn, priority)
+        self.release()
+        return result
+
+    async def run_holding(self, fn: Callable[[], Awaitable[Any]], priority: int = PRIORITY_INTERACTIVE) -> Any:
+        """Like run, but return with the slot still held; the caller must release() it.
+
+        For calls whose result keeps the connection busy, such as a stream
+        that is read after fn returns.
+        """
+        attempt = 0
+        while True:
+            await self._acquire(priority)
+            try:
+                return await fn()
+            except Exception as e:
+                self.release()
+                delay = self._retry_delay(e, attempt)
+                if delay is None:
+                    raise
+            except BaseException:
+                self.release()
+                raise
+            attempt += 1
+            self.retries += 1
+            # Jitter keeps retried calls from arriving in lockstep
+            await asyncio.sleep(delay + random.uniform(0, delay / 2))
+
+    def stats(self) -> Dict:
+        return {
+            "active": self.active,
+            "queued": len(self._waiting),
+            "shed": self.shed,
+            "retries": self.retries,
+            "rate_per_second": self.rate_per_second,
+            "max_concurrency": self.max_concurrency,
+            "paused_seconds": round(max(0.0, self._paused_until - time.monotonic()), 2),
+        }
@@ -1,8 +1,13 @@
 # memory_extractor.py
 import re
 import json
+import os
 from collections import Counter, defaultdict
-from typing import List, Dict
+from itertools import islice
+from typing import List, Dict, Iterable, Iterator, Optional
+
+from lexicon import LexiconIndex, LexiconWatcher, compile_lexicon, read_lexicon
+from memory_summary import MemorySummary
 
 
 # Note: This is a deterministic, lightweight extractor meant for the assignment.
@@ -28,8 +33,128 @@ EMAIL_RE = re.compile(r"\b[\w\.-]+@[\w\.-]+\.\w+\b")
 PHONE_RE = re.compile(r"\b\d{10}\b")
 
 
-def extract_messages(messages: List[str]) -> Dict:
-    """Extract preferences, emotional patterns, and facts from messages."""
+def load_lexicon(path: str = None, cache_dir: str = None) -> LexiconIndex:
+    """Compile PREF_MAP/EMOTION_MAP plus the external lexicon at path (LEXICON_PATH).
+
+    External terms get entry ids after all built-in ones, so the built-in
+    terms keep their ids and default output order. The compiled index
+    is cached in cache_dir (LEXICON_CACHE_DIR, default a .lexicon_cache
+    directory in the lexicon directory) so later cold starts load it instead
+    of rebuilding.
+    """
+    path = path or os.getenv("LEXICON_PATH")
+    lexicon = {"preferences": PREF_MAP, "emotional_patterns": EMOTION_MAP}
+    if not path:
+        return compile_lexicon(lexicon)
+    if not cache_dir:
+        lexicon_dir = path if os.path.isdir(path) else os.path.dirname(os.path.abspath(path))
+        cache_dir = os.getenv("LEXICON_CACHE_DIR") or os.path.join(lexicon_dir, ".lexicon_cache")
+    return compile_lexicon(lexicon, read_lexicon(path), cache_dir=cache_dir, source=path)
+
+
+# The index in use; replaced as a whole by reload_lexicon
+LEXICON = load_lexicon()
+
+
+def current_lexicon() -> LexiconIndex:
+    return LEXICON
+
+
+def reload_lexicon(path: str = None) -> LexiconIndex:
+    """Build a fresh index and swap it in.
+
+    Building happens in the calling thread; extractions already running keep
+    the index they started with.
+    """
+    global LEXICON
+    LEXICON = load_lexicon(path)
+    return LEXICON
+
+
+def start_lexicon_watcher(interval: float, path: str = None) -> Optional[LexiconWatcher]:
+    """Reload the lexicon in the background whenever its files change."""
+    path = path or os.getenv("LEXICON_PATH")
+    if not path or interval <= 0:
+        return None
+    watcher = LexiconWatcher(path, lambda: reload_lexicon(path), interval)
+    watcher.start()
+    return watcher
+
+
+# Fact heuristics, compiled once at import as (fact type, regex, matched on
+# lowercased text). Names use "My name is X" / "I'm X" / "I am X", locations
+# "in X" / "from X" / "living in X", mentors "My mentor is X". List order is
+# output order within a message.
+FACT_PATTERNS = [
+    ("email", EMAIL_RE, False),
+    ("phone", PHONE_RE, False),
+    ("name", re.compile(r"my name is (\w+)"), True),
+    ("name", re.compile(r"i'm (\w+)"), True),
+    ("name", re.compile(r"i am (\w+)"), True),
+    ("location", re.compile(r"in ([A-Z][a-z]+(?:\s+[A-Z][a-z]+)*)"), False),
+    ("location", re.compile(r"from ([A-Z][a-z]+(?:\s+[A-Z][a-z]+)*)"), False),
+    ("location", re.compile(r"living in ([A-Z][a-z]+(?:\s+[A-Z][a-z]+)*)"), False),
+    ("mentor", re.compile(r"my mentor is ([A-Z][a-z]+(?:\s+[A-Z]\.?\s*[A-Z][a-z]+)*)"), False),
+]
+
+
+def scan_facts(message: str, message_lower: str = None) -> List[tuple]:
+    """Return (fact type, value) pairs for a message in FACT_PATTERNS order."""
+    if message_lower is None:
+        message_lower = message.lower()
+    facts = []
+    for fact_type, regex, lowercase in FACT_PATTERNS:
+        for match in regex.findall(message_lower if lowercase else message):
+            facts.append((fact_type, match.capitalize() if fact_type == "name" else match))
+    return facts
+
+
+def _extract_into(result: Dict, message: str, index: int = None, lexicon: LexiconIndex = None) -> Dict:
+    """Append the preferences, emotional patterns and facts of one message to result.
+
+    Findings carry the message text as "context", or only its position as
+    "source_message_index" when an index is given (compact mode).
+    """
+    message_lower = message.lower()
+    source_key, source = ("context", message) if index is None else ("source_message_index", index)
+    lexicon = LEXICON if lexicon is None else lexicon
+    
+    # Extract preferences and emotional patterns in a single pass
+    entries = lexicon.entries
+    for entry_id in lexicon.matcher.find(message_lower):
+        section, label, keyword = entries[entry_id]
+        if section == "preferences":
+            result["preferences"].append({
+                "type": label,
+                "value": keyword,
+                source_key: source
+            })
+        else:
+            result["emotional_patterns"].append({
+                "emotion": label,
+                "trigger": keyword,
+                source_key: source
+            })
+    
+    # Extract facts (emails, phones, names, locations, mentors)
+    for fact_type, value in scan_facts(message, message_lower):
+        result["facts"].append({
+            "type": fact_type,
+            "value": value,
+            source_key: source
+        })
+    
+    return result
+
+
+def extract_messages(messages: List[str], compact: bool = False) -> Dict:
+    """Extract preferences, emotional patterns, and facts from messages.
+
+    With compact=True each finding references its message by
+    "source_message_index" into "messages", which holds each referenced
+    text once (null for messages without findings), instead of repeating
+    the message as "context" in every finding.
+    """
     
     # Initialize result structure
     result = {
@@ -38,94 +163,125 @@ def extract_messages(messages: List[str]) -> Dict:
         "facts": []
     }
     
-    for message in messages:
-        message_lower = message.lower()
-        
-        # Extract preferences
-        for pref_type, keywords in PREF_MAP.items():
-            for keyword in keywords:
-                if keyword.lower() in message_lower:
-                    result["preferences"].append({
-                        "type": pref_type,
-                        "value": keyword,
-                        "context": message
-                    })
-        
-        # Extract emotional patterns
-        for emotion, keywords in EMOTION_MAP.items():
-            for keyword in keywords:
-                if keyword.lower() in message_lower:
-                    result["emotional_patterns"].append({
-                        "emotion": emotion,
-                        "trigger": keyword,
-                        "context": message
-                    })
-        
-        # Extract facts (emails, phones, names, locations, etc.)
-        # Email addresses
-        emails = EMAIL_RE.findall(message)
-        for email in emails:
-            result["facts"].append({
-                "type": "email",
-                "value": email,
-                "context": message
-            })
-        
-        # Phone numbers
-        phones = PHONE_RE.findall(message)
-        for phone in phones:
-            result["facts"].append({
-                "type": "phone",
-                "value": phone,
-                "context": message
-            })
-        
-        # Names (simple heuristic - "My name is X" or "I'm X")
-        name_patterns = [
-            r"my name is (\w+)",
-            r"i'm (\w+)",
-            r"i am (\w+)"
-        ]
-        for pattern in name_patterns:
-            matches = re.findall(pattern, message_lower)
-            for match in matches:
-                result["facts"].append({
-                    "type": "name",
-                    "value": match.capitalize(),
-                    "context": message
-                })
-        
-        # Locations (simple heuristic - "in X" or "from X")
-        location_patterns = [
-            r"in ([A-Z][a-z]+(?:\s+[A-Z][a-z]+)*)",
-            r"from ([A-Z][a-z]+(?:\s+[A-Z][a-z]+)*)",
-            r"living in ([A-Z][a-z]+(?:\s+[A-Z][a-z]+)*)"
-        ]
-        for pattern in location_patterns:
-            matches = re.findall(pattern, message)
-            for match in matches:
-                result["facts"].append({
-                    "type": "location",
-                    "value": match,
-                    "context": message
-                })
-        
-        # Mentors/People (simple heuristic - "My mentor is X")
-        mentor_patterns = [
-            r"my mentor is ([A-Z][a-z]+(?:\s+[A-Z]\.?\s*[A-Z][a-z]+)*)"
-        ]
-        for pattern in mentor_patterns:
-            matches = re.findall(pattern, message)
-            for match in matches:
-                result["facts"].append({
-                    "type": "mentor",
-                    "value": match,
-                    "context": message
-                })
+    # One index for the whole call, even if a reload swaps it meanwhile
+    lexicon = LEXICON
+    if compact:
+        texts = result["messages"] = []
+        prefs, emotions, facts = result["preferences"], result["emotional_patterns"], result["facts"]
+        for index, message in enumerate(messages):
+            found = len(prefs) + len(emotions) + len(facts)
+            _extract_into(result, message, index, lexicon)
+            # Only messages that produced findings are sent back
+            texts.append(message if len(prefs) + len(emotions) + len(facts) > found else None)
+    else:
+        for message in messages:
+            _extract_into(result, message, lexicon=lexicon)
     
     return result
 
 
+def expand_compact(result: Dict) -> Dict:
+    """Turn a compact extraction result back into the default "context" format."""
+    messages = result["messages"]
+    expanded = {}
+    for key in ("preferences", "emotional_patterns", "facts"):
+        entries = []
+        for entry in result[key]:
+            entry = dict(entry)
+            entry["context"] = messages[entry.pop("source_message_index")]
+            entries.append(entry)
+        expanded[key] = entries
+    return expanded
+
+
+def iter_extractions(messages: Iterable[str]) -> Iterator[Dict]:
+    """Yield the findings of each message as soon as it is processed.
+
+    Each item has the message "index" plus its own "preferences",
+    "emotional_patterns" and "facts" lists, so memory stays flat however
+    many messages are streamed through.
+    """
+    lexicon = LEXICON
+    for index, message in enumerate(messages):
+        findings = {"index": index, "preferences": [], "emotional_patterns": [], "facts": []}
+        yield _extract_into(findings, message, lexicon=lexicon)
+
+
+def summarize_messages(
+    messages: Iterable[str], top_k: int = 5, max_examples: int = 3, sketch_capacity: int = 256
+) -> Dict:
+    """Ranked, fixed-size summary of messages in the parser_schema.json shape.
+
+    One pass over the messages: preferences come with a confidence (their
+    share of all preference mentions), emotional patterns with a tone,
+    frequency and examples, and facts deduplicated. See MemorySummary.
+    """
+    summary = MemorySummary(top_k, max_examples, sketch_capacity)
+    lexicon = LEXICON
+    for index, message in enumerate(messages):
+        findings = {"preferences": [], "emotional_patterns": [], "facts": []}
+        summary.add(_extract_into(findings, message, 0, lexicon), [message], offset=index)
+    return summary.result()
+
+
+def _extract_chunk(conversations: List[List[str]]) -> List[Dict]:
+    """Process pool worker: extract each conversation of a chunk."""
+    return [extract_messages(messages) for messages in conversations]
+
+
+def extract_conversations(
+    conversations: Iterable[List[str]],
+    workers: Optional[int] = None,
+    chunk_size: int = 64,
+    max_in_flight: Optional[int] = None,
+    in_process_below: int = 256,
+) -> List[Dict]:
+    """Run extract_messages over many conversations, in parallel when worthwhile.
+
+    Args:
+        conversations: Iterable of message lists; consumed lazily, chunk by chunk
+        workers: Process count (defaults to os.cpu_count()); 1 runs in-process
+        chunk_size: Conversations sent to a worker per task
+        max_in_flight: Cap on submitted but unfinished chunks (defaults to 2 * workers)
+        in_process_below: Sized inputs with fewer conversations skip the pool
+
+    Returns:
+        One extraction result per conversation, in input order
+    """
+    workers = workers or os.cpu_count() or 1
+    if workers <= 1 or (hasattr(conversations, "__len__") and len(conversations) < in_process_below):
+        return [extract_messages(messages) for messages in conversations]
+
+    # Imported here: the process pool machinery only costs import time for callers that use it
+    from concurrent.futures import ProcessPoolExecutor, FIRST_COMPLETED, wait
+
+    max_in_flight = max_in_flight or 2 * workers
+    iterator = iter(conversations)
+    chunks = {}
+    pending = {}
+    next_index = 0
+
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        while True:
+            # Top up the pool until the in-flight cap or the input runs out
+            while len(pending) < max_in_flight:
+                chunk = list(islice(iterator, chunk_size))
+                if not chunk:
+                    break
+                pending[pool.submit(_extract_chunk, chunk)] = next_index
+                next_index += 1
+            if not pending:
+                break
+            done, _ = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                chunks[pending.pop(future)] = future.result()
+
+    results = []
+    for index in range(next_index):
+        results.extend(chunks.pop(index))
+    return results
+
+
 if __name__ == '__main__':
     # Test with sample data
     sample = [
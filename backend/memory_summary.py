@@ -0,0 +1,138 @@
+# memory_summary.py
+from typing import Dict, Hashable, List, Optional, Sequence
+
+# Examples are message excerpts; long messages are cut so the summary stays small
+EXAMPLE_MAX_CHARS = 160
+
+
+class SpaceSaving:
+    """Approximate top-k counter in bounded memory (the Space-Saving algorithm).
+
+    Counts are exact until capacity distinct keys have been seen. After that a
+    new key replaces the key with the smallest count and inherits that count,
+    so counts can only be overestimated, by at most the count of the replaced
+    key, and every key seen more often than total / capacity times is kept.
+    """
+
+    def __init__(self, capacity: int = 256):
+        self.capacity = capacity
+        self.counts = {}
+        self.errors = {}
+        self.evictions = 0
+
+    def __len__(self):
+        return len(self.counts)
+
+    def __contains__(self, key):
+        return key in self.counts
+
+    def add(self, key: Hashable, amount: int = 1) -> Optional[Hashable]:
+        """Count key; returns the key evicted to make room for it, if any."""
+        if key in self.counts:
+            self.counts[key] += amount
+            return None
+        if len(self.counts) < self.capacity:
+            self.counts[key] = amount
+            self.errors[key] = 0
+            return None
+        evicted = min(self.counts, key=self.counts.get)
+        floor = self.counts.pop(evicted)
+        del self.errors[evicted]
+        self.counts[key] = floor + amount
+        self.errors[key] = floor
+        self.evictions += 1
+        return evicted
+
+    def top(self, k: int) -> List[tuple]:
+        """(key, count) of the k most frequent keys; ties keep first-seen order."""
+        return sorted(self.counts.items(), key=lambda item: -item[1])[:k]
+
+
+def _excerpt(text: str) -> str:
+    return text if len(text) <= EXAMPLE_MAX_CHARS else text[:EXAMPLE_MAX_CHARS - 3].rstrip() + "..."
+
+
+class MemorySummary:
+    """Running, ranked summary of extraction findings in the parser_schema.json shape.
+
+    Findings are fed message by message (see add) and counted once per
+    message. Each section is tracked in a SpaceSaving sketch of sketch_capacity
+    keys and only the top_k items of each are reported, with at most
+    max_examples example messages per emotional pattern, so neither the
+    memory used nor the result grows with the length of the history.
+    """
+
+    def __init__(self, top_k: int = 5, max_examples: int = 3, sketch_capacity: int = 256):
+        self.top_k = top_k
+        self.max_examples = max_examples
+        self.messages = 0
+        self.preference_mentions = 0
+        self._preferences = SpaceSaving(sketch_capacity)
+        self._emotions = SpaceSaving(sketch_capacity)
+        self._facts = SpaceSaving(sketch_capacity)
+        # key -> details of the items currently in each sketch
+        self._preference_info = {}
+        self._emotion_info = {}
+        self._fact_info = {}
+
+    @property
+    def approximate(self) -> bool:
+        """True once any sketch has evicted a key, i.e. counts may be overestimated."""
+        return any(sketch.evictions for sketch in (self._preferences, self._emotions, self._facts))
+
+    def _count(self, sketch: SpaceSaving, info: Dict, key, index: int, details: Dict) -> Optional[Dict]:
+        """Count key once per message; returns its details, or None if already counted."""
+        current = info.get(key)
+        if current is not None and current["last_index"] == index:
+            return None
+        evicted = sketch.add(key)
+        if evicted is not None:
+            del info[evicted]
+        if current is None:
+            current = info[key] = details
+        current["last_index"] = index
+        return current
+
+    def add(self, findings: Dict, messages: Sequence[Optional[str]], offset: int = 0) -> "MemorySummary":
+        """Fold compact findings (see extract_messages(compact=True)) into the summary.
+
+        Entries reference messages[source_message_index]; offset is added to
+        that index to get its position in the whole history.
+        """
+        for entry in findings.get("preferences", []):
+            index = entry["source_message_index"] + offset
+            key = (entry["type"], entry["value"])
+            if self._count(self._preferences, self._preference_info, key, index, {}) is not None:
+                self.preference_mentions += 1
+
+        for entry in findings.get("emotional_patterns", []):
+            index = entry["source_message_index"]
+            details = self._count(self._emotions, self._emotion_info, entry["emotion"], index + offset, {"examples": []})
+            if details is not None and len(details["examples"]) < self.max_examples and messages[index]:
+                details["examples"].append(_excerpt(messages[index]))
+
+        for entry in findings.get("facts", []):
+            index = entry["source_message_index"] + offset
+            self._count(self._facts, self._fact_info, (entry["type"], entry["value"]), index, {"first_index": index})
+
+        self.messages = max(self.messages, offset + len(messages))
+        return self
+
+    def result(self) -> Dict:
+        """Top items of each section, most frequent first."""
+        mentions = self.preference_mentions or 1
+        return {
+            "preferences": [
+                {"category": category, "value": value, "confidence": round(count / mentions, 3), "count": count}
+                for (category, value), count in self._preferences.top(self.top_k)
+            ],
+            "emotional_patterns": [
+                {"tone": tone, "frequency": count, "examples": list(self._emotion_info[tone]["examples"])}
+                for tone, count in self._emotions.top(self.top_k)
+            ],
+            "facts": [
+                {"fact": value, "type": fact_type, "source_message_index": self._fact_info[(fact_type, value)]["first_index"], "count": count}
+                for (fact_type, value), count in self._facts.top(self.top_k)
+            ],
+            "summary": {"messages": self.messages, "approximate": self.approximate},
+        }
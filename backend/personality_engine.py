@@ -1,8 +1,31 @@
 # personality_engine.py
-from typing import Dict, Optional
-import openai
+from concurrent.futures import ThreadPoolExecutor, wait
+from contextlib import contextmanager
+from typing import TYPE_CHECKING, Dict, List, Optional
+import asyncio
 import json
 import os
+import threading
+import time
+
+from circuit_breaker import CircuitBreaker, CircuitOpenError
+from llm_dispatcher import LLMDispatcher, QueueFullError, PRIORITY_INTERACTIVE, PRIORITY_COMPARE, PRIORITY_BATCH
+from metrics import LLM_REQUESTS, STAGE_LATENCY
+from profiling import add_llm_wait
+from prompt_compiler import PromptCompiler, estimate_prompt_tokens
+from single_flight import AsyncSingleFlight, SingleFlight
+from transform_cache import TransformCache, SQLiteTransformCache, cache_key
+
+# openai (and httpx under it) are the slowest imports of the app and are not
+# needed without an API key, so they are imported when the first client is built
+if TYPE_CHECKING:
+    import httpx
+    import openai
+
+
+# Point at a local stand-in (benchmarks/mock_openrouter.py) for load tests
+OPENROUTER_BASE_URL = os.getenv('OPENROUTER_BASE_URL', "https://openrouter.ai/api/v1")
+LLM_MODEL = "mistralai/mistral-7b-instruct"
 
 
 PROMPT_TEMPLATES = {
@@ -12,125 +35,379 @@ PROMPT_TEMPLATES = {
 }
 
 
-def transform_reply_with_llm(base_reply: str, style: str, user_context: Dict = None) -> Dict:
-    """Use OpenRouter LLM for intelligent personality transformation"""
+# Style-specific instructions for the LLM prompt
+STYLE_INSTRUCTIONS = {
+    "calm_mentor": {
+        "persona": "You are a wise, patient mentor who provides gentle guidance and encouragement.",
+        "tone": "Use a calm, supportive tone with step-by-step guidance. Add encouraging phrases and wisdom. Use emojis sparingly (✨, 🌟).",
+        "approach": "Break down complex topics, offer reassurance, and remind the user of their progress."
+    },
+    "witty_friend": {
+        "persona": "You are a funny, casual friend who's knowledgeable but keeps things light and humorous.",
+        "tone": "Use casual language, jokes, and friendly banter. Add humor while staying helpful. Use fun emojis (😄, ☕, 🚀).",
+        "approach": "Make technical content approachable with humor, offer to help together, use casual expressions."
+    },
+    "therapist": {
+        "persona": "You are an empathetic therapist who validates feelings and encourages self-reflection.",
+        "tone": "Use gentle, validating language with reflective questions. Be emotionally supportive. Use calming emojis (💭, 🌸).",
+        "approach": "Acknowledge challenges, ask about feelings, offer emotional support alongside technical guidance."
+    }
+}
+
+
+# Static system prompt per style, with the per-user context in a token-budgeted block
+PROMPT_COMPILER = PromptCompiler(
+    STYLE_INSTRUCTIONS,
+    context_token_budget=int(os.getenv('PROMPT_CONTEXT_TOKENS', '120'))
+)
+
+
+def _create_transform_cache() -> TransformCache:
+    max_size = int(os.getenv('TRANSFORM_CACHE_SIZE', '1024'))
+    ttl_seconds = float(os.getenv('TRANSFORM_CACHE_TTL', '3600'))
+    sqlite_path = os.getenv('TRANSFORM_CACHE_SQLITE')
+    if sqlite_path:
+        return SQLiteTransformCache(sqlite_path, max_size, ttl_seconds)
+    return TransformCache(max_size, ttl_seconds)
+
+
+# LLM transformations keyed on what actually reaches the prompt (see transform_cache_key)
+TRANSFORM_CACHE = _create_transform_cache()
+
+
+# In-flight LLM calls, so identical concurrent requests share one upstream call
+LLM_SINGLE_FLIGHT = SingleFlight()
+ASYNC_LLM_SINGLE_FLIGHT = AsyncSingleFlight()
+
+
+# Skips the LLM after repeated failures or timeouts and probes it to recover
+LLM_CIRCUIT = CircuitBreaker(
+    failure_threshold=int(os.getenv('LLM_CIRCUIT_FAILURES', '5')),
+    recovery_timeout=float(os.getenv('LLM_CIRCUIT_RECOVERY_SECONDS', '30'))
+)
+
+# Every async LLM call goes through one rate-limited, prioritized queue;
+# it also owns retries, so the async client does not retry on its own
+LLM_DISPATCHER = LLMDispatcher(
+    rate_per_second=float(os.getenv('LLM_RATE_PER_SECOND', '20')),
+    burst=int(os.getenv('LLM_RATE_BURST', '40')),
+    max_concurrency=int(os.getenv('LLM_MAX_CONCURRENCY', '32')),
+    max_queue=int(os.getenv('LLM_QUEUE_MAX', '256')),
+    max_retries=int(os.getenv('LLM_MAX_RETRIES', '2'))
+    # retry_on gets openai.APIConnectionError once openai is imported (see _import_openai)
+)
+
+# Default per-request latency budget, and the time kept back for the rule-based fallback
+LLM_DEADLINE_MS = int(os.getenv('LLM_DEADLINE_MS', '10000'))
+LLM_FALLBACK_RESERVE_MS = int(os.getenv('LLM_FALLBACK_RESERVE_MS', '50'))
+# A call every caller gave up on only counts against LLM_CIRCUIT once it has
+# been running this long; a client's short deadline says nothing about the provider
+LLM_SLOW_CALL_MS = int(os.getenv('LLM_SLOW_CALL_MS', str(LLM_DEADLINE_MS // 2)))
+
+
+def llm_timeout(budget: float = None) -> float:
+    """Seconds the LLM may take within a budget (seconds, default LLM_DEADLINE_MS)."""
+    if budget is None:
+        budget = LLM_DEADLINE_MS / 1000
+    return budget - LLM_FALLBACK_RESERVE_MS / 1000
+
+
+def llm_coalescing_stats() -> Dict:
+    """Upstream LLM calls started vs. requests that joined one already in flight."""
+    sync_stats, async_stats = LLM_SINGLE_FLIGHT.stats(), ASYNC_LLM_SINGLE_FLIGHT.stats()
+    return {key: sync_stats[key] + async_stats[key] for key in sync_stats}
+
+
+def _record_llm_success(style: str) -> None:
+    LLM_CIRCUIT.record_success()
+    LLM_REQUESTS.inc(style, LLM_MODEL, "success")
+
+
+def _record_llm_failure(style: str) -> None:
+    LLM_CIRCUIT.record_failure()
+    LLM_REQUESTS.inc(style, LLM_MODEL, "failure")
+
+
+def _record_abandoned_llm_call(style: str, sent_at: Optional[float]) -> None:
+    """Count a call cancelled by its callers as a failure if it was sent at least LLM_SLOW_CALL_MS ago."""
+    if sent_at is not None and time.monotonic() - sent_at >= LLM_SLOW_CALL_MS / 1000:
+        _record_llm_failure(style)
+
+
+def _observe_llm_call(seconds: float) -> None:
+    STAGE_LATENCY.observe(seconds, "llm_call")
+    add_llm_wait(seconds)
+
+
+@contextmanager
+def _timed_llm_call():
+    """Time an LLM call for the stage metrics and the request profile, if any"""
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        _observe_llm_call(time.perf_counter() - start)
+
+
+def fallback_reply(base_reply: str, style: str, user_context: Dict = None) -> Dict:
+    """Rule-based reply standing in for a failed, timed-out or short-circuited LLM call"""
+    LLM_REQUESTS.inc(style, LLM_MODEL, "fallback")
+    with STAGE_LATENCY.time("fallback"):
+        return transform_reply_rule_based(base_reply, style, user_context)
+
+
+def transform_cache_key(base_reply: str, style: str, user_context: Dict = None) -> str:
+    """Digest of the reply, style, model and the summarized context the prompt uses.
     
-    # Get API key from environment
+    Only the top preferences, emotions and personal facts reach the prompt
+    (see summarize_user_context), so contexts that differ elsewhere share a key.
+    """
+    return cache_key(base_reply, style, LLM_MODEL, summarize_user_context(user_context), user_context is not None)
+
+
+def _get_api_key() -> str:
     api_key = os.getenv('OPENROUTER_API_KEY')
     if not api_key:
         raise ValueError("OPENROUTER_API_KEY environment variable not set")
-    
-    # Configure OpenAI client for OpenRouter
-    client = openai.OpenAI(
-        base_url="https://openrouter.ai/api/v1",
-        api_key=api_key
+    return api_key
+
+
+def _import_openai():
+    import openai
+    LLM_DISPATCHER.retry_on = (openai.APIConnectionError,)
+    return openai
+
+
+def _http_limits() -> "httpx.Limits":
+    import httpx
+    return httpx.Limits(
+        max_connections=int(os.getenv('LLM_MAX_CONNECTIONS', '100')),
+        max_keepalive_connections=int(os.getenv('LLM_MAX_KEEPALIVE_CONNECTIONS', '20')),
+        keepalive_expiry=float(os.getenv('LLM_KEEPALIVE_EXPIRY', '30')),
     )
-    
-    # Build context-aware prompt
-    context_info = ""
-    if user_context:
-        prefs = user_context.get('preferences', [])
-        emotions = user_context.get('emotional_patterns', [])
-        facts = user_context.get('facts', [])
-        
-        if prefs:
-            pref_summary = ", ".join([f"{p.get('type', 'unknown')}: {p.get('value', 'unknown')}" for p in prefs[:3]])
-            context_info += f"User preferences: {pref_summary}. "
-        
-        if emotions:
-            emotion_summary = ", ".join([f"{e.get('emotion', 'unknown')} (trigger: {e.get('trigger', 'unknown')})" for e in emotions[:2]])
-            context_info += f"Emotional patterns: {emotion_summary}. "
-        
-        if facts:
-            fact_summary = ", ".join([f"{f.get('value', 'unknown')}" for f in facts[:3] if f.get('type') == 'personal_info'])
-            if fact_summary:
-                context_info += f"Personal info: {fact_summary}. "
-    
-    # Style-specific instructions
-    style_instructions = {
-        "calm_mentor": {
-            "persona": "You are a wise, patient mentor who provides gentle guidance and encouragement.",
-            "tone": "Use a calm, supportive tone with step-by-step guidance. Add encouraging phrases and wisdom. Use emojis sparingly (✨, 🌟).",
-            "approach": "Break down complex topics, offer reassurance, and remind the user of their progress."
-        },
-        "witty_friend": {
-            "persona": "You are a funny, casual friend who's knowledgeable but keeps things light and humorous.",
-            "tone": "Use casual language, jokes, and friendly banter. Add humor while staying helpful. Use fun emojis (😄, ☕, 🚀).",
-            "approach": "Make technical content approachable with humor, offer to help together, use casual expressions."
-        },
-        "therapist": {
-            "persona": "You are an empathetic therapist who validates feelings and encourages self-reflection.",
-            "tone": "Use gentle, validating language with reflective questions. Be emotionally supportive. Use calming emojis (💭, 🌸).",
-            "approach": "Acknowledge challenges, ask about feelings, offer emotional support alongside technical guidance."
-        }
-    }
-    
-    current_style = style_instructions.get(style, style_instructions["calm_mentor"])
-    
-    # Create the prompt
-    system_prompt = f"""
-{current_style['persona']}
 
-Your task: Transform technical responses to match your personality style.
 
-Style Guidelines:
-- Tone: {current_style['tone']}
-- Approach: {current_style['approach']}
+def _http_timeout() -> "httpx.Timeout":
+    import httpx
+    return httpx.Timeout(float(os.getenv('LLM_TIMEOUT', '60')), connect=float(os.getenv('LLM_CONNECT_TIMEOUT', '5')))
 
-Context about the user: {context_info if context_info else "No specific context available."}
 
-Important:
-- Keep the technical accuracy intact
-- Adapt the delivery to your personality
-- Consider the user's emotional state if provided
-- Be natural and authentic to your character
-"""
-    
-    user_prompt = f"""
-Transform this technical response using the '{style}' personality:
+_sync_client = None
+_async_client = None
+_async_http_client = None
+# Clients may be built from several threads at once (warm-up, comparison pool)
+_client_lock = threading.Lock()
 
-Original: "{base_reply}"
 
-Please provide a transformed version that maintains technical accuracy while embodying your personality style. Also explain your reasoning for the transformation choices.
-"""
+def get_llm_client() -> "openai.OpenAI":
+    """Shared OpenRouter client, reusing pooled keep-alive connections across calls."""
+    global _sync_client
+    if _sync_client is None:
+        # show_personality_comparison calls this from several pool threads at once
+        with _client_lock:
+            if _sync_client is None:
+                import httpx
+                openai = _import_openai()
+                _sync_client = openai.OpenAI(
+                    base_url=OPENROUTER_BASE_URL,
+                    api_key=_get_api_key(),
+                    http_client=httpx.Client(limits=_http_limits(), timeout=_http_timeout()),
+                )
+    return _sync_client
+
+
+def get_async_llm_client() -> "openai.AsyncOpenAI":
+    """Shared async OpenRouter client; one event loop can keep hundreds of calls in flight."""
+    global _async_client, _async_http_client
+    if _async_client is None:
+        with _client_lock:
+            if _async_client is None:
+                import httpx
+                openai = _import_openai()
+                _async_http_client = httpx.AsyncClient(limits=_http_limits(), timeout=_http_timeout())
+                _async_client = openai.AsyncOpenAI(
+                    base_url=OPENROUTER_BASE_URL,
+                    api_key=_get_api_key(),
+                    http_client=_async_http_client,
+                    max_retries=0,  # LLM_DISPATCHER retries, honoring Retry-After across all calls
+                )
+    return _async_client
+
+
+async def preconnect_llm() -> Optional[float]:
+    """Build the async client and open a pooled connection to the LLM endpoint.
     
+    Meant to run in the background at startup so the first request skips the
+    openai import and the TCP/TLS handshake. Returns the seconds it took, or
+    None when there is no API key or the endpoint could not be reached.
+    """
+    if not os.getenv('OPENROUTER_API_KEY'):
+        return None
+    started = time.perf_counter()
     try:
-        response = client.chat.completions.create(
-            model="mistralai/mistral-7b-instruct",  # Use Mistral model
-            messages=[
-                {"role": "system", "content": system_prompt},
-                {"role": "user", "content": user_prompt}
-            ],
-            temperature=0.8,  # Allow creativity for personality expression
-            max_tokens=500
-        )
-        
-        llm_output = response.choices[0].message.content.strip()
-        
+        # Importing openai takes a while; keep it off the event loop
+        await asyncio.to_thread(get_async_llm_client)
+        # Any response will do: the connection stays in the pool for the first call
+        await _async_http_client.head(OPENROUTER_BASE_URL)
+    except Exception as e:
+        print(f"LLM warm-up failed: {e}")
+        return None
+    return time.perf_counter() - started
+
+
+async def close_llm_clients() -> None:
+    """Close the shared clients and their connection pools (call on shutdown)."""
+    global _sync_client, _async_client, _async_http_client
+    if _async_client is not None:
+        await _async_client.close()
+        _async_client = _async_http_client = None
+    if _sync_client is not None:
+        _sync_client.close()
+        _sync_client = None
+
+
+def summarize_user_context(user_context: Dict = None) -> str:
+    """Summarize extracted memory into the context block used in LLM prompts"""
+    return PROMPT_COMPILER.context_block(user_context)
+
+
+def build_llm_messages(base_reply: str, style: str, user_context: Dict = None) -> List[Dict]:
+    """Build the chat messages sent to the LLM for a personality transformation"""
+    with STAGE_LATENCY.time("prompt_build"):
+        return PROMPT_COMPILER.compile(base_reply, style, user_context)
+
+
+def parse_llm_output(llm_output: str, base_reply: str, style: str, user_context: Dict = None) -> Dict:
+    """Split the LLM output into reply and reasoning and build the result dict"""
+    
+    with STAGE_LATENCY.time("response_parse"):
         # Try to extract reasoning if the LLM provided it
         reasoning = "LLM-generated personality transformation"
         transformed_reply = llm_output
-        
+    
         # Simple parsing to separate response and reasoning
         if "Reasoning:" in llm_output or "Explanation:" in llm_output:
             parts = llm_output.split("Reasoning:") if "Reasoning:" in llm_output else llm_output.split("Explanation:")
             if len(parts) == 2:
                 transformed_reply = parts[0].strip()
                 reasoning = parts[1].strip()
+    
+        return _llm_result(base_reply, style, transformed_reply, reasoning, user_context)
+
+
+def _llm_result(base_reply: str, style: str, transformed_reply: str, reasoning: str, user_context: Dict = None) -> Dict:
+    return {
+        "original_reply": base_reply,
+        "transformed_reply": transformed_reply,
+        "personality_style": style,
+        "reasoning": f"LLM transformation: {reasoning}",
+        "adaptations_applied": user_context is not None,
+        "used_llm": True,
+        "model_used": LLM_MODEL
+    }
+
+
+def transform_reply_with_llm(base_reply: str, style: str, user_context: Dict = None) -> Dict:
+    """Use OpenRouter LLM for intelligent personality transformation"""
+    
+    key = transform_cache_key(base_reply, style, user_context)
+    cached = TRANSFORM_CACHE.get(key)
+    if cached is not None:
+        return cached
+    
+    if not LLM_CIRCUIT.allow():
+        raise CircuitOpenError("LLM circuit is open")
+    
+    # Identical concurrent requests share one LLM call
+    return dict(LLM_SINGLE_FLIGHT.do(key, lambda: _call_llm(base_reply, style, user_context, key)))
+
+
+def _call_llm(base_reply: str, style: str, user_context: Dict, key: str) -> Dict:
+    client = get_llm_client()
+    messages = build_llm_messages(base_reply, style, user_context)
+    
+    try:
+        with _timed_llm_call():
+            response = client.chat.completions.create(
+                model=LLM_MODEL,  # Use Mistral model
+                messages=messages,
+                temperature=0.8,  # Allow creativity for personality expression
+                max_tokens=500
+            )
         
-        return {
-            "original_reply": base_reply,
-            "transformed_reply": transformed_reply,
-            "personality_style": style,
-            "reasoning": f"LLM transformation: {reasoning}",
-            "adaptations_applied": user_context is not None,
-            "used_llm": True,
-            "model_used": "mistralai/mistral-7b-instruct"
-        }
+        llm_output = response.choices[0].message.content.strip()
+        result = parse_llm_output(llm_output, base_reply, style, user_context)
+        result["estimated_prompt_tokens"] = estimate_prompt_tokens(messages)
         
     except Exception as e:
+        _record_llm_failure(style)
         # If LLM fails, raise error to trigger fallback
         raise Exception(f"LLM transformation failed: {str(e)}")
+    
+    _record_llm_success(style)
+    TRANSFORM_CACHE.set(key, result)
+    return result
+
+
+async def transform_reply_with_llm_async(
+    base_reply: str, style: str, user_context: Dict = None, priority: int = PRIORITY_INTERACTIVE
+) -> Dict:
+    """Async variant of transform_reply_with_llm using the shared async client"""
+    
+    key = transform_cache_key(base_reply, style, user_context)
+    cached = TRANSFORM_CACHE.get(key)
+    if cached is not None:
+        return cached
+    
+    if not LLM_CIRCUIT.allow():
+        raise CircuitOpenError("LLM circuit is open")
+    
+    try:
+        # Identical concurrent requests share one LLM call
+        return dict(await ASYNC_LLM_SINGLE_FLIGHT.do(
+            key, lambda: _call_llm_async(base_reply, style, user_context, key, priority)
+        ))
+    finally:
+        # A shed or abandoned call records no outcome; give back the half-open probe
+        LLM_CIRCUIT.release_probe()
+
+
+async def _call_llm_async(base_reply: str, style: str, user_context: Dict, key: str, priority: int) -> Dict:
+    client = get_async_llm_client()
+    messages = build_llm_messages(base_reply, style, user_context)
+    sent_at = None  # Stays None while the call waits in LLM_DISPATCHER's queue
+    
+    async def request():
+        nonlocal sent_at
+        sent_at = sent_at or time.monotonic()
+        with _timed_llm_call():
+            return await client.chat.completions.create(
+                model=LLM_MODEL,
+                messages=messages,
+                temperature=0.8,
+                max_tokens=500
+            )
+    
+    try:
+        response = await LLM_DISPATCHER.run(request, priority)
+        
+        llm_output = response.choices[0].message.content.strip()
+        result = parse_llm_output(llm_output, base_reply, style, user_context)
+        result["estimated_prompt_tokens"] = estimate_prompt_tokens(messages)
+        
+    except QueueFullError:
+        raise
+    except asyncio.CancelledError:
+        # Every caller ran out of budget (see AsyncSingleFlight)
+        _record_abandoned_llm_call(style, sent_at)
+        raise
+    except Exception as e:
+        _record_llm_failure(style)
+        raise Exception(f"LLM transformation failed: {str(e)}")
+    
+    _record_llm_success(style)
+    TRANSFORM_CACHE.set(key, result)
+    return result
 
 
 def transform_reply(base_reply: str, style: str, user_context: Dict = None) -> Dict:
@@ -144,11 +421,264 @@ def transform_reply(base_reply: str, style: str, user_context: Dict = None) -> D
             # No API key, use rule-based
             return transform_reply_rule_based(base_reply, style, user_context)
             
+    except CircuitOpenError:
+        return fallback_reply(base_reply, style, user_context)
     except Exception as e:
         print(f"LLM transformation failed: {e}")
         print("Falling back to rule-based transformation...")
         # Fallback to rule-based approach
-        return transform_reply_rule_based(base_reply, style, user_context)
+        return fallback_reply(base_reply, style, user_context)
+
+
+async def transform_reply_async(
+    base_reply: str,
+    style: str,
+    user_context: Dict = None,
+    budget: float = None,
+    priority: int = PRIORITY_INTERACTIVE
+) -> Dict:
+    """Async transform with LLM primary and rule-based fallback
+    
+    The LLM gets the latency budget (seconds, default LLM_DEADLINE_MS) minus
+    LLM_FALLBACK_RESERVE_MS; once that runs out, while the circuit is open,
+    or when LLM_DISPATCHER sheds the call, the rule-based reply is returned
+    instead. priority orders the call in LLM_DISPATCHER's queue.
+    """
+    
+    try:
+        if os.getenv('OPENROUTER_API_KEY'):
+            timeout = llm_timeout(budget)
+            if timeout <= 0:
+                raise TimeoutError("no latency budget left for the LLM call")
+            try:
+                return await asyncio.wait_for(
+                    transform_reply_with_llm_async(base_reply, style, user_context, priority), timeout
+                )
+            except asyncio.TimeoutError:
+                # Counted against the circuit by the call itself, if at all
+                raise TimeoutError(f"LLM call exceeded its {timeout * 1000:.0f}ms latency budget")
+        else:
+            return transform_reply_rule_based(base_reply, style, user_context)
+            
+    except (CircuitOpenError, QueueFullError):
+        return fallback_reply(base_reply, style, user_context)
+    except Exception as e:
+        print(f"LLM transformation failed: {e}")
+        print("Falling back to rule-based transformation...")
+        return fallback_reply(base_reply, style, user_context)
+
+
+async def transform_replies_async(
+    pairs: List[tuple],
+    user_context: Dict = None,
+    max_concurrency: int = None,
+    budget: float = None
+) -> List[Dict]:
+    """Transform many (base_reply, style) pairs against one user context.
+    
+    Identical pairs are transformed once; at most max_concurrency
+    (BATCH_MAX_CONCURRENCY, default 8) run at a time. The latency budget
+    (seconds) covers the whole batch, so pairs still queued when it runs out
+    are answered rule-based.
+    
+    Returns one result per pair, in input order, each with a "fallback" flag
+    set when the LLM was expected but the rule-based reply was used.
+    """
+    max_concurrency = max_concurrency or int(os.getenv('BATCH_MAX_CONCURRENCY', '8'))
+    semaphore = asyncio.Semaphore(max_concurrency)
+    deadline_at = time.monotonic() + (budget if budget is not None else LLM_DEADLINE_MS / 1000)
+    llm_expected = bool(os.getenv('OPENROUTER_API_KEY'))
+    
+    async def transform_pair(base_reply, style):
+        async with semaphore:
+            result = await transform_reply_async(
+                base_reply, style, user_context, budget=deadline_at - time.monotonic(), priority=PRIORITY_BATCH
+            )
+        return dict(result, fallback=llm_expected and not result.get("used_llm", False))
+    
+    unique = list(dict.fromkeys(pairs))
+    results = dict(zip(unique, await asyncio.gather(*[transform_pair(*pair) for pair in unique])))
+    return [dict(results[pair]) for pair in pairs]
+
+
+REASONING_MARKERS = ("Reasoning:", "Explanation:")
+
+
+class ReasoningSplitter:
+    """Incremental version of the reply/reasoning split in parse_llm_output.
+    
+    Text before the first "Reasoning:"/"Explanation:" marker is reported as
+    reply, text after it as reasoning. A short tail is held back so a marker
+    split across tokens is still recognised. The final parse_llm_output
+    result stays authoritative for edge cases (e.g. repeated markers).
+    """
+    
+    def __init__(self):
+        self.in_reasoning = False
+        self._pending = ""
+        self._hold = max(len(marker) for marker in REASONING_MARKERS) - 1
+    
+    def feed(self, text: str) -> List[tuple]:
+        """Return ("reply" | "reasoning", text) pieces that are safe to emit."""
+        if self.in_reasoning:
+            return [("reasoning", text)] if text else []
+        self._pending += text
+        positions = [(self._pending.find(marker), marker) for marker in REASONING_MARKERS]
+        positions = [(pos, marker) for pos, marker in positions if pos >= 0]
+        if positions:
+            pos, marker = min(positions)
+            reply, reasoning = self._pending[:pos], self._pending[pos + len(marker):]
+            self._pending = ""
+            self.in_reasoning = True
+            return [(kind, part) for kind, part in (("reply", reply), ("reasoning", reasoning)) if part]
+        if len(self._pending) <= self._hold:
+            return []
+        ready, self._pending = self._pending[:-self._hold], self._pending[-self._hold:]
+        return [("reply", ready)]
+    
+    def finish(self) -> List[tuple]:
+        pending, self._pending = self._pending, ""
+        return [("reply", pending)] if pending else []
+
+
+async def stream_transform_reply(base_reply: str, style: str, user_context: Dict = None, budget: float = None):
+    """Stream a transformation as (event, data) pairs for Server-Sent Events.
+    
+    Yields ("token", {"text"}) for reply text and ("reasoning", {"text"}) for
+    the explanation as the LLM produces them, then ("done", result) with the
+    same dict transform_reply returns. If the stream fails, or the latency
+    budget runs out, before the first token the rule-based reply is sent
+    instead; a failure mid-stream sends ("error", {"message"}) and then the
+    rule-based result as "done".
+    """
+    def rule_based_events(error: Exception = None, fallback: bool = True):
+        if error is not None:
+            print(f"LLM transformation failed: {error}")
+            print("Falling back to rule-based transformation...")
+        if fallback:
+            result = fallback_reply(base_reply, style, user_context)
+        else:
+            result = transform_reply_rule_based(base_reply, style, user_context)
+        return [("token", {"text": result["transformed_reply"]}), ("done", result)]
+    
+    if not os.getenv('OPENROUTER_API_KEY'):
+        for event in rule_based_events(fallback=False):
+            yield event
+        return
+    
+    key = transform_cache_key(base_reply, style, user_context)
+    cached = TRANSFORM_CACHE.get(key)
+    if cached is not None:
+        yield "token", {"text": cached["transformed_reply"]}
+        yield "done", cached
+        return
+    
+    timeout = llm_timeout(budget)
+    if timeout <= 0 or not LLM_CIRCUIT.allow():
+        for event in rule_based_events():
+            yield event
+        return
+    
+    try:
+        messages = build_llm_messages(base_reply, style, user_context)
+        sent_at = None
+        
+        async def open_stream():
+            nonlocal sent_at
+            sent_at = sent_at or time.monotonic()
+            response = await get_async_llm_client().chat.completions.create(
+                model=LLM_MODEL,
+                messages=messages,
+                temperature=0.8,
+                max_tokens=500,
+                stream=True
+            )
+            chunks = response.__aiter__()
+            try:
+                return response, chunks, await chunks.__anext__()
+            except BaseException:
+                # Empty, failed or cancelled before the first chunk
+                await response.close()
+                raise
+        
+        splitter = ReasoningSplitter()
+        chunks = []
+        started = time.perf_counter()
+        budget_exceeded = False
+        holding_slot = False
+        response = None
+        try:
+            # The latency budget covers the time to the first token
+            try:
+                response, stream, first_chunk = await asyncio.wait_for(LLM_DISPATCHER.run_holding(open_stream), timeout)
+                holding_slot = True
+            except asyncio.TimeoutError:
+                budget_exceeded = True
+                raise TimeoutError(f"no LLM token within the {timeout * 1000:.0f}ms latency budget")
+            except StopAsyncIteration:
+                stream, first_chunk = None, None
+            
+            async def remaining_chunks():
+                if first_chunk is not None:
+                    yield first_chunk
+                    async for chunk in stream:
+                        yield chunk
+            
+            async for chunk in remaining_chunks():
+                if not chunk.choices:
+                    continue
+                text = chunk.choices[0].delta.content or ""
+                if not text:
+                    continue
+                # Leading whitespace is stripped from the final reply as well
+                if not chunks:
+                    text = text.lstrip()
+                chunks.append(text)
+                for kind, part in splitter.feed(text):
+                    yield ("token" if kind == "reply" else "reasoning"), {"text": part}
+        except QueueFullError:
+            for event in rule_based_events():
+                yield event
+            return
+        except Exception as e:
+            _observe_llm_call(time.perf_counter() - started)
+            if budget_exceeded:
+                _record_abandoned_llm_call(style, sent_at)
+            else:
+                _record_llm_failure(style)
+            if not chunks:
+                for event in rule_based_events(e):
+                    yield event
+                return
+            yield "error", {"message": f"LLM stream interrupted: {str(e)}"}
+            yield "done", fallback_reply(base_reply, style, user_context)
+            return
+        finally:
+            # Give the pooled connection back, also when the client left mid-stream;
+            # until then the stream counts against LLM_MAX_CONCURRENCY
+            if response is not None:
+                await response.close()
+            if holding_slot:
+                LLM_DISPATCHER.release()
+        
+        _observe_llm_call(time.perf_counter() - started)
+        if not chunks:
+            _record_llm_failure(style)
+            for event in rule_based_events(Exception("LLM returned an empty stream")):
+                yield event
+            return
+        
+        _record_llm_success(style)
+        
+        for kind, part in splitter.finish():
+            yield "token", {"text": part}
+        result = parse_llm_output("".join(chunks).strip(), base_reply, style, user_context)
+        result["estimated_prompt_tokens"] = estimate_prompt_tokens(messages)
+        TRANSFORM_CACHE.set(key, result)
+        yield "done", result
+    finally:
+        # Also runs when the client disconnects mid-stream
+        LLM_CIRCUIT.release_probe()
 
 
 def transform_reply_rule_based(base_reply: str, style: str, user_context: Dict = None) -> Dict:
@@ -174,7 +704,7 @@ def transform_reply_rule_based(base_reply: str, style: str, user_context: Dict =
         
         # Adapt based on user's emotional state
         if emotions:
-            dominant_emotion = emotions[0].get('emotion', '') if emotions else ''
+            dominant_emotion = emotions[0].get('emotion', emotions[0].get('tone', '')) if emotions else ''
             if dominant_emotion in ['sadness', 'fear'] and style != 'therapist':
                 reasoning += f" Detected {dominant_emotion} - adding empathetic tone."
     
@@ -204,17 +734,184 @@ def transform_reply_rule_based(base_reply: str, style: str, user_context: Dict =
         "model_used": "rule-based"
     }
 
-def show_personality_comparison(base_reply: str, user_context: Dict = None) -> Dict:
-    """Demonstrate before/after differences across all personality styles."""
-    styles = ["calm_mentor", "witty_friend", "therapist"]
+COMPARISON_STYLES = ["calm_mentor", "witty_friend", "therapist"]
+# Style label in metrics for single-call comparisons covering every style
+COMPARISON_LABEL = "all_styles"
+
+
+def show_personality_comparison(base_reply: str, user_context: Dict = None, deadline: float = None) -> Dict:
+    """Demonstrate before/after differences across all personality styles.
+    
+    Styles still running after deadline seconds (COMPARE_DEADLINE_SECONDS,
+    default 20) are answered rule-based.
+    """
+    styles = COMPARISON_STYLES
+    if deadline is None:
+        deadline = float(os.getenv('COMPARE_DEADLINE_SECONDS', '20'))
     comparison = {
         "original_reply": base_reply,
         "personality_variations": []
     }
     
-    for style in styles:
-        result = transform_reply(base_reply, style, user_context)
-        comparison["personality_variations"].append(result)
+    if os.getenv('OPENROUTER_API_KEY'):
+        # LLM calls are I/O bound: run the styles side by side
+        pool = ThreadPoolExecutor(max_workers=len(styles))
+        futures = [pool.submit(transform_reply, base_reply, style, user_context) for style in styles]
+        wait(futures, timeout=deadline)
+        # Late calls finish in the background; nobody waits for them
+        pool.shutdown(wait=False, cancel_futures=True)
+        results = []
+        for style, future in zip(styles, futures):
+            if future.done() and not future.cancelled():
+                results.append(future.result())
+            else:
+                print(f"LLM transformation for '{style}' missed the {deadline}s deadline")
+                results.append(fallback_reply(base_reply, style, user_context))
+    else:
+        results = [transform_reply(base_reply, style, user_context) for style in styles]
+    comparison["personality_variations"].extend(results)
+    
+    return comparison
+
+
+def build_comparison_messages(base_reply: str, styles: List[str], user_context: Dict = None) -> List[Dict]:
+    """Build one structured-output prompt asking for every style at once"""
+    with STAGE_LATENCY.time("prompt_build"):
+        return PROMPT_COMPILER.compile_comparison(base_reply, styles, user_context)
+
+
+async def transform_all_styles_with_llm_async(base_reply: str, styles: List[str], user_context: Dict = None) -> List[Dict]:
+    """Transform a reply into every style with a single structured-output LLM call"""
+    
+    if not LLM_CIRCUIT.allow():
+        raise CircuitOpenError("LLM circuit is open")
+    
+    try:
+        return await _call_llm_all_styles_async(base_reply, styles, user_context)
+    finally:
+        # A shed or abandoned call records no outcome; give back the half-open probe
+        LLM_CIRCUIT.release_probe()
+
+
+async def _call_llm_all_styles_async(base_reply: str, styles: List[str], user_context: Dict) -> List[Dict]:
+    client = get_async_llm_client()
+    messages = build_comparison_messages(base_reply, styles, user_context)
+    sent_at = None
+    
+    async def request():
+        nonlocal sent_at
+        sent_at = sent_at or time.monotonic()
+        with _timed_llm_call():
+            return await client.chat.completions.create(
+                model=LLM_MODEL,
+                messages=messages,
+                temperature=0.8,
+                max_tokens=300 * len(styles),
+                response_format={"type": "json_object"}
+            )
+    
+    try:
+        response = await LLM_DISPATCHER.run(request, PRIORITY_COMPARE)
+        
+        with STAGE_LATENCY.time("response_parse"):
+            llm_output = response.choices[0].message.content.strip()
+            # Some models wrap JSON in a code fence despite the instructions
+            if llm_output.startswith("```"):
+                llm_output = llm_output.strip("`").split("\n", 1)[-1]
+            variations = json.loads(llm_output)
+            results = [
+                _llm_result(
+                    base_reply,
+                    style,
+                    variations[style]["transformed_reply"].strip(),
+                    variations[style].get("reasoning", "LLM-generated personality transformation"),
+                    user_context
+                )
+                for style in styles
+            ]
+        # One call serves every style, so each result reports the shared prompt
+        for result in results:
+            result["estimated_prompt_tokens"] = estimate_prompt_tokens(messages)
+        
+    except QueueFullError:
+        raise
+    except asyncio.CancelledError:
+        _record_abandoned_llm_call(COMPARISON_LABEL, sent_at)
+        raise
+    except Exception as e:
+        _record_llm_failure(COMPARISON_LABEL)
+        raise Exception(f"LLM comparison failed: {str(e)}")
+    
+    _record_llm_success(COMPARISON_LABEL)
+    return results
+
+
+async def show_personality_comparison_async(
+    base_reply: str,
+    user_context: Dict = None,
+    max_concurrency: int = None,
+    deadline: float = None,
+    single_call: bool = None
+) -> Dict:
+    """Concurrent variant of show_personality_comparison for the API handlers.
+    
+    Args:
+        base_reply: The original response content
+        user_context: Optional user memory context for personalization
+        max_concurrency: Styles transformed at once (COMPARE_MAX_CONCURRENCY, default 3)
+        deadline: Seconds for the whole comparison; styles still running are
+            answered rule-based (COMPARE_DEADLINE_SECONDS, default 20)
+        single_call: Ask the LLM for all styles in one structured-output call
+            (COMPARE_SINGLE_CALL, default off)
+    
+    Returns:
+        Dict with the original reply and one variation per style, in style order
+    """
+    styles = COMPARISON_STYLES
+    max_concurrency = max_concurrency or int(os.getenv('COMPARE_MAX_CONCURRENCY', '3'))
+    if deadline is None:
+        deadline = float(os.getenv('COMPARE_DEADLINE_SECONDS', '20'))
+    if single_call is None:
+        single_call = os.getenv('COMPARE_SINGLE_CALL', '0') == '1'
+    comparison = {
+        "original_reply": base_reply,
+        "personality_variations": []
+    }
+    
+    if single_call and os.getenv('OPENROUTER_API_KEY'):
+        try:
+            timeout = llm_timeout(deadline)
+            if timeout <= 0:
+                raise TimeoutError("no latency budget left for the LLM call")
+            results = await asyncio.wait_for(
+                transform_all_styles_with_llm_async(base_reply, styles, user_context), timeout
+            )
+        except (CircuitOpenError, QueueFullError):
+            results = [fallback_reply(base_reply, style, user_context) for style in styles]
+        except Exception as e:
+            print(f"LLM comparison failed: {e}")
+            print("Falling back to rule-based transformation...")
+            results = [fallback_reply(base_reply, style, user_context) for style in styles]
+        comparison["personality_variations"].extend(results)
+        return comparison
+    
+    semaphore = asyncio.Semaphore(max_concurrency)
+    
+    async def transform_style(style):
+        async with semaphore:
+            return await transform_reply_async(
+                base_reply, style, user_context, budget=deadline, priority=PRIORITY_COMPARE
+            )
+    
+    tasks = [asyncio.ensure_future(transform_style(style)) for style in styles]
+    await asyncio.wait(tasks, timeout=deadline)
+    for style, task in zip(styles, tasks):
+        if task.done():
+            comparison["personality_variations"].append(task.result())
+        else:
+            task.cancel()
+            print(f"LLM transformation for '{style}' missed the {deadline}s deadline")
+            comparison["personality_variations"].append(fallback_reply(base_reply, style, user_context))
     
     return comparison
 
@@ -0,0 +1,29 @@
+# precompile.py
+"""
+Build-time step for faster cold starts.
+
+Byte-compiles the backend, so a fresh instance does not compile every module
+on its first import, and builds the lexicon index cache (see lexicon.py) when
+LEXICON_PATH is set.
+
+Usage (from backend/, after pip install):
+    python precompile.py
+"""
+import compileall
+import os
+import sys
+
+
+def main():
+    backend_dir = os.path.dirname(os.path.abspath(__file__))
+    if not compileall.compile_dir(backend_dir, quiet=1):
+        sys.exit(1)
+
+    # Importing the extractor loads the lexicon, compiling and caching its index
+    sys.path.insert(0, backend_dir)
+    from memory_extractor import current_lexicon
+    print(f"Lexicon index ready: {current_lexicon().stats()}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,104 @@
+# profiling.py
+import cProfile
+import os
+import pstats
+import threading
+import time
+import uuid
+from contextvars import ContextVar
+from typing import Dict, Optional
+
+# Off unless explicitly enabled; then a request opts in with an X-Profile header
+PROFILING_ENABLED = os.getenv("PROFILING_ENABLED", "0") == "1"
+PROFILE_TOP = int(os.getenv("PROFILE_TOP", "15"))
+# Also keep the raw pstats dump of each profiled request here (for snakeviz etc.)
+PROFILE_DIR = os.getenv("PROFILE_DIR")
+
+_current_profile = ContextVar("request_profile", default=None)
+# cProfile allows one active profiler per interpreter on newer Pythons
+_profiler_lock = threading.Lock()
+
+REGEX_FILES = ("re/__init__.py", "re/_compiler.py", "re/_parser.py")
+
+
+def profiling_requested(header_value: Optional[str]) -> bool:
+    return PROFILING_ENABLED and bool(header_value) and header_value != "0"
+
+
+def active_profile() -> Optional["RequestProfile"]:
+    """The profile of the current request, if it is being profiled."""
+    return _current_profile.get()
+
+
+def add_llm_wait(seconds: float) -> None:
+    profile = _current_profile.get()
+    if profile is not None:
+        profile.llm_wait += seconds
+
+
+def _is_regex(func) -> bool:
+    filename, _, name = func
+    return "'re.Pattern'" in name or "_sre" in name or filename.replace("\\", "/").endswith(REGEX_FILES)
+
+
+class RequestProfile:
+    """Deterministic (cProfile) profile of one request.
+
+    Used as a context manager around the handler. Only one request is
+    profiled at a time; a request arriving while another is profiled runs
+    normally and reports that it was skipped. Everything the profiled thread
+    runs is included, so requests served concurrently on the same event loop
+    can show up in the report too.
+    """
+
+    def __init__(self):
+        self.llm_wait = 0.0
+        self.wall = 0.0
+        self.profiler = None
+        self._token = None
+
+    def __enter__(self):
+        if _profiler_lock.acquire(blocking=False):
+            self.profiler = cProfile.Profile()
+            self._token = _current_profile.set(self)
+            self._start = time.perf_counter()
+            self.profiler.enable()
+        return self
+
+    def __exit__(self, *exc_info):
+        if self.profiler is None:
+            return
+        self.profiler.disable()
+        self.wall = time.perf_counter() - self._start
+        _current_profile.reset(self._token)
+        _profiler_lock.release()
+
+    def report(self, top: int = None) -> Dict:
+        """Compact summary: top functions by cumulative time, regex time and LLM wait.
+
+        llm_wait_ms adds up every LLM call of the request, so calls made
+        concurrently (e.g. /compare styles) can exceed wall_ms.
+        """
+        if self.profiler is None:
+            return {"skipped": "another request is being profiled"}
+        stats = pstats.Stats(self.profiler)
+        entries = sorted(stats.stats.items(), key=lambda item: item[1][3], reverse=True)
+        report = {
+            "wall_ms": round(self.wall * 1000, 3),
+            "llm_wait_ms": round(self.llm_wait * 1000, 3),
+            "regex_ms": round(sum(tt for func, (_, _, tt, _, _) in entries if _is_regex(func)) * 1000, 3),
+            "top_functions": [
+                {
+                    "function": f"{os.path.basename(filename)}:{lineno}({name})",
+                    "calls": calls,
+                    "cumulative_ms": round(cumulative * 1000, 3),
+                    "own_ms": round(own * 1000, 3),
+                }
+                for (filename, lineno, name), (_, calls, own, cumulative, _) in entries[:top or PROFILE_TOP]
+            ],
+        }
+        if PROFILE_DIR:
+            path = os.path.join(PROFILE_DIR, f"profile-{time.strftime('%Y%m%d-%H%M%S')}-{uuid.uuid4().hex[:8]}.prof")
+            stats.dump_stats(path)
+            report["stats_file"] = path
+        return report
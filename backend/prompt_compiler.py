@@ -0,0 +1,160 @@
+# prompt_compiler.py
+from typing import Dict, List, Tuple
+
+# Rough size of a token for English prose; good enough for budgeting prompts
+CHARS_PER_TOKEN = 4
+# Chat formatting overhead the provider adds around each message
+MESSAGE_OVERHEAD_TOKENS = 4
+
+# Facts that shape how a reply should sound; contact details are left out
+PROMPT_FACT_TYPES = ("name", "location", "mentor")
+
+NO_CONTEXT = "No specific context available."
+
+
+def estimate_tokens(text: str) -> int:
+    """Estimated token count of text (about CHARS_PER_TOKEN characters each)."""
+    return -(-len(text) // CHARS_PER_TOKEN)
+
+
+def estimate_prompt_tokens(messages: List[Dict]) -> int:
+    """Estimated input tokens for a list of chat messages."""
+    return sum(estimate_tokens(m["content"]) + MESSAGE_OVERHEAD_TOKENS for m in messages)
+
+
+def _emotion_item(emotion: Dict) -> str:
+    # Aggregated summaries (memory_summary.py) give a tone and frequency per emotion
+    if "tone" in emotion:
+        return f"{emotion['tone']} (seen {emotion.get('frequency', 1)}x)"
+    return f"{emotion.get('emotion', 'unknown')} (trigger: {emotion.get('trigger', 'unknown')})"
+
+
+def _style_prefix(instructions: Dict) -> str:
+    return f"""
+{instructions['persona']}
+
+Your task: Transform technical responses to match your personality style.
+
+Style Guidelines:
+- Tone: {instructions['tone']}
+- Approach: {instructions['approach']}
+
+Important:
+- Keep the technical accuracy intact
+- Adapt the delivery to your personality
+- Consider the user's emotional state if provided (see the context block in the request)
+- Be natural and authentic to your character
+"""
+
+
+def _comparison_prefix(style_instructions: Dict, styles: Tuple[str, ...]) -> str:
+    style_guide = "\n".join(
+        f"- {style}: {style_instructions[style]['persona']} {style_instructions[style]['tone']} {style_instructions[style]['approach']}"
+        for style in styles
+    )
+    return f"""
+You rewrite technical responses in several personality styles at once.
+
+Styles:
+{style_guide}
+
+Important:
+- Keep the technical accuracy intact
+- Adapt the delivery to each personality
+- Consider the user's emotional state if provided (see the context block in the request)
+- Reply with a JSON object only: one key per style, each an object with "transformed_reply" and "reasoning"
+"""
+
+
+class PromptCompiler:
+    """Build LLM prompts from a static per-style system prefix and a per-user context block.
+
+    The system prompts are compiled once, so every request for a style sends
+    the same prefix and the provider's prompt-prefix cache can hit. Whatever
+    differs per user goes in the user message, in a context block capped at
+    context_token_budget tokens. Items are taken in priority order (emotional
+    patterns, then personal facts, then preferences) and whatever no longer
+    fits is dropped. Both raw extraction results and aggregated summaries
+    (extract with aggregate=True, already ranked) are accepted.
+    """
+
+    def __init__(self, style_instructions: Dict, default_style: str = "calm_mentor", context_token_budget: int = 120):
+        self.style_instructions = style_instructions
+        self.default_style = default_style
+        self.context_token_budget = context_token_budget
+        self.prefixes = {style: _style_prefix(instructions) for style, instructions in style_instructions.items()}
+        self._comparison_prefixes = {}
+
+    def system_prefix(self, style: str) -> str:
+        return self.prefixes.get(style, self.prefixes[self.default_style])
+
+    def comparison_prefix(self, styles: List[str]) -> str:
+        styles = tuple(styles)
+        prefix = self._comparison_prefixes.get(styles)
+        if prefix is None:
+            prefix = self._comparison_prefixes[styles] = _comparison_prefix(self.style_instructions, styles)
+        return prefix
+
+    def context_block(self, user_context: Dict = None) -> str:
+        """Summary of the extracted memory that fits the context token budget."""
+        if not user_context:
+            return ""
+
+        # (label, items) in priority order, each capped like the original prompt
+        sections = [
+            ("Emotional patterns", [
+                _emotion_item(e) for e in user_context.get('emotional_patterns', [])[:2]
+            ]),
+            ("Personal info", [
+                f"{f.get('value', f.get('fact', 'unknown'))}"
+                for f in user_context.get('facts', []) if f.get('type') in PROMPT_FACT_TYPES
+            ][:3]),
+            ("User preferences", [
+                f"{p.get('type', p.get('category', 'unknown'))}: {p.get('value', 'unknown')}"
+                for p in user_context.get('preferences', [])[:3]
+            ]),
+        ]
+
+        remaining = self.context_token_budget
+        lines = []
+        for label, items in sections:
+            kept = []
+            for item in items:
+                cost = estimate_tokens(f"{label}: {item}. " if not kept else f", {item}")
+                if cost > remaining:
+                    continue
+                kept.append(item)
+                remaining -= cost
+            if kept:
+                lines.append(f"{label}: {', '.join(kept)}.")
+        return " ".join(lines)
+
+    def compile(self, base_reply: str, style: str, user_context: Dict = None) -> List[Dict]:
+        """Chat messages for transforming base_reply into one style."""
+        user_prompt = f"""
+Context about the user: {self.context_block(user_context) or NO_CONTEXT}
+
+Transform this technical response using the '{style}' personality:
+
+Original: "{base_reply}"
+
+Please provide a transformed version that maintains technical accuracy while embodying your personality style. Also explain your reasoning for the transformation choices.
+"""
+        return [
+            {"role": "system", "content": self.system_prefix(style)},
+            {"role": "user", "content": user_prompt}
+        ]
+
+    def compile_comparison(self, base_reply: str, styles: List[str], user_context: Dict = None) -> List[Dict]:
+        """Chat messages asking for every style in one structured-output call."""
+        user_prompt = f"""
+Context about the user: {self.context_block(user_context) or NO_CONTEXT}
+
+Transform this technical response into each of these styles: {", ".join(styles)}.
+
+Original: "{base_reply}"
+"""
+        return [
+            {"role": "system", "content": self.comparison_prefix(styles)},
+            {"role": "user", "content": user_prompt}
+        ]
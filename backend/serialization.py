@@ -0,0 +1,123 @@
+# serialization.py
+import json
+from typing import Any, Dict, Optional
+
+from fastapi import HTTPException, Request
+from fastapi.exceptions import RequestValidationError
+from fastapi.responses import JSONResponse, Response
+from pydantic import BaseModel, ValidationError
+
+from compression import BodyDecodeError, decompress_body_async
+
+# Optional speedups: stdlib json is used without orjson, and MessagePack is
+# only offered when msgpack is installed
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+try:
+    import msgpack
+except ImportError:
+    msgpack = None
+
+MSGPACK_TYPES = ("application/msgpack", "application/x-msgpack")
+
+
+def dumps_json(content: Any) -> bytes:
+    if orjson is not None:
+        return orjson.dumps(content)
+    return json.dumps(content, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+
+
+def loads_json(body: bytes) -> Any:
+    return orjson.loads(body) if orjson is not None else json.loads(body)
+
+
+class FastJSONResponse(JSONResponse):
+    """JSONResponse encoded with orjson when available."""
+
+    def render(self, content: Any) -> bytes:
+        return dumps_json(content)
+
+
+class MsgPackResponse(Response):
+    media_type = "application/msgpack"
+
+    def render(self, content: Any) -> bytes:
+        return msgpack.packb(content, use_bin_type=True)
+
+
+def is_msgpack(header_value: Optional[str]) -> bool:
+    return msgpack is not None and any(t in (header_value or "") for t in MSGPACK_TYPES)
+
+
+def negotiated_response(content: Dict, request: Request) -> Response:
+    """MessagePack when the client Accepts it, JSON otherwise.
+
+    Returning a Response skips FastAPI's jsonable_encoder pass, which walks
+    every nested finding of a large extraction result.
+    """
+    if is_msgpack(request.headers.get("accept")):
+        return MsgPackResponse(content)
+    return FastJSONResponse(content)
+
+
+def _body_errors(error: ValidationError):
+    return [{**e, "loc": ("body", *e["loc"])} for e in error.errors()]
+
+
+def parse_body(model: type, body: bytes, content_type: Optional[str]) -> BaseModel:
+    """Decode a JSON or MessagePack request body and validate it against model.
+
+    A "messages" list made only of strings is checked in one pass and set on
+    the model as is, instead of having pydantic validate (and copy) it item
+    by item; anything else takes the regular validation path, so error
+    messages are unchanged.
+    """
+    try:
+        data = msgpack.unpackb(body, raw=False) if is_msgpack(content_type) else loads_json(body)
+    except Exception as e:
+        raise RequestValidationError([{"type": "json_invalid", "loc": ("body",), "msg": f"Invalid request body: {e}", "input": None}])
+
+    try:
+        messages = data.get("messages") if isinstance(data, dict) else None
+        if type(messages) is list and all(type(m) is str for m in messages):
+            parsed = model.model_validate({**data, "messages": []})
+            parsed.messages = messages
+            return parsed
+        return model.model_validate(data)
+    except ValidationError as e:
+        raise RequestValidationError(_body_errors(e))
+
+
+def body_of(model: type):
+    """FastAPI dependency parsing the (possibly gzip or zstd encoded) request body with parse_body."""
+    async def dependency(request: Request) -> BaseModel:
+        try:
+            body = await decompress_body_async(await request.body(), request.headers.get("content-encoding"))
+        except BodyDecodeError as e:
+            raise HTTPException(status_code=e.status_code, detail=str(e))
+        return parse_body(model, body, request.headers.get("content-type"))
+    return dependency
+
+
+def _inline_refs(node, defs: Dict):
+    if isinstance(node, dict):
+        if "$ref" in node:
+            return _inline_refs(defs[node["$ref"].rsplit("/", 1)[-1]], defs)
+        return {key: _inline_refs(value, defs) for key, value in node.items()}
+    if isinstance(node, list):
+        return [_inline_refs(value, defs) for value in node]
+    return node
+
+
+def openapi_body(model: type) -> Dict:
+    """openapi_extra documenting a body parsed by body_of(model)."""
+    schema = model.model_json_schema()
+    defs = schema.pop("$defs", {})
+    schema = _inline_refs(schema, defs)
+    content = {"application/json": {"schema": schema}}
+    if msgpack is not None:
+        content["application/msgpack"] = {"schema": schema}
+    return {"requestBody": {"required": True, "content": content}}
@@ -0,0 +1,117 @@
+# session_memory.py
+import hashlib
+import threading
+import time
+from collections import OrderedDict
+from typing import Dict, List
+
+from memory_extractor import extract_messages, expand_compact
+from memory_summary import MemorySummary
+
+
+def _digest(message: str) -> bytes:
+    return hashlib.sha256(message.encode("utf-8")).digest()
+
+
+class SessionMemoryStore:
+    """Keeps extracted memory per session so each message is extracted only once.
+
+    Clients may send either the full chat history or just the new messages
+    (delta=True). With the full history, messages already seen are skipped
+    after checking that the first and the last of them are unchanged, so a
+    call costs the same however long the session is; a client that edits
+    older messages should reset() the session or use a new session id.
+    Sessions are evicted least-recently-used beyond max_sessions, or after
+    ttl_seconds without activity.
+    """
+
+    def __init__(self, max_sessions: int = 1000, ttl_seconds: float = 3600):
+        self.max_sessions = max_sessions
+        self.ttl_seconds = ttl_seconds
+        self._sessions = OrderedDict()
+        self._lock = threading.Lock()
+
+    def extract(self, session_id: str, messages: List[str], delta: bool = False, compact: bool = False,
+                aggregate: bool = False) -> Dict:
+        """Extract only unseen messages, merge them into the session and return its memory.
+
+        The session keeps its memory in compact form (see extract_messages);
+        it is expanded to the "context" format unless compact is requested.
+        With aggregate=True the session's running MemorySummary is returned instead.
+        """
+        session = self._get_session(session_id)
+        with session["lock"]:
+            if delta:
+                new_messages = messages
+            elif self._continues(session, messages):
+                new_messages = messages[session["message_count"]:]
+            else:
+                # The history was edited: start the session over
+                self._clear(session)
+                new_messages = messages
+
+            offset = session["message_count"]
+            extracted = extract_messages(new_messages, compact=True)
+            session["summary"].add(extracted, extracted["messages"], offset)
+            for key, entries in extracted.items():
+                if key != "messages":
+                    for entry in entries:
+                        entry["source_message_index"] += offset
+                session["result"][key].extend(entries)
+            if new_messages:
+                if not session["message_count"]:
+                    session["first_digest"] = _digest(new_messages[0])
+                session["last_digest"] = _digest(new_messages[-1])
+            session["message_count"] += len(new_messages)
+
+            if aggregate:
+                return session["summary"].result()
+            if not compact:
+                return expand_compact(session["result"])
+            # Copy the lists so later merges don't mutate a response being serialized
+            return {key: list(entries) for key, entries in session["result"].items()}
+
+    def reset(self, session_id: str) -> None:
+        with self._lock:
+            self._sessions.pop(session_id, None)
+
+    def __len__(self):
+        return len(self._sessions)
+
+    def _get_session(self, session_id: str) -> Dict:
+        with self._lock:
+            self._evict_expired()
+            session = self._sessions.get(session_id)
+            if session is None:
+                session = {"lock": threading.Lock()}
+                self._clear(session)
+                self._sessions[session_id] = session
+                while len(self._sessions) > self.max_sessions:
+                    self._sessions.popitem(last=False)
+            else:
+                self._sessions.move_to_end(session_id)
+            session["touched"] = time.monotonic()
+            return session
+
+    @staticmethod
+    def _clear(session: Dict) -> None:
+        session["message_count"] = 0
+        session["first_digest"] = session["last_digest"] = None
+        session["result"] = {"preferences": [], "emotional_patterns": [], "facts": [], "messages": []}
+        session["summary"] = MemorySummary()
+
+    def _continues(self, session: Dict, messages: List[str]) -> bool:
+        count = session["message_count"]
+        if len(messages) < count:
+            return False
+        if count == 0:
+            return True
+        return _digest(messages[0]) == session["first_digest"] and _digest(messages[count - 1]) == session["last_digest"]
+
+    def _evict_expired(self) -> None:
+        cutoff = time.monotonic() - self.ttl_seconds
+        while self._sessions:
+            session_id, session = next(iter(self._sessions.items()))
+            if session["touched"] >= cutoff:
+                break
+            self._sessions.popitem(last=False)
@@ -0,0 +1,100 @@
+# test_app.py
+import sys
+import os
+import asyncio
+import gzip
+import json
+
+# Add parent directory to path so we can import app
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import httpx
+
+import app
+from compression import THREADED_DECOMPRESSION_BYTES
+from serialization import msgpack
+
+MESSAGES = ["I love Python and VSCode.", "I'm worried about the deadline.", "My name is Sam."]
+
+
+def post(path, **kwargs):
+    """POST to the app in-process (starlette's TestClient does not work with the installed httpx)."""
+    async def send():
+        transport = httpx.ASGITransport(app=app.app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+            return await client.post(path, **kwargs)
+
+    # Rule-based mode, so nothing leaves the machine
+    api_key = os.environ.pop("OPENROUTER_API_KEY", None)
+    try:
+        return asyncio.run(send())
+    finally:
+        if api_key is not None:
+            os.environ["OPENROUTER_API_KEY"] = api_key
+
+
+def test_json_and_msgpack_bodies_extract_the_same():
+    response = post("/extract", json={"messages": MESSAGES})
+    assert response.status_code == 200
+    assert response.headers["content-type"] == "application/json"
+    extracted = response.json()
+    assert extracted["facts"] and extracted["preferences"]
+
+    if msgpack is not None:
+        response = post(
+            "/extract",
+            content=msgpack.packb({"messages": MESSAGES}),
+            headers={"Content-Type": "application/msgpack", "Accept": "application/msgpack"},
+        )
+        assert response.status_code == 200
+        assert response.headers["content-type"] == "application/msgpack"
+        assert msgpack.unpackb(response.content, raw=False) == extracted
+
+
+def test_gzip_request_bodies_are_decoded():
+    # Random ids keep the compressed body large enough to be inflated in a worker thread
+    messages = MESSAGES + [f"Order {os.urandom(16).hex()} arrived." for _ in range(3000)]
+    body = gzip.compress(json.dumps({"messages": messages}).encode())
+    assert len(body) > THREADED_DECOMPRESSION_BYTES
+    response = post("/extract", content=body, headers={"Content-Type": "application/json", "Content-Encoding": "gzip"})
+    assert response.status_code == 200
+    assert response.json()["facts"]
+
+    response = post("/extract", content=body[:-8], headers={"Content-Type": "application/json", "Content-Encoding": "gzip"})
+    assert response.status_code == 400
+
+
+def test_invalid_messages_get_a_422_with_field_errors():
+    response = post("/transform", json={"messages": ["ok", 3], "style": "therapist"})
+    assert response.status_code == 422
+    errors = response.json()["detail"]
+    assert [error["loc"] for error in errors] == [["body", "messages", 1]]
+
+    response = post("/extract", content=b"{not json", headers={"Content-Type": "application/json"})
+    assert response.status_code == 422
+    assert response.json()["detail"][0]["loc"] == ["body"]
+
+
+def test_extract_streams_ndjson_on_request():
+    response = post("/extract", json={"messages": MESSAGES}, headers={"Accept": "application/x-ndjson"})
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("application/x-ndjson")
+    lines = [json.loads(line) for line in response.text.splitlines()]
+    assert lines and all(isinstance(line, dict) for line in lines)
+
+
+def test_transform_answers_rule_based_without_a_key():
+    response = post("/transform", json={"messages": MESSAGES, "style": "witty_friend"}, headers={"X-Deadline-Ms": "1"})
+    assert response.status_code == 200
+    personality = response.json()["personality_response"]
+    assert personality["personality_style"] == "witty_friend"
+    assert personality["used_llm"] is False
+
+
+if __name__ == "__main__":
+    test_json_and_msgpack_bodies_extract_the_same()
+    test_gzip_request_bodies_are_decoded()
+    test_invalid_messages_get_a_422_with_field_errors()
+    test_extract_streams_ndjson_on_request()
+    test_transform_answers_rule_based_without_a_key()
+    print("All tests passed!")
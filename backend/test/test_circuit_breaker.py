@@ -0,0 +1,70 @@
+# test_circuit_breaker.py
+import sys
+import os
+import time
+
+# Add parent directory to path so we can import circuit_breaker
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from circuit_breaker import CircuitBreaker
+
+
+def test_opens_after_consecutive_failures():
+    breaker = CircuitBreaker(failure_threshold=3, recovery_timeout=60)
+    for _ in range(2):
+        assert breaker.allow()
+        breaker.record_failure()
+    assert breaker.stats()["state"] == "closed"
+
+    assert breaker.allow()
+    breaker.record_failure()
+    assert breaker.stats()["state"] == "open"
+    assert not breaker.allow()
+    assert breaker.stats()["short_circuited"] == 1
+
+
+def test_success_resets_failure_count():
+    breaker = CircuitBreaker(failure_threshold=2, recovery_timeout=60)
+    breaker.record_failure()
+    breaker.record_success()
+    breaker.record_failure()
+    assert breaker.stats()["state"] == "closed"
+
+
+def test_half_open_lets_one_probe_through():
+    breaker = CircuitBreaker(failure_threshold=1, recovery_timeout=0.05)
+    breaker.record_failure()
+    assert not breaker.allow()
+    time.sleep(0.06)
+
+    assert breaker.allow()
+    assert not breaker.allow()  # Only one probe while it is in flight
+    breaker.record_failure()
+    assert breaker.stats()["state"] == "open"
+
+    time.sleep(0.06)
+    assert breaker.allow()
+    breaker.record_success()
+    assert breaker.stats()["state"] == "closed"
+    assert breaker.allow()
+
+
+def test_released_probe_can_be_taken_again():
+    breaker = CircuitBreaker(failure_threshold=1, recovery_timeout=0)
+    breaker.record_failure()
+    assert breaker.allow()
+    assert not breaker.allow()
+    breaker.release_probe()  # e.g. the probe call was shed before it was sent
+    assert breaker.stats()["state"] == "half_open"
+    assert breaker.allow()
+    breaker.record_success()
+    breaker.release_probe()  # No-op once closed
+    assert breaker.stats()["state"] == "closed"
+
+
+if __name__ == "__main__":
+    test_opens_after_consecutive_failures()
+    test_success_resets_failure_count()
+    test_half_open_lets_one_probe_through()
+    test_released_probe_can_be_taken_again()
+    print("All tests passed!")
@@ -0,0 +1,99 @@
+# test_compression.py
+import sys
+import os
+import asyncio
+import gzip
+
+# Add parent directory to path so we can import compression
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from compression import (
+    BodyDecodeError, CompressionMiddleware, THREADED_DECOMPRESSION_BYTES,
+    choose_encoding, compress, decompress_body, decompress_body_async, zstandard,
+)
+
+BODY = b'{"messages": ["I love Python"]}' * 200
+
+
+def decode_error(body, encoding, limit=None):
+    try:
+        decompress_body(body, encoding, limit)
+    except BodyDecodeError as e:
+        return e.status_code
+    return None
+
+
+def test_decompress_round_trip_and_limits():
+    assert decompress_body(BODY, None) == BODY
+    for encoding in ("gzip", "zstd") if zstandard is not None else ("gzip",):
+        compressed = compress(BODY, encoding)
+        assert decompress_body(compressed, encoding) == BODY
+        assert decode_error(compressed, encoding, limit=100) == 413
+        assert decode_error(compressed[:-8], encoding) == 400
+        assert decode_error(b"not compressed", encoding) == 400
+    assert decode_error(BODY, "br") == 415
+
+
+def test_large_bodies_are_inflated_off_the_event_loop():
+    large = os.urandom(THREADED_DECOMPRESSION_BYTES).hex().encode()
+    compressed = compress(large, "gzip")
+    assert len(compressed) > THREADED_DECOMPRESSION_BYTES
+    assert asyncio.run(decompress_body_async(compressed, "gzip")) == large
+    assert asyncio.run(decompress_body_async(compress(BODY, "gzip"), "gzip")) == BODY
+    try:
+        asyncio.run(decompress_body_async(compressed, "gzip", limit=100))
+    except BodyDecodeError as e:
+        assert e.status_code == 413
+    else:
+        raise AssertionError("expected a 413")
+
+
+def test_choose_encoding():
+    assert choose_encoding("gzip, deflate") == "gzip"
+    assert choose_encoding("gzip;q=0") is None
+    assert choose_encoding("identity") is None
+    if zstandard is not None:
+        assert choose_encoding("gzip, br, zstd") == "zstd"
+        assert choose_encoding("zstd;q=0, gzip") == "gzip"
+
+
+def run_middleware(body, more_body=False, accept_encoding="gzip", minimum_size=100):
+    async def app(scope, receive, send):
+        await send({"type": "http.response.start", "status": 200, "headers": [(b"content-length", str(len(body)).encode())]})
+        await send({"type": "http.response.body", "body": body, "more_body": more_body})
+        if more_body:
+            await send({"type": "http.response.body", "body": b""})
+
+    sent = []
+
+    async def send(message):
+        sent.append(message)
+
+    scope = {"type": "http", "headers": [(b"accept-encoding", accept_encoding.encode())]}
+    asyncio.run(CompressionMiddleware(app, minimum_size=minimum_size)(scope, None, send))
+    return dict(sent[0]["headers"]), b"".join(m.get("body", b"") for m in sent[1:])
+
+
+def test_middleware_compresses_complete_responses_only():
+    headers, body = run_middleware(BODY)
+    assert headers[b"content-encoding"] == b"gzip"
+    assert int(headers[b"content-length"]) == len(body)
+    assert gzip.decompress(body) == BODY
+
+    headers, body = run_middleware(b"small")
+    assert b"content-encoding" not in headers and body == b"small"
+
+    # Streamed responses go out untouched
+    headers, body = run_middleware(BODY, more_body=True)
+    assert b"content-encoding" not in headers and body == BODY
+
+    headers, body = run_middleware(BODY, accept_encoding="identity")
+    assert b"content-encoding" not in headers
+
+
+if __name__ == "__main__":
+    test_decompress_round_trip_and_limits()
+    test_large_bodies_are_inflated_off_the_event_loop()
+    test_choose_encoding()
+    test_middleware_compresses_complete_responses_only()
+    print("All tests passed!")
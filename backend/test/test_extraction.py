@@ -1,4 +1,5 @@
 # test_extraction.py
+import io
 import json
 import sys
 import os
@@ -6,7 +7,10 @@ import os
 # Add parent directory to path so we can import memory_extractor
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
-from memory_extractor import extract_messages
+import extract_stream
+from memory_extractor import extract_messages, extract_conversations, iter_extractions, expand_compact, scan_facts, current_lexicon
+
+TEST_DIR = os.path.dirname(os.path.abspath(__file__))
 
 
 def test_extract_sample():
@@ -19,8 +23,92 @@ def test_extract_sample():
     # expect at least one preference and one fact
     assert len(res['preferences']) > 0
     assert len(res['facts']) > 0
-    
+
+
+def test_lexicon_matcher_matches_substring_scan():
+    messages = [
+        "I use Git and GitHub, plus JavaScript and Java.",
+        "Feeling down, frustrated and worried today",
+        "",
+        "nothing relevant here",
+    ]
+    lexicon = current_lexicon()
+    for message in messages:
+        message_lower = message.lower()
+        expected = [i for i, (_, _, keyword) in enumerate(lexicon.entries) if keyword.lower() in message_lower]
+        assert lexicon.matcher.find(message_lower) == expected
+
+
+def test_demo_corpus_regression():
+    # Expected output was recorded from the per-pattern re.findall extractor
+    # on the comprehensive_demo.py 30-message corpus.
+    with open(os.path.join(TEST_DIR, "demo_corpus_expected.json"), "r") as f:
+        corpus = json.load(f)
+    assert extract_messages(corpus["messages"]) == corpus["expected"]
+
+
+def test_scan_facts_overlapping_facts():
+    assert scan_facts("Reach me at 9876543210@example.com") == [
+        ("email", "9876543210@example.com"),
+        ("phone", "9876543210"),
+    ]
+    assert scan_facts("I'M Alex, living in Paris") == [
+        ("name", "Alex"),
+        ("location", "Paris"),
+        ("location", "Paris"),
+    ]
+
+
+def test_extract_conversations_keeps_order():
+    with open(os.path.join(TEST_DIR, "sample_messages.json"), "r") as f:
+        messages = json.load(f)
+    conversations = [messages[i:i + 3] for i in range(len(messages))]
+    expected = [extract_messages(conversation) for conversation in conversations]
+    # Force the process pool with small chunks and a tight in-flight cap
+    assert extract_conversations(conversations, workers=2, chunk_size=4, max_in_flight=2, in_process_below=0) == expected
+    assert extract_conversations(iter(conversations), workers=1) == expected
+
+
+def test_iter_extractions_streams_same_findings():
+    with open(os.path.join(TEST_DIR, "sample_messages.json"), "r") as f:
+        messages = json.load(f)
+    merged = {"preferences": [], "emotional_patterns": [], "facts": []}
+    for index, findings in enumerate(iter_extractions(iter(messages))):
+        assert findings["index"] == index
+        for key in merged:
+            merged[key].extend(findings[key])
+    assert merged == extract_messages(messages)
+
+
+def test_stream_reader_handles_split_chunks():
+    messages = ["I love Python, \"really\"", "", "[not] the end]", "My name is Surya."]
+    original_read_size = extract_stream.READ_SIZE
+    extract_stream.READ_SIZE = 3
+    try:
+        assert list(extract_stream.iter_messages(io.StringIO(json.dumps(messages)))) == messages
+    finally:
+        extract_stream.READ_SIZE = original_read_size
+    jsonl = "\n".join(json.dumps({"message": m}) for m in messages)
+    assert list(extract_stream.iter_messages(io.StringIO(jsonl))) == messages
+
+
+def test_compact_output_references_messages_by_index():
+    with open(os.path.join(TEST_DIR, "sample_messages.json"), "r") as f:
+        messages = json.load(f)
+    compact = extract_messages(messages, compact=True)
+    assert len(compact["messages"]) == len(messages)
+    assert all("context" not in pref for pref in compact["preferences"])
+    assert compact["messages"][10] is None  # "No experience in mobile conversion yet."
+    assert expand_compact(compact) == extract_messages(messages)
+
 
 if __name__ == "__main__":
     test_extract_sample()
+    test_lexicon_matcher_matches_substring_scan()
+    test_demo_corpus_regression()
+    test_scan_facts_overlapping_facts()
+    test_extract_conversations_keeps_order()
+    test_iter_extractions_streams_same_findings()
+    test_stream_reader_handles_split_chunks()
+    test_compact_output_references_messages_by_index()
     print("All tests passed!")
\ No newline at end of file
@@ -0,0 +1,92 @@
+# test_lexicon.py
+import json
+import os
+import sys
+import tempfile
+import time
+
+# Add parent directory to path so we can import lexicon and memory_extractor
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import memory_extractor
+from lexicon import LexiconWatcher, compile_lexicon, lexicon_entries, read_lexicon
+
+
+def write_lexicon(root):
+    with open(os.path.join(root, "topics.json"), "w") as f:
+        json.dump({"preferences": {"topic": ["kubernetes", "Python"]}, "emotional_patterns": {"joy": ["stoked"]}}, f)
+    os.makedirs(os.path.join(root, "preferences"))
+    with open(os.path.join(root, "preferences", "tools.txt"), "w") as f:
+        f.write("# editors\nneovim\n\nterraform  # infra\n")
+
+
+def test_read_and_merge_directory():
+    builtin = {"preferences": memory_extractor.PREF_MAP}
+    with tempfile.TemporaryDirectory() as root:
+        write_lexicon(root)
+        entries = lexicon_entries(builtin, read_lexicon(root))
+    # External terms come after every built-in entry, so built-in ids never move
+    assert entries[:len(lexicon_entries(builtin))] == lexicon_entries(builtin)
+    # "Python" repeats the built-in "python" only in another label, so it stays there
+    assert entries[len(lexicon_entries(builtin)):] == [
+        ("preferences", "topic", "kubernetes"),
+        ("preferences", "topic", "Python"),
+        ("preferences", "tools", "neovim"),
+        ("preferences", "tools", "terraform"),
+        ("emotional_patterns", "joy", "stoked"),
+    ]
+    assert lexicon_entries(builtin, builtin) == lexicon_entries(builtin)
+
+
+def test_compiled_index_is_cached():
+    lexicon = {"preferences": {"tools": ["neovim", "terraform"]}}
+    with tempfile.TemporaryDirectory() as cache_dir:
+        first = compile_lexicon(lexicon, cache_dir=cache_dir)
+        second = compile_lexicon(lexicon, cache_dir=cache_dir)
+        changed = compile_lexicon({"preferences": {"tools": ["neovim"]}}, cache_dir=cache_dir)
+    assert not first.from_cache and second.from_cache and not changed.from_cache
+    assert second.matcher.find("i use terraform with neovim") == [0, 1]
+    assert changed.digest != first.digest
+
+
+def test_reload_swaps_index_used_by_extraction():
+    original = memory_extractor.current_lexicon()
+    try:
+        with tempfile.TemporaryDirectory() as root:
+            write_lexicon(root)
+            assert extract_values(["Deploying on Kubernetes today, stoked!"]) == []
+            memory_extractor.reload_lexicon(root)
+            assert extract_values(["Deploying on Kubernetes today, stoked!"]) == ["kubernetes", "stoked"]
+            assert memory_extractor.current_lexicon().stats()["source"] == root
+    finally:
+        memory_extractor.LEXICON = original
+
+
+def test_watcher_reloads_on_change():
+    reloads = []
+    with tempfile.TemporaryDirectory() as root:
+        path = os.path.join(root, "extra.json")
+        with open(path, "w") as f:
+            json.dump({"preferences": {"topic": ["kubernetes"]}}, f)
+        watcher = LexiconWatcher(root, lambda: reloads.append(1), interval=0.01)
+        watcher.start()
+        with open(path, "w") as f:
+            json.dump({"preferences": {"topic": ["kubernetes", "helm"]}}, f)
+        deadline = time.time() + 2
+        while not reloads and time.time() < deadline:
+            time.sleep(0.01)
+        watcher.stop()
+    assert reloads
+
+
+def extract_values(messages):
+    result = memory_extractor.extract_messages(messages)
+    return [p["value"] for p in result["preferences"]] + [e["trigger"] for e in result["emotional_patterns"]]
+
+
+if __name__ == "__main__":
+    test_read_and_merge_directory()
+    test_compiled_index_is_cached()
+    test_reload_swaps_index_used_by_extraction()
+    test_watcher_reloads_on_change()
+    print("All tests passed!")
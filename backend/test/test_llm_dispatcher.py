@@ -0,0 +1,205 @@
+# test_llm_dispatcher.py
+import sys
+import os
+import asyncio
+import time
+
+# Add parent directory to path so we can import llm_dispatcher
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from llm_dispatcher import LLMDispatcher, QueueFullError, PRIORITY_INTERACTIVE, PRIORITY_BATCH
+
+
+class FakeResponse:
+    def __init__(self, headers):
+        self.headers = headers
+
+
+class RateLimited(Exception):
+    status_code = 429
+
+    def __init__(self, retry_after):
+        super().__init__("rate limited")
+        self.response = FakeResponse({"retry-after": str(retry_after)})
+
+
+def test_concurrency_cap():
+    dispatcher = LLMDispatcher(rate_per_second=0, max_concurrency=2)
+    peak = []
+
+    async def call():
+        peak.append(dispatcher.active)
+        await asyncio.sleep(0.01)
+
+    async def main():
+        await asyncio.gather(*(dispatcher.run(call) for _ in range(6)))
+
+    asyncio.run(main())
+    assert max(peak) == 2
+    assert dispatcher.stats()["active"] == 0
+
+
+def test_interactive_calls_jump_the_batch_queue():
+    dispatcher = LLMDispatcher(rate_per_second=0, max_concurrency=1)
+    order = []
+
+    def call(name):
+        async def fn():
+            order.append(name)
+            await asyncio.sleep(0.01)
+        return fn
+
+    async def main():
+        tasks = [asyncio.ensure_future(dispatcher.run(call("first"), PRIORITY_BATCH))]
+        await asyncio.sleep(0)
+        tasks += [asyncio.ensure_future(dispatcher.run(call(f"batch{i}"), PRIORITY_BATCH)) for i in range(2)]
+        tasks.append(asyncio.ensure_future(dispatcher.run(call("interactive"), PRIORITY_INTERACTIVE)))
+        await asyncio.gather(*tasks)
+
+    asyncio.run(main())
+    assert order == ["first", "interactive", "batch0", "batch1"]
+
+
+def test_full_queue_sheds_lowest_priority():
+    dispatcher = LLMDispatcher(rate_per_second=0, max_concurrency=1, max_queue=1)
+
+    async def call():
+        await asyncio.sleep(0.01)
+        return "ok"
+
+    async def main():
+        running = asyncio.ensure_future(dispatcher.run(call))
+        await asyncio.sleep(0)
+        batch = asyncio.ensure_future(dispatcher.run(call, PRIORITY_BATCH))
+        await asyncio.sleep(0)
+        interactive = asyncio.ensure_future(dispatcher.run(call, PRIORITY_INTERACTIVE))
+        await asyncio.sleep(0)
+        another_batch = asyncio.ensure_future(dispatcher.run(call, PRIORITY_BATCH))
+        return await asyncio.gather(running, batch, interactive, another_batch, return_exceptions=True)
+
+    running, batch, interactive, another_batch = asyncio.run(main())
+    assert running == "ok" and interactive == "ok"
+    assert isinstance(batch, QueueFullError)
+    assert isinstance(another_batch, QueueFullError)
+    assert dispatcher.stats()["shed"] == 2
+
+
+def test_cancelled_waiter_does_not_hold_a_queue_place():
+    dispatcher = LLMDispatcher(rate_per_second=0, max_concurrency=1, max_queue=1)
+
+    async def call():
+        return "ok"
+
+    async def main():
+        async with dispatcher.slot():
+            waiter = asyncio.ensure_future(dispatcher.run(call, PRIORITY_BATCH))
+            await asyncio.sleep(0)
+            # Arrives while the cancelled waiter is still in the full queue
+            late = asyncio.ensure_future(dispatcher.run(call, PRIORITY_INTERACTIVE))
+            waiter.cancel()
+            await asyncio.sleep(0)
+        await asyncio.gather(waiter, return_exceptions=True)
+        return await late
+
+    assert asyncio.run(main()) == "ok"
+    assert dispatcher.stats()["shed"] == 0
+    assert dispatcher.stats()["active"] == 0 and dispatcher.stats()["queued"] == 0
+
+
+def test_retry_after_is_honored():
+    dispatcher = LLMDispatcher(rate_per_second=0, max_retries=2)
+    attempts = []
+
+    async def call():
+        attempts.append(time.monotonic())
+        if len(attempts) == 1:
+            raise RateLimited(0.05)
+        return "ok"
+
+    assert asyncio.run(dispatcher.run(call)) == "ok"
+    assert len(attempts) == 2
+    assert attempts[1] - attempts[0] >= 0.05
+    assert dispatcher.stats()["retries"] == 1
+
+
+def test_non_retryable_errors_raise_immediately():
+    dispatcher = LLMDispatcher(rate_per_second=0, max_retries=2)
+    attempts = []
+
+    async def call():
+        attempts.append(1)
+        raise ValueError("bad request")
+
+    try:
+        asyncio.run(dispatcher.run(call))
+        assert False, "expected ValueError"
+    except ValueError:
+        pass
+    assert len(attempts) == 1
+
+
+def test_cancelled_waiter_is_skipped():
+    dispatcher = LLMDispatcher(rate_per_second=0, max_concurrency=1)
+    ran = []
+
+    async def call():
+        ran.append(1)
+
+    async def main():
+        async with dispatcher.slot():
+            waiter = asyncio.ensure_future(dispatcher.run(call))
+            await asyncio.sleep(0)
+            # Released before the cancelled waiter gets to leave the queue
+            waiter.cancel()
+        await asyncio.gather(waiter, return_exceptions=True)
+        await dispatcher.run(call)
+
+    asyncio.run(main())
+    assert ran == [1]
+    assert dispatcher.stats()["active"] == 0 and dispatcher.stats()["queued"] == 0
+
+
+def test_run_holding_keeps_the_slot():
+    dispatcher = LLMDispatcher(rate_per_second=0, max_concurrency=1)
+
+    async def call():
+        return "stream"
+
+    async def main():
+        assert await dispatcher.run_holding(call) == "stream"
+        assert dispatcher.stats()["active"] == 1
+        waiter = asyncio.ensure_future(dispatcher.run(call))
+        await asyncio.sleep(0.01)
+        assert not waiter.done()  # Still waiting for the held slot
+        dispatcher.release()
+        assert await waiter == "stream"
+
+    asyncio.run(main())
+    assert dispatcher.stats()["active"] == 0
+
+
+def test_token_bucket_limits_rate():
+    dispatcher = LLMDispatcher(rate_per_second=50, burst=1, max_concurrency=10)
+
+    async def call():
+        return time.monotonic()
+
+    async def main():
+        return await asyncio.gather(*(dispatcher.run(call) for _ in range(4)))
+
+    started = asyncio.run(main())
+    # One call from the burst, then one every 20ms
+    assert max(started) - min(started) >= 0.05
+
+
+if __name__ == "__main__":
+    test_concurrency_cap()
+    test_interactive_calls_jump_the_batch_queue()
+    test_full_queue_sheds_lowest_priority()
+    test_cancelled_waiter_does_not_hold_a_queue_place()
+    test_retry_after_is_honored()
+    test_non_retryable_errors_raise_immediately()
+    test_cancelled_waiter_is_skipped()
+    test_run_holding_keeps_the_slot()
+    test_token_bucket_limits_rate()
+    print("All tests passed!")
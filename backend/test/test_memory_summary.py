@@ -0,0 +1,69 @@
+# test_memory_summary.py
+import sys
+import os
+
+# Add parent directory to path so we can import memory_summary
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from memory_extractor import extract_messages, summarize_messages
+from memory_summary import SpaceSaving, MemorySummary
+from session_memory import SessionMemoryStore
+
+
+def test_space_saving_keeps_heavy_hitters():
+    sketch = SpaceSaving(capacity=10)
+    stream = ["a"] * 50 + ["b"] * 30 + [f"rare{i}" for i in range(100)] + ["a"] * 10
+    for key in stream:
+        sketch.add(key)
+    assert len(sketch) == 10
+    top = dict(sketch.top(2))
+    assert set(top) == {"a", "b"}
+    # Keys above total / capacity (19) are kept; counts are never too low
+    assert top["a"] >= 60 and top["a"] - sketch.errors["a"] <= 60
+    assert sketch.evictions > 0
+
+
+def test_summary_ranks_and_counts_once_per_message():
+    messages = [
+        "I love Python, python is great.",
+        "I'm worried about the deadline.",
+        "Python and Docker are my tools, I love them.",
+        "Sorry, I'm sad today.",
+        "Awesome, thanks!",
+    ]
+    summary = summarize_messages(messages, top_k=2, max_examples=2)
+    assert [p["value"] for p in summary["preferences"]] == ["python", "docker"]
+    assert summary["preferences"][0]["count"] == 2
+    assert summary["preferences"][0]["confidence"] == round(2 / 3, 3)
+    joy = summary["emotional_patterns"][0]
+    assert joy["tone"] == "joy" and joy["frequency"] == 3
+    assert joy["examples"] == messages[0:1] + messages[2:3]
+    assert len(summary["emotional_patterns"]) == 2
+    assert summary["summary"] == {"messages": 5, "approximate": False}
+
+
+def test_summary_size_does_not_grow_with_history():
+    messages = ["I love Python and VSCode, my name is Sam.", "I'm worried about git."] * 500
+    small = summarize_messages(messages[:10])
+    large = summarize_messages(messages)
+    assert len(str(large)) <= len(str(small)) + 20
+    assert large["emotional_patterns"][0]["frequency"] == 500
+    assert len(large["emotional_patterns"][0]["examples"]) == 3
+
+
+def test_session_summary_matches_one_shot():
+    messages = ["I love Python.", "My name is Sam.", "I'm worried about Rust.", "Thanks, that was great!"]
+    store = SessionMemoryStore()
+    store.extract("s", messages[:2], aggregate=True)
+    assert store.extract("s", messages, aggregate=True) == summarize_messages(messages)
+    # The summary can also be fed compact results directly
+    summary = MemorySummary().add(extract_messages(messages, compact=True), messages)
+    assert summary.result() == summarize_messages(messages)
+
+
+if __name__ == "__main__":
+    test_space_saving_keeps_heavy_hitters()
+    test_summary_ranks_and_counts_once_per_message()
+    test_summary_size_does_not_grow_with_history()
+    test_session_summary_matches_one_shot()
+    print("All tests passed!")
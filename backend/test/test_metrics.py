@@ -0,0 +1,51 @@
+# test_metrics.py
+import sys
+import os
+
+# Add parent directory to path so we can import metrics
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from metrics import Counter, Histogram, MetricsRegistry
+
+
+def test_histogram_renders_cumulative_buckets():
+    histogram = Histogram("stage_seconds", "Stage latency.", ["stage"], buckets=(0.1, 1))
+    for value in (0.05, 0.5, 0.5, 5):
+        histogram.observe(value, "llm_call")
+    lines = histogram.render()
+    assert lines[:2] == ["# HELP stage_seconds Stage latency.", "# TYPE stage_seconds histogram"]
+    assert 'stage_seconds_bucket{stage="llm_call",le="0.1"} 1' in lines
+    assert 'stage_seconds_bucket{stage="llm_call",le="1.0"} 3' in lines
+    assert 'stage_seconds_bucket{stage="llm_call",le="+Inf"} 4' in lines
+    assert 'stage_seconds_sum{stage="llm_call"} 6.05' in lines
+    assert 'stage_seconds_count{stage="llm_call"} 4' in lines
+
+
+def test_counter_labels_and_escaping():
+    counter = Counter("llm_requests_total", "LLM requests.", ["style", "outcome"])
+    counter.inc("therapist", "success")
+    counter.inc("therapist", "success")
+    counter.inc('odd"style', "failure")
+    lines = counter.render()
+    assert 'llm_requests_total{style="therapist",outcome="success"} 2' in lines
+    assert 'llm_requests_total{style="odd\\"style",outcome="failure"} 1' in lines
+
+
+def test_disabled_registry_records_nothing():
+    registry = MetricsRegistry()
+    counter = registry.register(Counter("calls_total", "Calls."))
+    histogram = registry.register(Histogram("latency_seconds", "Latency."))
+    registry.set_enabled(False)
+    counter.inc()
+    with histogram.time():
+        pass
+    assert counter.value() == 0
+    assert histogram.count() == 0
+    assert registry.render().count("\n") == 4  # Only HELP and TYPE lines
+
+
+if __name__ == "__main__":
+    test_histogram_renders_cumulative_buckets()
+    test_counter_labels_and_escaping()
+    test_disabled_registry_records_nothing()
+    print("All tests passed!")
@@ -0,0 +1,304 @@
+# test_personality_engine.py
+import asyncio
+import subprocess
+import sys
+import os
+import time
+from contextlib import contextmanager
+from types import SimpleNamespace
+
+# Add parent directory to path so we can import personality_engine
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import personality_engine
+from circuit_breaker import CircuitBreaker
+from llm_dispatcher import QueueFullError
+from personality_engine import ReasoningSplitter, parse_llm_output, transform_replies_async, STYLE_INSTRUCTIONS
+from prompt_compiler import PromptCompiler, estimate_prompt_tokens
+
+USER_CONTEXT = {
+    "preferences": [{"type": "language", "value": "python"}, {"type": "tools", "value": "docker"}],
+    "emotional_patterns": [{"emotion": "fear", "trigger": "worried"}],
+    "facts": [{"type": "name", "value": "Sam"}, {"type": "email", "value": "sam@example.com"}],
+}
+
+
+class StubCompletions:
+    """Stands in for client.chat.completions, answering after delay seconds.
+
+    Prompts containing a key of slow take that key's delay instead.
+    """
+
+    def __init__(self, delay):
+        self.delay = delay
+        self.slow = {}
+        self.calls = 0
+        self.streams = []
+
+    async def create(self, **kwargs):
+        self.calls += 1
+        prompt = str(kwargs.get("messages"))
+        await asyncio.sleep(next((delay for text, delay in self.slow.items() if text in prompt), self.delay))
+        if kwargs.get("stream"):
+            self.streams.append(StubStream())
+            return self.streams[-1]
+        return self.response()
+
+    def create_blocking(self, **kwargs):
+        self.calls += 1
+        time.sleep(self.delay)
+        return self.response()
+
+    def response(self):
+        message = SimpleNamespace(content="Take it one step at a time.")
+        return SimpleNamespace(choices=[SimpleNamespace(message=message)])
+
+
+
+class StubStream:
+    """Stands in for openai's AsyncStream, remembering whether it was closed."""
+
+    def __init__(self):
+        self.closed = False
+
+    async def __aiter__(self):
+        for text in ["Take it ", "one step ", "at a time."]:
+            yield SimpleNamespace(choices=[SimpleNamespace(delta=SimpleNamespace(content=text))])
+
+    async def close(self):
+        self.closed = True
+
+
+@contextmanager
+def stub_llm(delay):
+    """Route LLM calls to a StubCompletions behind a fresh circuit breaker."""
+    completions = StubCompletions(delay)
+    saved = (os.environ.get("OPENROUTER_API_KEY"), personality_engine._async_client,
+             personality_engine._sync_client, personality_engine.LLM_CIRCUIT)
+    os.environ["OPENROUTER_API_KEY"] = "test-key"
+    personality_engine._async_client = SimpleNamespace(chat=SimpleNamespace(completions=completions))
+    personality_engine._sync_client = SimpleNamespace(chat=SimpleNamespace(completions=SimpleNamespace(create=completions.create_blocking)))
+    personality_engine.LLM_CIRCUIT = CircuitBreaker(failure_threshold=3, recovery_timeout=60)
+    try:
+        yield completions
+    finally:
+        (api_key, personality_engine._async_client,
+         personality_engine._sync_client, personality_engine.LLM_CIRCUIT) = saved
+        if api_key is None:
+            os.environ.pop("OPENROUTER_API_KEY", None)
+        else:
+            os.environ["OPENROUTER_API_KEY"] = api_key
+
+
+class SheddingDispatcher:
+    """LLM_DISPATCHER stand-in whose queue is always full."""
+
+    async def run(self, fn, priority=None):
+        raise QueueFullError("LLM dispatch queue is full")
+
+    run_holding = run
+
+
+def split_stream(pieces):
+    splitter = ReasoningSplitter()
+    events = []
+    for piece in pieces:
+        events.extend(splitter.feed(piece))
+    events.extend(splitter.finish())
+    reply = "".join(text for kind, text in events if kind == "reply")
+    reasoning = "".join(text for kind, text in events if kind == "reasoning")
+    return reply, reasoning
+
+
+def test_reasoning_splitter_matches_final_parse():
+    output = "Hey! Grab a coffee and start with the data. Reasoning: casual tone with humor."
+    # Marker split across tokens
+    pieces = ["Hey! Grab a coffee ", "and start with the data. Reas", "oning: casual tone", " with humor."]
+    reply, reasoning = split_stream(pieces)
+    parsed = parse_llm_output(output, "Start with the data.", "witty_friend")
+    assert reply.strip() == parsed["transformed_reply"]
+    assert parsed["reasoning"] == f"LLM transformation: {reasoning.strip()}"
+
+
+def test_reasoning_splitter_without_marker():
+    assert split_stream(["Take it ", "one step ", "at a time."]) == ("Take it one step at a time.", "")
+
+
+def test_system_prefix_is_static_per_style():
+    compiler = PromptCompiler(STYLE_INSTRUCTIONS)
+    with_context = compiler.compile("Here is a plan.", "therapist", USER_CONTEXT)
+    without_context = compiler.compile("Another reply.", "therapist")
+    assert with_context[0]["content"] == without_context[0]["content"]
+    assert "Sam" not in with_context[0]["content"]
+    assert "Sam" in with_context[1]["content"]
+    assert "sam@example.com" not in with_context[1]["content"]
+    assert estimate_prompt_tokens(with_context) > estimate_prompt_tokens(without_context)
+
+
+def test_context_block_trims_lowest_priority_first():
+    full = PromptCompiler(STYLE_INSTRUCTIONS).context_block(USER_CONTEXT)
+    assert full == "Emotional patterns: fear (trigger: worried). Personal info: Sam. User preferences: language: python, tools: docker."
+    trimmed = PromptCompiler(STYLE_INSTRUCTIONS, context_token_budget=20).context_block(USER_CONTEXT)
+    assert trimmed.startswith("Emotional patterns: fear")
+    assert "docker" not in trimmed
+
+
+def test_batch_transform_dedupes_and_keeps_order():
+    calls = []
+    transform_reply_async = personality_engine.transform_reply_async
+
+    async def counting_transform(base_reply, style, user_context=None, budget=None, priority=None):
+        calls.append((base_reply, style))
+        return await transform_reply_async(base_reply, style, user_context, budget, priority)
+
+    pairs = [("Batch plan A", "therapist"), ("Batch plan B", "witty_friend"),
+             ("Batch plan A", "therapist"), ("Batch plan A", "calm_mentor")]
+    personality_engine.transform_reply_async = counting_transform
+    try:
+        with stub_llm(delay=0) as completions:
+            results = asyncio.run(transform_replies_async(pairs, USER_CONTEXT, max_concurrency=2))
+    finally:
+        personality_engine.transform_reply_async = transform_reply_async
+
+    assert sorted(calls) == sorted(set(pairs))
+    assert completions.calls == 3
+    assert [(r["original_reply"], r["personality_style"]) for r in results] == pairs
+    assert all(r["used_llm"] and not r["fallback"] for r in results)
+    assert results[0] == results[2] and results[0] is not results[2]
+
+
+def test_batch_transform_falls_back_per_item():
+    pairs = [("Batch plan fast", "therapist"), ("Batch plan slow", "therapist"), ("Batch plan fast", "witty_friend")]
+    with stub_llm(delay=0) as completions:
+        completions.slow["Batch plan slow"] = 1.0
+        results = asyncio.run(transform_replies_async(pairs, USER_CONTEXT, budget=0.3))
+
+    # Only the pair that ran past the batch budget is answered rule-based
+    assert [r["fallback"] for r in results] == [False, True, False]
+    assert [r["used_llm"] for r in results] == [True, False, True]
+
+
+def test_tiny_client_deadline_leaves_circuit_closed():
+    async def main():
+        return await asyncio.gather(*[
+            personality_engine.transform_reply_async(f"Deadline plan {i}", "therapist", budget=0.06) for i in range(5)
+        ])
+
+    with stub_llm(delay=0.5) as completions:
+        results = asyncio.run(main())
+        assert not any(result["used_llm"] for result in results)
+        assert completions.calls == 5
+        assert personality_engine.LLM_CIRCUIT.stats()["state"] == "closed"
+
+        # No budget left at all: no call is made and nothing is recorded
+        comparison = asyncio.run(personality_engine.show_personality_comparison_async(
+            "Deadline plan", deadline=0.001, single_call=True
+        ))
+        assert not any(v["used_llm"] for v in comparison["personality_variations"])
+        assert completions.calls == 5
+        assert personality_engine.LLM_CIRCUIT.stats()["consecutive_failures"] == 0
+
+
+def test_slow_abandoned_call_counts_once():
+    async def main():
+        return await asyncio.gather(*[
+            personality_engine.transform_reply_async("Slow plan", "therapist", budget=0.15) for _ in range(3)
+        ])
+
+    slow_call_ms = personality_engine.LLM_SLOW_CALL_MS
+    personality_engine.LLM_SLOW_CALL_MS = 50
+    try:
+        with stub_llm(delay=0.5) as completions:
+            results = asyncio.run(main())
+            assert not any(result["used_llm"] for result in results)
+            # Three coalesced callers gave up on one upstream call
+            assert completions.calls == 1
+            assert personality_engine.LLM_CIRCUIT.stats()["consecutive_failures"] == 1
+    finally:
+        personality_engine.LLM_SLOW_CALL_MS = slow_call_ms
+
+
+def test_shed_or_cancelled_probe_is_released():
+    async def stream_events(reply):
+        return [event async for event, _ in personality_engine.stream_transform_reply(reply, "therapist")]
+
+    dispatcher = personality_engine.LLM_DISPATCHER
+    with stub_llm(delay=0.3) as completions:
+        breaker = personality_engine.LLM_CIRCUIT = CircuitBreaker(failure_threshold=1, recovery_timeout=0)
+        breaker.record_failure()
+
+        personality_engine.LLM_DISPATCHER = SheddingDispatcher()
+        try:
+            # Each path takes the half-open probe, gets shed and must give it back
+            shed = asyncio.run(personality_engine.transform_reply_async("Probe plan", "therapist"))
+            assert not shed["used_llm"]
+            assert asyncio.run(stream_events("Probe plan")) == ["token", "done"]
+            comparison = asyncio.run(personality_engine.show_personality_comparison_async("Probe plan", single_call=True))
+            assert not any(v["used_llm"] for v in comparison["personality_variations"])
+        finally:
+            personality_engine.LLM_DISPATCHER = dispatcher
+        assert breaker.stats() == {"state": "half_open", "consecutive_failures": 1, "short_circuited": 0, "retry_in_seconds": None}
+
+        # A probe abandoned by a short deadline is given back as well
+        timed_out = asyncio.run(personality_engine.transform_reply_async("Probe plan", "therapist", budget=0.1))
+        assert not timed_out["used_llm"] and completions.calls == 1
+
+        completions.delay = 0
+        result = asyncio.run(personality_engine.transform_reply_async("Probe plan", "therapist"))
+        assert result["used_llm"]
+        assert breaker.stats()["state"] == "closed"
+
+
+def test_stream_holds_its_dispatcher_slot():
+    dispatcher = personality_engine.LLM_DISPATCHER
+
+    async def main():
+        events = personality_engine.stream_transform_reply("Stream slot plan", "therapist")
+        first = await events.__anext__()
+        # Mid-stream the call still counts against LLM_MAX_CONCURRENCY
+        assert dispatcher.stats()["active"] == 1
+        await events.aclose()  # The client went away
+        return first
+
+    with stub_llm(delay=0) as completions:
+        assert asyncio.run(main())[0] == "token"
+        assert dispatcher.stats()["active"] == 0
+        assert completions.streams[0].closed
+        assert personality_engine.LLM_CIRCUIT.allow()
+
+
+def test_comparisons_keep_their_deadline():
+    with stub_llm(delay=0.5):
+        started = time.monotonic()
+        comparison = personality_engine.show_personality_comparison("Sync deadline plan", deadline=0.1)
+        assert time.monotonic() - started < 0.4
+        assert not any(v["used_llm"] for v in comparison["personality_variations"])
+
+        # An explicit zero is a deadline too, not "use the default"
+        started = time.monotonic()
+        comparison = asyncio.run(personality_engine.show_personality_comparison_async("Async deadline plan", deadline=0))
+        assert time.monotonic() - started < 0.4
+        assert not any(v["used_llm"] for v in comparison["personality_variations"])
+
+
+def test_openai_is_imported_lazily():
+    # Cold starts should not pay for the openai import until a client is needed
+    code = "import sys, personality_engine; assert 'openai' not in sys.modules and 'httpx' not in sys.modules"
+    env = {**os.environ, "OPENROUTER_API_KEY": "test-key"}
+    subprocess.run([sys.executable, "-c", code], cwd=os.path.dirname(os.path.dirname(os.path.abspath(__file__))), env=env, check=True)
+
+
+if __name__ == "__main__":
+    test_reasoning_splitter_matches_final_parse()
+    test_reasoning_splitter_without_marker()
+    test_system_prefix_is_static_per_style()
+    test_context_block_trims_lowest_priority_first()
+    test_batch_transform_dedupes_and_keeps_order()
+    test_batch_transform_falls_back_per_item()
+    test_tiny_client_deadline_leaves_circuit_closed()
+    test_slow_abandoned_call_counts_once()
+    test_shed_or_cancelled_probe_is_released()
+    test_stream_holds_its_dispatcher_slot()
+    test_comparisons_keep_their_deadline()
+    test_openai_is_imported_lazily()
+    print("All tests passed!")
@@ -0,0 +1,51 @@
+# test_profiling.py
+import sys
+import os
+import re
+
+# Add parent directory to path so we can import profiling
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from profiling import RequestProfile, active_profile, add_llm_wait
+
+
+def busy_work():
+    pattern = re.compile(r"\b(\w+)@(\w+)\.com\b")
+    return [pattern.search(f"user{i} wrote to user{i}@example.com") for i in range(2000)]
+
+
+def test_report_lists_functions_regex_and_llm_wait():
+    with RequestProfile() as profile:
+        assert active_profile() is profile
+        busy_work()
+        add_llm_wait(0.25)
+    assert active_profile() is None
+
+    report = profile.report(top=50)
+    assert report["llm_wait_ms"] == 250.0
+    assert report["regex_ms"] > 0
+    assert any("busy_work" in entry["function"] for entry in report["top_functions"])
+
+
+def test_one_request_profiled_at_a_time():
+    with RequestProfile() as first:
+        with RequestProfile() as second:
+            add_llm_wait(1)
+    assert second.report() == {"skipped": "another request is being profiled"}
+    assert first.report()["llm_wait_ms"] == 1000.0
+
+    with RequestProfile() as third:
+        pass
+    assert "top_functions" in third.report()
+
+
+def test_llm_wait_ignored_without_profile():
+    add_llm_wait(1)
+    assert active_profile() is None
+
+
+if __name__ == "__main__":
+    test_report_lists_functions_regex_and_llm_wait()
+    test_one_request_profiled_at_a_time()
+    test_llm_wait_ignored_without_profile()
+    print("All tests passed!")
@@ -0,0 +1,59 @@
+# test_serialization.py
+import sys
+import os
+import json
+
+# Add parent directory to path so we can import serialization
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from typing import List
+from fastapi.exceptions import RequestValidationError
+from pydantic import BaseModel
+
+from serialization import dumps_json, parse_body, msgpack
+
+
+class Body(BaseModel):
+    messages: List[str]
+    compact: bool = False
+
+
+def test_fast_path_keeps_messages_and_validates_other_fields():
+    messages = ["I love Python", "My name is Sam"]
+    parsed = parse_body(Body, json.dumps({"messages": messages, "compact": "true"}).encode(), "application/json")
+    assert parsed.messages == messages
+    assert parsed.compact is True
+
+
+def test_invalid_bodies_report_field_errors():
+    for body in (b'{"messages": ["ok", 3]}', b'{"compact": true}', b"{not json"):
+        try:
+            parse_body(Body, body, "application/json")
+            assert False, "expected RequestValidationError"
+        except RequestValidationError as e:
+            assert e.errors()[0]["loc"][0] == "body"
+    try:
+        parse_body(Body, b'{"messages": ["ok", 3]}', None)
+    except RequestValidationError as e:
+        assert e.errors()[0]["loc"] == ("body", "messages", 1)
+
+
+def test_msgpack_body_round_trip():
+    if msgpack is None:
+        return
+    payload = {"messages": ["héllo", "I love Python"]}
+    parsed = parse_body(Body, msgpack.packb(payload), "application/msgpack")
+    assert parsed.messages == payload["messages"]
+
+
+def test_dumps_json_matches_stdlib():
+    content = {"preferences": [{"type": "language", "value": "python", "context": "naïve café"}], "facts": []}
+    assert json.loads(dumps_json(content)) == content
+
+
+if __name__ == "__main__":
+    test_fast_path_keeps_messages_and_validates_other_fields()
+    test_invalid_bodies_report_field_errors()
+    test_msgpack_body_round_trip()
+    test_dumps_json_matches_stdlib()
+    print("All tests passed!")
@@ -0,0 +1,64 @@
+# test_session_memory.py
+import json
+import sys
+import os
+
+# Add parent directory to path so we can import session_memory
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from memory_extractor import extract_messages
+from session_memory import SessionMemoryStore
+
+TEST_DIR = os.path.dirname(os.path.abspath(__file__))
+
+
+def load_messages():
+    with open(os.path.join(TEST_DIR, "sample_messages.json"), "r") as f:
+        return json.load(f)
+
+
+def test_full_history_and_delta_match_full_extraction():
+    messages = load_messages()
+    store = SessionMemoryStore()
+
+    # Growing full history, as the frontend sends it
+    for end in (5, 12, len(messages)):
+        result = store.extract("full", messages[:end])
+    assert result == extract_messages(messages)
+
+    # Only the new messages on each call
+    for start, end in ((0, 5), (5, 12), (12, len(messages))):
+        result = store.extract("delta", messages[start:end], delta=True)
+    assert result == extract_messages(messages)
+    assert store.extract("delta", [], delta=True, compact=True) == extract_messages(messages, compact=True)
+
+
+def test_edited_history_starts_over():
+    messages = load_messages()
+    store = SessionMemoryStore()
+    store.extract("s", messages[:10])
+    edited = ["I love Rust."] + messages[1:12]
+    assert store.extract("s", edited) == extract_messages(edited)
+
+
+def test_edited_last_message_starts_over():
+    messages = load_messages()
+    store = SessionMemoryStore()
+    store.extract("s", messages[:10])
+    edited = messages[:9] + ["I love Rust."] + messages[10:12]
+    assert store.extract("s", edited) == extract_messages(edited)
+
+
+def test_sessions_are_bounded():
+    store = SessionMemoryStore(max_sessions=2)
+    for session_id in ("a", "b", "c"):
+        store.extract(session_id, ["I love Python"])
+    assert len(store) == 2
+
+
+if __name__ == "__main__":
+    test_full_history_and_delta_match_full_extraction()
+    test_edited_history_starts_over()
+    test_edited_last_message_starts_over()
+    test_sessions_are_bounded()
+    print("All tests passed!")
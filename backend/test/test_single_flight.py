@@ -0,0 +1,110 @@
+# test_single_flight.py
+import asyncio
+import sys
+import os
+import threading
+import time
+
+# Add parent directory to path so we can import single_flight
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from single_flight import AsyncSingleFlight, SingleFlight
+
+
+def test_async_calls_are_coalesced():
+    flight = AsyncSingleFlight()
+    upstream_calls = []
+
+    async def call():
+        upstream_calls.append(1)
+        await asyncio.sleep(0.05)
+        return {"transformed_reply": "shared"}
+
+    async def burst():
+        return await asyncio.gather(*[flight.do("key", call) for _ in range(20)])
+
+    results = asyncio.run(burst())
+    assert len(upstream_calls) == 1
+    assert all(result == {"transformed_reply": "shared"} for result in results)
+    assert flight.stats() == {"calls": 1, "coalesced": 19, "in_flight": 0}
+
+
+def test_call_is_cancelled_with_its_last_waiter():
+    flight = AsyncSingleFlight()
+    outcomes = []
+
+    async def call():
+        try:
+            await asyncio.sleep(0.2)
+            outcomes.append("finished")
+        except asyncio.CancelledError:
+            outcomes.append("cancelled")
+            raise
+        return "shared"
+
+    async def main():
+        patient = asyncio.ensure_future(flight.do("key", call))
+        impatient = asyncio.ensure_future(flight.do("key", call))
+        await asyncio.sleep(0.05)
+        impatient.cancel()
+        # The other waiter still wants the result
+        assert await patient == "shared"
+
+        alone = asyncio.ensure_future(flight.do("other", call))
+        await asyncio.sleep(0.05)
+        alone.cancel()
+        await asyncio.sleep(0.01)
+
+    asyncio.run(main())
+    assert outcomes == ["finished", "cancelled"]
+    assert flight.stats()["in_flight"] == 0
+
+
+def test_caller_after_cancellation_starts_a_new_call():
+    flight = AsyncSingleFlight()
+
+    async def call():
+        await asyncio.sleep(0.05)
+        return "fresh"
+
+    async def main():
+        first = asyncio.ensure_future(flight.do("key", call))
+        await asyncio.sleep(0.01)
+        first.cancel()
+        await asyncio.sleep(0)  # The shared call is cancelled but not done yet
+        return await flight.do("key", call)
+
+    assert asyncio.run(main()) == "fresh"
+    assert flight.stats() == {"calls": 2, "coalesced": 0, "in_flight": 0}
+
+
+def test_threaded_calls_share_errors():
+    flight = SingleFlight()
+    errors = []
+
+    def call():
+        time.sleep(0.05)
+        raise RuntimeError("upstream down")
+
+    def worker():
+        try:
+            flight.do("key", call)
+        except RuntimeError as e:
+            errors.append(str(e))
+
+    threads = [threading.Thread(target=worker) for _ in range(10)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert errors == ["upstream down"] * 10
+    assert flight.calls + flight.coalesced == 10
+    assert flight.calls < 10
+
+
+if __name__ == "__main__":
+    test_async_calls_are_coalesced()
+    test_call_is_cancelled_with_its_last_waiter()
+    test_caller_after_cancellation_starts_a_new_call()
+    test_threaded_calls_share_errors()
+    print("All tests passed!")
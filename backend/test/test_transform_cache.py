@@ -0,0 +1,66 @@
+# test_transform_cache.py
+import sys
+import os
+import tempfile
+
+# Add parent directory to path so we can import transform_cache
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from transform_cache import TransformCache, SQLiteTransformCache, cache_key
+
+
+def check_lru_ttl_and_counters(cache):
+    cache.set("a", {"transformed_reply": "A"})
+    cache.set("b", {"transformed_reply": "B"})
+    assert cache.get("a") == {"transformed_reply": "A"}  # "a" is now most recent
+    cache.set("c", {"transformed_reply": "C"})
+    assert cache.get("b") is None  # least recently used, evicted
+    assert cache.get("c") == {"transformed_reply": "C"}
+    stats = cache.stats()
+    assert (stats["hits"], stats["misses"], stats["size"]) == (2, 1, 2)
+
+    cache.ttl_seconds = -1
+    cache.set("d", {"transformed_reply": "D"})
+    assert cache.get("d") is None  # already expired
+
+
+def test_memory_cache():
+    check_lru_ttl_and_counters(TransformCache(max_size=2))
+
+
+def test_sqlite_cache_survives_reopen():
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "cache.db")
+        check_lru_ttl_and_counters(SQLiteTransformCache(path, max_size=2))
+        reopened = SQLiteTransformCache(path, max_size=2)
+        assert reopened.get("c") == {"transformed_reply": "C"}
+
+
+def test_sqlite_lookups_do_not_write():
+    with tempfile.TemporaryDirectory() as tmp:
+        cache = SQLiteTransformCache(os.path.join(tmp, "cache.db"), max_size=2)
+        cache.set("a", {"transformed_reply": "A"})
+        cache.set("b", {"transformed_reply": "B"})
+        changes = cache._db.total_changes
+        assert cache.get("a") == {"transformed_reply": "A"}
+        assert cache.get("missing") is None
+        assert cache._db.total_changes == changes
+        assert cache._db.execute("PRAGMA journal_mode").fetchone()[0] == "wal"
+
+        # The hit on "a" still counts for eviction once written by the next set()
+        cache.set("c", {"transformed_reply": "C"})
+        assert cache.get("b") is None
+        assert cache.get("a") == {"transformed_reply": "A"}
+
+
+def test_cache_key_is_stable():
+    assert cache_key("reply", "therapist", {"a": 1}) == cache_key("reply", "therapist", {"a": 1})
+    assert cache_key("reply", "therapist") != cache_key("reply", "calm_mentor")
+
+
+if __name__ == "__main__":
+    test_memory_cache()
+    test_sqlite_cache_survives_reopen()
+    test_sqlite_lookups_do_not_write()
+    test_cache_key_is_stable()
+    print("All tests passed!")
@@ -0,0 +1,152 @@
+# transform_cache.py
+import hashlib
+import json
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from typing import Dict, Optional
+
+
+def cache_key(*parts) -> str:
+    """Stable digest of the values that determine a transformation."""
+    payload = json.dumps(parts, ensure_ascii=False, separators=(",", ":"))
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+class TransformCache:
+    """Bounded in-memory LRU cache with a TTL and hit/miss counters."""
+
+    def __init__(self, max_size: int = 1024, ttl_seconds: float = 3600):
+        self.max_size = max_size
+        self.ttl_seconds = ttl_seconds
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: str) -> Optional[Dict]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or entry[0] < time.time():
+                if entry is not None:
+                    del self._entries[key]
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return dict(entry[1])
+
+    def set(self, key: str, value: Dict) -> None:
+        if self.max_size <= 0:
+            return
+        with self._lock:
+            self._entries[key] = (time.time() + self.ttl_seconds, dict(value))
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+
+    def flush(self) -> None:
+        """Persist pending state; nothing to do for the in-memory cache."""
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+    def __len__(self):
+        return len(self._entries)
+
+    def stats(self) -> Dict:
+        lookups = self.hits + self.misses
+        return {
+            "backend": "memory",
+            "size": len(self),
+            "max_size": self.max_size,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+        }
+
+
+class SQLiteTransformCache(TransformCache):
+    """TransformCache persisted to a SQLite file so entries survive restarts.
+
+    Lookups are called from the event loop, so they only read: access times
+    of hits are kept in memory and written along with the next set(), which
+    also drops expired rows.
+    """
+
+    def __init__(self, path: str, max_size: int = 1024, ttl_seconds: float = 3600):
+        super().__init__(max_size, ttl_seconds)
+        self.path = path
+        self._accessed = {}  # key -> access time not yet written
+        self._db = sqlite3.connect(path, check_same_thread=False)
+        # WAL lets commits skip the fsync of the rollback journal
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute("PRAGMA synchronous=NORMAL")
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS transform_cache ("
+            "key TEXT PRIMARY KEY, value TEXT NOT NULL, expires REAL NOT NULL, accessed REAL NOT NULL)"
+        )
+        self._db.execute("CREATE INDEX IF NOT EXISTS transform_cache_accessed ON transform_cache (accessed)")
+        self._db.commit()
+
+    def get(self, key: str) -> Optional[Dict]:
+        now = time.time()
+        with self._lock:
+            row = self._db.execute("SELECT value, expires FROM transform_cache WHERE key = ?", (key,)).fetchone()
+            if row is None or row[1] < now:
+                self.misses += 1
+                return None
+            self._accessed[key] = now
+            self.hits += 1
+            return json.loads(row[0])
+
+    def _write_access_times(self) -> None:
+        if self._accessed:
+            self._db.executemany(
+                "UPDATE transform_cache SET accessed = ? WHERE key = ?",
+                [(accessed, key) for key, accessed in self._accessed.items()],
+            )
+            self._accessed.clear()
+
+    def set(self, key: str, value: Dict) -> None:
+        if self.max_size <= 0:
+            return
+        now = time.time()
+        with self._lock:
+            self._write_access_times()
+            self._accessed.pop(key, None)
+            self._db.execute("DELETE FROM transform_cache WHERE expires < ?", (now,))
+            self._db.execute(
+                "INSERT OR REPLACE INTO transform_cache (key, value, expires, accessed) VALUES (?, ?, ?, ?)",
+                (key, json.dumps(value, ensure_ascii=False), now + self.ttl_seconds, now),
+            )
+            # Evict least recently used rows beyond the size bound
+            self._db.execute(
+                "DELETE FROM transform_cache WHERE key IN ("
+                "SELECT key FROM transform_cache ORDER BY accessed DESC LIMIT -1 OFFSET ?)",
+                (self.max_size,),
+            )
+            self._db.commit()
+
+    def flush(self) -> None:
+        """Write pending access times, e.g. before shutting down."""
+        with self._lock:
+            self._write_access_times()
+            self._db.commit()
+
+    def clear(self) -> None:
+        with self._lock:
+            self._accessed.clear()
+            self._db.execute("DELETE FROM transform_cache")
+            self._db.commit()
+
+    def __len__(self):
+        with self._lock:
+            return self._db.execute("SELECT COUNT(*) FROM transform_cache").fetchone()[0]
+
+    def stats(self) -> Dict:
+        stats = super().stats()
+        stats["backend"] = "sqlite"
+        return stats
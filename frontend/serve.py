@@ -1,43 +1,269 @@
 #!/usr/bin/env python3
 """
-Simple HTTP server for the frontend
+HTTP server for the frontend
+
+By default assets are served with caching: ETag/Last-Modified revalidation,
+year-long immutable caching for fingerprinted URLs, and gzip (plus brotli,
+if the brotli package is installed) variants compressed once at startup
+and sent with sendfile. --dev keeps the old behaviour of disabling caching
+so edits show up on reload.
+
+Usage:
+    python serve.py [--port 3002] [--host ""] [--dev] [--no-browser]
 """
 
+import argparse
+import gzip
+import hashlib
 import http.server
-import socketserver
+import mimetypes
 import os
+import re
+import shutil
 import webbrowser
+from email.utils import formatdate, parsedate_to_datetime
 from pathlib import Path
+from urllib.parse import parse_qs, unquote, urlsplit
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
 
 PORT = 3002
 
+FRONTEND_DIR = Path(__file__).parent
+# Snapshot of the assets (plus precompressed variants) written at startup
+CACHE_DIR = FRONTEND_DIR / ".precompressed"
+# Only these file types are served; everything else (serve.py, .bat, ...) is 404
+SERVED_SUFFIXES = {".html", ".js", ".css", ".json", ".svg", ".png", ".jpg", ".jpeg", ".gif", ".ico", ".webp", ".txt", ".map", ".woff", ".woff2"}
+COMPRESSIBLE_SUFFIXES = {".html", ".js", ".css", ".json", ".svg", ".txt", ".map"}
+SKIPPED_NAMES = {"package.json", "vercel.json", "vite.config.js"}
+# Names like app.3f2a1b9c.js carry their own version
+FINGERPRINTED_NAME = re.compile(r"\.[0-9a-f]{8,}\.\w+$")
+IMMUTABLE = "public, max-age=31536000, immutable"
+REVALIDATE = "no-cache"
+# Length of the ?v= content digest the HTML rewriter appends to local references
+VERSION_LENGTH = 12
+# Local src/href references in HTML, rewritten to carry a ?v=<hash> fingerprint
+LOCAL_REFERENCE = re.compile(r'(\b(?:src|href)=")([^":?#]+)(")')
+
+
+class Asset:
+    """One servable file: its representations (identity, gzip, br) in the cache directory and validators."""
+
+    def __init__(self, path: Path, mtime: float, content_type: str, variants: dict, digest: str):
+        self.path = path
+        self.content_type = content_type
+        self.last_modified = formatdate(mtime, usegmt=True)
+        self.mtime = int(mtime)
+        self.variants = variants  # encoding ("identity", "gzip", "br") -> file path
+        self.digest = digest
+
+    def etag(self, encoding: str) -> str:
+        return f'"{self.digest[:16]}-{encoding}"'
+
+
+def _write(path: Path, data: bytes) -> Path:
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_bytes(data)
+    return path
+
+
+def build_assets(root: Path = FRONTEND_DIR, cache_dir: Path = CACHE_DIR) -> dict:
+    """Snapshot every servable file under root, keyed by URL path.
+
+    HTML pages get their local script and stylesheet references fingerprinted
+    with a content hash, and compressible files get gzip (and brotli) variants
+    that are only kept when they are actually smaller.
+    """
+    shutil.rmtree(cache_dir, ignore_errors=True)
+    files = {}
+    for path in sorted(root.rglob("*")):
+        relative = path.relative_to(root)
+        if not path.is_file() or path.suffix not in SERVED_SUFFIXES or path.name in SKIPPED_NAMES:
+            continue
+        if any(part.startswith(".") or part == "node_modules" for part in relative.parts):
+            continue
+        files["/" + relative.as_posix()] = path
+
+    digests = {url: hashlib.sha256(path.read_bytes()).hexdigest() for url, path in files.items()}
+    newest = max((path.stat().st_mtime for path in files.values()), default=0)
+
+    assets = {}
+    for url, path in files.items():
+        data = path.read_bytes()
+        digest = digests[url]
+        # Served from a copy, so later edits cannot drift from the ETag
+        variants = {"identity": _write(cache_dir / relative_name(url), data)}
+        mtime = path.stat().st_mtime
+        if path.suffix == ".html":
+            # The page changes whenever an asset it fingerprints does
+            mtime = newest
+            base = url.rsplit("/", 1)[0] + "/"
+
+            def fingerprint(match):
+                target = match.group(2)
+                target_url = target if target.startswith("/") else base + target
+                if target_url not in digests:
+                    return match.group(0)
+                return f"{match.group(1)}{target}?v={digests[target_url][:VERSION_LENGTH]}{match.group(3)}"
+
+            data = LOCAL_REFERENCE.sub(fingerprint, data.decode("utf-8")).encode("utf-8")
+            digest = hashlib.sha256(data).hexdigest()
+            variants["identity"] = _write(cache_dir / relative_name(url), data)
+        if path.suffix in COMPRESSIBLE_SUFFIXES:
+            compressed = gzip.compress(data, compresslevel=9, mtime=0)
+            if len(compressed) < len(data):
+                variants["gzip"] = _write(cache_dir / (relative_name(url) + ".gz"), compressed)
+            if brotli is not None:
+                compressed = brotli.compress(data, quality=11)
+                if len(compressed) < len(data):
+                    variants["br"] = _write(cache_dir / (relative_name(url) + ".br"), compressed)
+        content_type = mimetypes.guess_type(path.name)[0] or "application/octet-stream"
+        if content_type.startswith("text/") or content_type in ("application/javascript", "application/json"):
+            content_type += "; charset=utf-8"
+        assets[url] = Asset(path, mtime, content_type, variants, digest)
+    return assets
+
+
+def relative_name(url: str) -> str:
+    return url.lstrip("/")
+
+
+def accepted_encodings(header: str) -> set:
+    accepted = set()
+    for part in (header or "").split(","):
+        name, _, params = part.strip().partition(";")
+        if params.strip() in ("q=0", "q=0.0", "q=0.00", "q=0.000"):
+            continue
+        accepted.add(name.strip().lower())
+    return accepted
+
+
+class StaticAssetHandler(http.server.BaseHTTPRequestHandler):
+    """Serves the startup snapshot of assets with caching headers and sendfile."""
+
+    assets = {}
+    protocol_version = "HTTP/1.1"
+
+    def do_GET(self):
+        self.serve(send_body=True)
+
+    def do_HEAD(self):
+        self.serve(send_body=False)
+
+    def serve(self, send_body: bool):
+        url = urlsplit(self.path)
+        path = unquote(url.path)
+        asset = self.assets.get("/index.html" if path == "/" else path)
+        if asset is None:
+            self.send_error(404, "File not found")
+            return
+
+        accepted = accepted_encodings(self.headers.get("Accept-Encoding"))
+        encoding = next((e for e in ("br", "gzip") if e in asset.variants and e in accepted), "identity")
+        etag = asset.etag(encoding)
+
+        # Fingerprinted URLs never change meaning, so caches may keep them for good
+        version = parse_qs(url.query).get("v", [None])[0]
+        if FINGERPRINTED_NAME.search(path) or version == asset.digest[:VERSION_LENGTH]:
+            cache_control = IMMUTABLE
+        else:
+            cache_control = REVALIDATE
+
+        if self.not_modified(asset):
+            self.send_response(304)
+            self.send_common_headers(asset, etag, cache_control)
+            self.end_headers()
+            return
+
+        variant = asset.variants[encoding]
+        size = variant.stat().st_size
+        self.send_response(200)
+        self.send_common_headers(asset, etag, cache_control)
+        self.send_header("Content-Type", asset.content_type)
+        self.send_header("Content-Length", str(size))
+        if encoding != "identity":
+            self.send_header("Content-Encoding", encoding)
+        self.end_headers()
+        if send_body:
+            with open(variant, "rb") as f:
+                # socket.sendfile uses os.sendfile where available and falls back to send()
+                self.connection.sendfile(f)
+
+    def not_modified(self, asset: Asset) -> bool:
+        if_none_match = self.headers.get("If-None-Match")
+        if if_none_match is not None:
+            tags = {tag.strip().removeprefix("W/") for tag in if_none_match.split(",")}
+            return "*" in tags or any(asset.etag(e) in tags for e in asset.variants)
+        if_modified_since = self.headers.get("If-Modified-Since")
+        if if_modified_since:
+            try:
+                return parsedate_to_datetime(if_modified_since).timestamp() >= asset.mtime
+            except (TypeError, ValueError):
+                return False
+        return False
+
+    def send_common_headers(self, asset: Asset, etag: str, cache_control: str):
+        self.send_header("ETag", etag)
+        self.send_header("Last-Modified", asset.last_modified)
+        self.send_header("Cache-Control", cache_control)
+        self.send_header("Vary", "Accept-Encoding")
+        self.send_header("X-Content-Type-Options", "nosniff")
+
+
 class MyHTTPRequestHandler(http.server.SimpleHTTPRequestHandler):
+    """Development handler: files are read on every request and never cached."""
+
     def end_headers(self):
         self.send_header('Cache-Control', 'no-cache, no-store, must-revalidate')
         self.send_header('Pragma', 'no-cache')
         self.send_header('Expires', '0')
         super().end_headers()
 
-def serve_frontend():
+
+def serve_frontend(port: int = PORT, host: str = "", dev: bool = False, open_browser: bool = True):
     # Change to frontend directory
-    frontend_dir = Path(__file__).parent
+    frontend_dir = FRONTEND_DIR
     os.chdir(frontend_dir)
-    
-    print(f"🌐 Starting frontend server on port {PORT}...")
+
+    if dev:
+        handler = MyHTTPRequestHandler
+        mode = "development (no caching)"
+    else:
+        StaticAssetHandler.assets = build_assets(frontend_dir)
+        handler = StaticAssetHandler
+        compressed = sum(len(asset.variants) - 1 for asset in StaticAssetHandler.assets.values())
+        mode = f"production ({len(StaticAssetHandler.assets)} assets, {compressed} precompressed variants)"
+
+    print(f"🌐 Starting frontend server on port {port}...")
     print(f"📁 Serving files from: {frontend_dir}")
-    print(f"🔗 Frontend URL: http://localhost:{PORT}")
+    print(f"⚙️  Mode: {mode}")
+    print(f"🔗 Frontend URL: http://localhost:{port}")
     print(f"🤖 Make sure backend is running on: http://127.0.0.1:8000")
     print("\n" + "="*50)
-    print("🚀 Opening browser...")
-    
-    # Open browser automatically
-    webbrowser.open(f'http://localhost:{PORT}')
-    
-    with socketserver.TCPServer(("", PORT), MyHTTPRequestHandler) as httpd:
+
+    # One thread per connection, so a slow client cannot hold up the others
+    httpd = http.server.ThreadingHTTPServer((host, port), handler)
+    httpd.daemon_threads = True
+
+    if open_browser:
+        print("🚀 Opening browser...")
+        webbrowser.open(f'http://localhost:{port}')
+
+    with httpd:
         try:
             httpd.serve_forever()
         except KeyboardInterrupt:
             print("\n\n🛑 Frontend server stopped")
 
+
 if __name__ == "__main__":
-    serve_frontend()
\ No newline at end of file
+    parser = argparse.ArgumentParser(description="Serve the frontend")
+    parser.add_argument("--port", type=int, default=PORT)
+    parser.add_argument("--host", default="")
+    parser.add_argument("--dev", action="store_true", help="Disable caching and serve files straight from disk")
+    parser.add_argument("--no-browser", action="store_true", help="Do not open a browser window")
+    args = parser.parse_args()
+    serve_frontend(args.port, args.host, args.dev, not args.no_browser)
@@ -7,4 +7,4 @@ echo   cd backend
 echo   uvicorn app:app --host 127.0.0.1 --port 8000
 echo.
 echo Starting frontend server...
-python serve.py
\ No newline at end of file
+python serve.py --dev
\ No newline at end of file
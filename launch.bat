@@ -14,12 +14,12 @@ timeout /t 3 /nobreak >nul
 echo.
 echo 🌐 Starting Frontend Server...
 cd /d "%~dp0frontend"
-start "Frontend Server" cmd /k "python serve.py"
+start "Frontend Server" cmd /k "python serve.py --dev"
 
 echo.
 echo ✅ Both servers are starting!
 echo.
-echo 🔗 Frontend: http://localhost:3000
+echo 🔗 Frontend: http://localhost:3002
 echo 🤖 Backend:  http://127.0.0.1:8000
 echo.
 echo Press any key to exit launcher...
@@ -1,5 +1,23 @@
 // script.js - Frontend logic for Memory + Personality Engine
 
+// Request bodies at least this large are gzipped when the browser supports
+// CompressionStream; responses are compressed by the backend and decoded by
+// the browser itself via Accept-Encoding
+const COMPRESS_MIN_BYTES = 8 * 1024;
+
+async function jsonRequest(payload) {
+    const body = JSON.stringify(payload);
+    if (typeof CompressionStream === 'undefined' || body.length < COMPRESS_MIN_BYTES) {
+        return { method: 'POST', headers: { 'Content-Type': 'application/json' }, body };
+    }
+    const stream = new Blob([body]).stream().pipeThrough(new CompressionStream('gzip'));
+    return {
+        method: 'POST',
+        headers: { 'Content-Type': 'application/json', 'Content-Encoding': 'gzip' },
+        body: await new Response(stream).arrayBuffer()
+    };
+}
+
 function memoryApp() {
     return {
         // Data
@@ -11,6 +29,11 @@ function memoryApp() {
         memoryResults: null,
         transformResult: null,
         comparisonResult: null,
+
+        // Session id lets the backend keep extracted memory and only process new messages
+        sessionId: (window.crypto && crypto.randomUUID) ?
+            crypto.randomUUID() :
+            `${Date.now()}-${Math.random().toString(36).slice(2)}`,
         
         // API base URL - automatically detects environment
         apiUrl: window.location.hostname === 'localhost' ? 
@@ -59,13 +82,8 @@ I study machine learning at Stanford University.`;
                 
                 const messages = this.chatMessages.split('\n').filter(msg => msg.trim());
                 
-                const response = await fetch(`${this.apiUrl}/extract`, {
-                    method: 'POST',
-                    headers: {
-                        'Content-Type': 'application/json',
-                    },
-                    body: JSON.stringify({ messages: messages })
-                });
+                const response = await fetch(`${this.apiUrl}/extract`,
+                    await jsonRequest({ messages: messages, session_id: this.sessionId, compact: true }));
 
                 if (!response.ok) {
                     throw new Error(`HTTP error! status: ${response.status}`);
@@ -94,17 +112,13 @@ I study machine learning at Stanford University.`;
                 
                 const messages = this.chatMessages.split('\n').filter(msg => msg.trim());
                 
-                const response = await fetch(`${this.apiUrl}/transform`, {
-                    method: 'POST',
-                    headers: {
-                        'Content-Type': 'application/json',
-                    },
-                    body: JSON.stringify({
-                        messages: messages,
-                        style: this.selectedStyle,
-                        sample_reply: this.sampleReply
-                    })
-                });
+                const response = await fetch(`${this.apiUrl}/transform`, await jsonRequest({
+                    messages: messages,
+                    session_id: this.sessionId,
+                    compact: true,
+                    style: this.selectedStyle,
+                    sample_reply: this.sampleReply
+                }));
 
                 if (!response.ok) {
                     throw new Error(`HTTP error! status: ${response.status}`);
@@ -130,16 +144,12 @@ I study machine learning at Stanford University.`;
                 
                 const messages = this.chatMessages.split('\n').filter(msg => msg.trim());
                 
-                const response = await fetch(`${this.apiUrl}/compare`, {
-                    method: 'POST',
-                    headers: {
-                        'Content-Type': 'application/json',
-                    },
-                    body: JSON.stringify({
-                        messages: messages,
-                        sample_reply: this.sampleReply
-                    })
-                });
+                const response = await fetch(`${this.apiUrl}/compare`, await jsonRequest({
+                    messages: messages,
+                    session_id: this.sessionId,
+                    compact: true,
+                    sample_reply: this.sampleReply
+                }));
 
                 if (!response.ok) {
                     throw new Error(`HTTP error! status: ${response.status}`);